@@ -10,7 +10,9 @@ if ROOT not in sys.path:
 
 import json
 import streamlit as st
-from core.transforms import load_seed, avg_rating_for_book
+from core.transforms import avg_rating_for_book, save_snapshot
+from core.store import STORE
+from core.pager import DEFAULT_PAGE_SIZE, paginate
 from core.domain import Rating, Review, Book, User, Author, Loan, Tag, Genre
 from core import functional as fn
 from core.ftypes import (
@@ -24,17 +26,46 @@ st.set_page_config(page_title="Library Recommender", page_icon="📚", layout="w
 
 # Навигация
 st.sidebar.title("Menu")
-page = st.sidebar.radio("Navigation", ["Overview", "Data", "Functional Core", "Reports", "Tests", "About"], index=1)
+page = st.sidebar.radio("Navigation", ["Overview", "Data", "Functional Core", "Reports", "Search", "Diagnostics", "Tests", "About"], index=1)
 
-# Состояние приложения
-if "DATA" not in st.session_state:
-    st.session_state["DATA"] = None
+# Состояние приложения: в сессии — только путь; каталог общий для всех сессий (core.store)
+SEED_PATH = Path(__file__).parents[1] / "data" / "seed.json"
+if "DATA_SOURCE" not in st.session_state:
+    st.session_state["DATA_SOURCE"] = None
 
-DATA = st.session_state["DATA"]
+DATA = STORE.get(st.session_state["DATA_SOURCE"]) if st.session_state["DATA_SOURCE"] else None
+
+# Не больше стольких вариантов уходит в браузер на один список выбора
+PICKER_LIMIT = 50
+
+
+def pick(label, path, kind, key):
+    """Search-as-you-type picker: query box + selectbox of at most PICKER_LIMIT matches.
+
+    ``kind`` is ``"book"`` or ``"user"``; the id/label index is a derived
+    index of the shared catalog, so it is built once per catalog version.
+    """
+    options = STORE.entry(path).derived(f"{kind}_options")
+    query = st.text_input(label, key=f"{key}_query", placeholder="id или начало названия…")
+    ids = options.search(query, limit=PICKER_LIMIT)
+    if not ids:
+        st.caption("Ничего не найдено")
+        return None
+    return st.selectbox(label, ids, format_func=options.label, key=key, label_visibility="collapsed")
+
+
+def page_of(items, key, size=DEFAULT_PAGE_SIZE):
+    """Server-side pagination: only the selected page is rendered"""
+    pages = max(1, -(-len(items) // size))
+    number = st.number_input("Страница", 1, pages, 1, key=key) if pages > 1 else 1
+    page = paginate(items, number, size)
+    if page.total:
+        st.caption(f"{page.start}–{page.start + len(page.items) - 1} из {page.total}")
+    return page
 
 if page == "Data":
     st.header("Data")
-    seed_path = Path(__file__).parents[1] / "data" / "seed.json"
+    seed_path = SEED_PATH
     st.code(str(seed_path), language="bash")
 
     # Диагностика файла
@@ -49,18 +80,49 @@ if page == "Data":
         except Exception as e:
             st.error(f"Cannot read file: {e}")
             
-    # Кнопка: загрузить seed
-    if st.button("Load seed", type="primary"):
-        try:
-            st.session_state["DATA"] = load_seed(str(seed_path))
-            st.success("✅ Seed loaded")
-        except Exception as e:
-            st.error(f"❌ {e}")
+    # Кнопки: загрузить seed (из общего кэша, если уже загружен) / перечитать с диска
+    col_load, col_reload = st.columns(2)
+    with col_load:
+        if st.button("Load seed", type="primary"):
+            try:
+                entry = STORE.warm(str(seed_path))
+                try:
+                    entry.derived("similar")  # LSH-индекс строится при загрузке
+                except ImportError:
+                    pass
+                st.session_state["DATA_SOURCE"] = str(seed_path)
+                DATA = entry.catalog
+                st.success(f"✅ Seed loaded ({entry.source}, {entry.load_ms:.1f} ms)")
+            except Exception as e:
+                st.error(f"❌ {e}")
+    with col_reload:
+        if st.button("Reload", disabled=not DATA):
+            try:
+                DATA = STORE.reload(str(seed_path)).catalog
+                st.success("✅ Reloaded from disk")
+            except Exception as e:
+                st.error(f"❌ {e}")
+
+    # Бинарный снимок для быстрого холодного старта (Reports читает его, если он свежее seed.json)
+    snapshot_path = seed_path.with_suffix(".snapshot")
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Save snapshot", disabled=not DATA):
+            size = save_snapshot(DATA, str(snapshot_path))
+            st.success(f"✅ Snapshot saved: {size} bytes")
+    with col2:
+        if exists and st.button("Benchmark JSON vs snapshot"):
+            from core.snapshot import measure_snapshot_performance
+            perf = measure_snapshot_performance(str(seed_path), str(snapshot_path))
+            st.write(f"Load — JSON: {perf['json_load_ms']} ms, snapshot: {perf['snapshot_load_ms']} ms "
+                     f"({perf['speedup']}x), {perf['json_bytes']} → {perf['snapshot_bytes']} bytes")
+            st.write(f"Ready (sections + indexes built) — JSON: {perf['json_ready_ms']} ms, "
+                     f"snapshot: {perf['snapshot_ready_ms']} ms ({perf['ready_speedup']}x)")
 
     # Показать счётчики
-    if st.session_state["DATA"]:
+    if DATA:
         st.subheader("Counts")
-        for k, v in st.session_state["DATA"].items():
+        for k, v in DATA.items():
             st.write(f"- {k}: {len(v)}")
 
 elif page == "Overview":
@@ -73,11 +135,7 @@ elif page == "Overview":
         n_users = len(DATA["users"])
 
         # Средний рейтинг по каталогу (среднее по средним)
-        ratings = tuple(Rating(**r) if isinstance(r, dict) else r for r in DATA["ratings"])
-        totals = []
-        for b in DATA["books"]:
-            bid = b["id"] if isinstance(b, dict) else b.id
-            totals.append(avg_rating_for_book(ratings, bid))
+        totals = [avg_rating_for_book(DATA, b.id) for b in DATA.books]
         avg_catalog = (sum(totals) / len(totals)) if totals else 0.0
 
         c1, c2, c3, c4 = st.columns(4)
@@ -89,16 +147,14 @@ elif page == "Overview":
 elif page == "Functional Core":
     st.header("🧪 Functional Core - Maybe/Either")
     
-    DATA = st.session_state.get("DATA")
     if not DATA:
         st.info("Please load seed data first in the 'Data' tab.")
         st.stop()
 
-    # Load data
-    books = DATA["books"]
-    users = DATA["users"]
+    # Load data (Catalog: lookups go through its indexes)
+    catalog = DATA
+    source = st.session_state["DATA_SOURCE"]
     ratings = DATA["ratings"]
-    reviews = DATA["reviews"]
     
     tab1, tab2, tab3, tab4 = st.tabs([
         "🔍 Maybe Examples", 
@@ -117,7 +173,7 @@ elif page == "Functional Core":
             st.write("**Safe Book Lookup**")
             book_id = st.text_input("Enter Book ID:", value="1", key="maybe_book")
             if st.button("Find Book (Maybe)"):
-                result = safe_book(books, book_id)
+                result = safe_book(catalog, book_id)
                 
                 if result.is_just():
                     book = result.get_or_else(None)
@@ -131,7 +187,7 @@ elif page == "Functional Core":
             st.write("**Safe User Lookup**")
             user_id = st.text_input("Enter User ID:", value="1", key="maybe_user")
             if st.button("Find User (Maybe)"):
-                result = safe_user(users, user_id)
+                result = safe_user(catalog, user_id)
                 
                 if result.is_just():
                     user = result.get_or_else(None)
@@ -141,11 +197,9 @@ elif page == "Functional Core":
         
         st.write("---")
         st.write("**Safe Book Analysis**")
-        analysis_book_id = st.selectbox("Select book for analysis:", 
-                                       [b.id for b in books], 
-                                       key="analysis_book")
-        if st.button("Analyze Book"):
-            result = safe_book_analysis(books, analysis_book_id, ratings)
+        analysis_book_id = pick("Select book for analysis:", source, "book", "analysis_book")
+        if st.button("Analyze Book") and analysis_book_id:
+            result = safe_book_analysis(catalog, analysis_book_id, catalog)
             
             if result.is_just():
                 title, avg_rating = result.get_or_else(("", 0.0))
@@ -161,16 +215,10 @@ elif page == "Functional Core":
         
         col1, col2, col3 = st.columns(3)
         with col1:
-            selected_user = st.selectbox("User:", 
-                                        [f"{u.id} - {u.name}" for u in users],
-                                        key="either_user")
-            user_id = selected_user.split(" - ")[0] if selected_user else ""
+            user_id = pick("User:", source, "user", "either_user") or ""
         
         with col2:
-            selected_book = st.selectbox("Book:", 
-                                        [f"{b.id} - {b.title}" for b in books],
-                                        key="either_book")
-            book_id = selected_book.split(" - ")[0] if selected_book else ""
+            book_id = pick("Book:", source, "book", "either_book") or ""
         
         with col3:
             rating_value = st.slider("Rating", 1, 5, 3, key="either_rating")
@@ -178,7 +226,7 @@ elif page == "Functional Core":
         if st.button("Validate Rating (Either)"):
             if user_id and book_id:
                 rating = Rating(user_id, book_id, rating_value)
-                result = validate_rating(rating, books, users, ratings)
+                result = validate_rating(rating, catalog, catalog, catalog)
                 
                 if result.is_right():
                     st.success("✅ Rating is valid!")
@@ -193,22 +241,17 @@ elif page == "Functional Core":
         st.write("---")
         st.write("**Review Validation**")
         
-        review_user = st.selectbox("Review User:", 
-                                  [f"{u.id} - {u.name}" for u in users],
-                                  key="review_user")
-        review_book = st.selectbox("Review Book:", 
-                                  [f"{b.id} - {b.title}" for b in books],
-                                  key="review_book")
+        review_user = pick("Review User:", source, "user", "review_user")
+        review_book = pick("Review Book:", source, "book", "review_book")
         review_text = st.text_area("Review Text:", 
                                   "This is a great book with excellent storytelling...")
         
         if st.button("Validate Review"):
             if review_user and review_book:
-                user_id = review_user.split(" - ")[0]
-                book_id = review_book.split(" - ")[0]
+                user_id, book_id = review_user, review_book
                 review = Review("temp_id", user_id, book_id, review_text, "2024-01-01")
                 
-                result = validate_review(review, books, users)
+                result = validate_review(review, catalog, catalog)
                 
                 if result.is_right():
                     st.success("✅ Review is valid!")
@@ -225,12 +268,8 @@ elif page == "Functional Core":
         
         st.write("**Add Rating Pipeline**")
         
-        pipeline_user = st.selectbox("Pipeline User:", 
-                                    [f"{u.id} - {u.name}" for u in users],
-                                    key="pipeline_user")
-        pipeline_book = st.selectbox("Pipeline Book:", 
-                                    [f"{b.id} - {b.title}" for b in books],
-                                    key="pipeline_book")
+        pipeline_user = pick("Pipeline User:", source, "user", "pipeline_user")
+        pipeline_book = pick("Pipeline Book:", source, "book", "pipeline_book")
         pipeline_rating = st.slider("Pipeline Rating", 1, 5, 4, key="pipeline_rating")
         
         col1, col2 = st.columns(2)
@@ -238,11 +277,10 @@ elif page == "Functional Core":
         with col1:
             if st.button("Run Rating Pipeline"):
                 if pipeline_user and pipeline_book:
-                    user_id = pipeline_user.split(" - ")[0]
-                    book_id = pipeline_book.split(" - ")[0]
+                    user_id, book_id = pipeline_user, pipeline_book
                     rating = Rating(user_id, book_id, pipeline_rating)
                     
-                    result = add_rating_pipeline(rating, ratings, books, users)
+                    result = add_rating_pipeline(rating, catalog, catalog, catalog)
                     
                     if result.is_right():
                         new_ratings = result.get_or_else(ratings)
@@ -258,13 +296,12 @@ elif page == "Functional Core":
         with col2:
             if st.button("Run Review Pipeline"):
                 if pipeline_user and pipeline_book:
-                    user_id = pipeline_user.split(" - ")[0]
-                    book_id = pipeline_book.split(" - ")[0]
+                    user_id, book_id = pipeline_user, pipeline_book
                     review = Review("rev_new", user_id, book_id, 
                                    "This book was absolutely fantastic! Highly recommended.", 
                                    "2024-01-01")
                     
-                    result = add_review_pipeline(review, reviews, books, users, ratings)
+                    result = add_review_pipeline(review, catalog, catalog, catalog, catalog)
                     
                     if result.is_right():
                         new_reviews = result.get_or_else(None)
@@ -343,9 +380,6 @@ result = (validate_rating(rating)
 elif page == "Reports":
     st.header("📊 Reports")
     
-    # Прямые импорты чтобы избежать циклических зависимостей
-    from core.transforms import load_seed
-    
     try:
         from core.memo import recommend_for_user, measure_recommendation_performance
         memo_available = True
@@ -353,13 +387,19 @@ elif page == "Reports":
         st.error(f"Модуль рекомендаций недоступен: {e}")
         memo_available = False
     
-    # Загружаем данные
-    data = load_seed("data/seed.json")
-    books = data["books"]
-    ratings = data["ratings"]
-    users = data["users"]
+    try:
+        from core.vectorized import recommend_for_user_np, recommend_for_users
+        from core.itemcf import recommend_for_user_cf
+        numpy_available = True
+    except ImportError:
+        numpy_available = False
+    
+    # Каталог из общего кэша (снимок, если он не старше seed.json) — без загрузки на каждый rerun
+    seed_file = SEED_PATH
+    snapshot_file = seed_file.with_suffix(".snapshot")
+    data = STORE.get(str(seed_file))
     
-    if not books:
+    if not data.books:
         st.warning("Сначала загрузите данные во вкладке 'Data'")
     elif not memo_available:
         st.warning("Модуль рекомендаций не загружен")
@@ -367,26 +407,123 @@ elif page == "Reports":
         st.subheader("Рекомендации с кэшированием")
         
         # Выбор пользователя
-        user_options = [f"{user.id} - {user.name}" for user in users]
-        selected_user = st.selectbox("Выберите пользователя:", user_options, key="user_select_reports")
+        selected_user = pick("Выберите пользователя:", str(seed_file), "user", "user_select_reports")
+        
+        # Таблица, заранее посчитанная пулом процессов (core.precompute)
+        table_file = seed_file.with_name("recommendations.json")
+        rec_table = None
+        if table_file.exists():
+            from core.precompute import RecommendationTable
+            if st.session_state.get("REC_TABLE_MTIME") != table_file.stat().st_mtime:
+                st.session_state["REC_TABLE"] = RecommendationTable(str(table_file))
+                st.session_state["REC_TABLE_MTIME"] = table_file.stat().st_mtime
+            rec_table = st.session_state["REC_TABLE"]
+        
+        engines = ["Python (cached)"] + (["NumPy (vectorized)", "Item-item CF"] if numpy_available else [])
+        engines += ["Precomputed table"] if rec_table is not None else []
+        engine = st.radio("Движок рекомендаций:", engines, horizontal=True, key="engine_reports")
+        
+        # Кэш рекомендаций привязан к каталогу: общий для сессий, сбрасывается при перезагрузке
+        rec_cache = STORE.entry(str(seed_file)).derived("recommendation_cache")
         
         if selected_user and st.button("Получить рекомендации", key="get_recommendations"):
-            user_id = selected_user.split(" - ")[0]
+            user_id = selected_user
             
             with st.spinner("Формируем рекомендации..."):
-                recommendations = recommend_for_user(user_id, tuple(ratings), tuple(books))
+                if engine.startswith("Precomputed"):
+                    recommendations = rec_table.get(user_id) or ()
+                elif engine.startswith("NumPy"):
+                    recommendations = recommend_for_user_np(user_id, data, data)
+                elif engine.startswith("Item"):
+                    recommendations = recommend_for_user_cf(user_id, data, data)
+                else:
+                    recommendations = recommend_for_user(user_id, data, data, rec_cache)
                 
                 if recommendations:
                     st.success(f"Найдено {len(recommendations)} рекомендаций!")
-                    for i, book_id in enumerate(recommendations, 1):
-                        book = next((b for b in books if b.id == book_id), None)
-                        if book:
-                            st.write(f"{i}. **{book.title}**")
-                            st.write(f"   Жанры: {', '.join(book.genres)}")
-                            st.write("---")
+                    # одна таблица вместо трёх st.write на каждую книгу
+                    st.dataframe([
+                        {"#": i, "id": book.id, "Книга": book.title, "Жанры": ", ".join(book.genres)}
+                        for i, book in enumerate(
+                            filter(None, map(data.books_by_id.get, recommendations)), 1)
+                    ], hide_index=True)
                 else:
                     st.warning("Рекомендации не найдены")
         
+        cache_stats = rec_cache.stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Cache hits", cache_stats["hits"])
+        col2.metric("Cache misses", cache_stats["misses"])
+        col3.metric("Evictions", cache_stats["evictions"])
+        col4.metric("Hit rate", f"{cache_stats['hit_rate']:.0%}")
+        
+        # Рейтинг книг: поддерживаемый инкрементально лидерборд, без пересчёта на каждый rerun
+        st.subheader("Топ книг")
+        col1, col2 = st.columns(2)
+        score_kind = col1.radio("Оценка:", ["Среднее", "Байесовское среднее"], horizontal=True,
+                                key="leaderboard_kind")
+        board_n = col2.number_input("Сколько книг", 1, 100, 10, key="leaderboard_n")
+        board = STORE.entry(str(seed_file)).derived(
+            "leaderboard" if score_kind == "Среднее" else "leaderboard_bayes")
+        st.dataframe([
+            {"#": rank, "Книга": data.books_by_id[book_id].title if book_id in data.books_by_id else book_id,
+             "Оценка": round(score, 3), "Оценок": board.stats(book_id).count}
+            for rank, (book_id, score) in enumerate(board.top(int(board_n)), 1)
+        ], hide_index=True)
+        rank_book = pick("Место книги:", str(seed_file), "book", "leaderboard_book")
+        if rank_book:
+            rank = board.rank(rank_book)
+            st.caption(f"Место: {rank} из {len(board)}" if rank else "Книга не в рейтинге (мало оценок)")
+        
+        # Подборка: ленивый Query — один проход по индексу жанра, top-k через кучу
+        st.subheader("Подборка книг")
+        from core.query import Query
+        col1, col2, col3 = st.columns(3)
+        genre_id = col1.selectbox("Жанр:", [g.id for g in data.genres], key="query_genre",
+                                  format_func=lambda gid: data.genres_by_id[gid].name)
+        min_avg = col2.slider("Средняя оценка ≥", 0.0, 5.0, 4.0, 0.5, key="query_min_avg")
+        top_n = col3.number_input("Top N", 1, 100, 20, key="query_top_n")
+        with_subgenres = st.checkbox("Включая поджанры", value=True, key="query_recursive")
+        if genre_id:
+            query = (Query(data).genre(genre_id, recursive=with_subgenres)
+                     .avg_ge(min_avg).order_by("avg").limit(int(top_n)))
+            st.caption(" → ".join(query.explain()))
+            st.dataframe([
+                {"id": book_id, "Книга": data.books_by_id[book_id].title, "Средняя": round(avg, 2)}
+                for book_id, avg in query.scored()
+            ], hide_index=True)
+        
+        # Пакетный расчёт для всех пользователей
+        if numpy_available:
+            st.subheader("Пакетные рекомендации")
+            if st.button("Рассчитать для всех пользователей", key="batch_recommendations"):
+                with st.spinner("Считаем..."):
+                    batch = recommend_for_users(None, data, k=10)
+                col1, col2 = st.columns(2)
+                col1.metric("Пользователей", batch.n_users)
+                col2.metric("Пропускная способность", f"{batch.users_per_sec:,.0f} users/s")
+        
+        # Предрасчёт для всех пользователей в пуле процессов (нужен бинарный снимок)
+        st.subheader("Предрасчёт рекомендаций")
+        if not snapshot_file.exists():
+            st.caption("Сначала сохраните снимок во вкладке Data (Save snapshot).")
+        else:
+            workers = st.select_slider("Процессов:", options=[1, 2, 4, 8], value=4, key="precompute_workers")
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("Пересчитать таблицу", key="precompute_table"):
+                    from core.precompute import precompute_recommendations, save_recommendation_table
+                    with st.spinner("Считаем в пуле процессов..."):
+                        result = precompute_recommendations(str(snapshot_file), workers=workers)
+                        save_recommendation_table(result, str(table_file), str(snapshot_file))
+                    st.success(f"✅ {result.n_users} пользователей за {result.elapsed_s:.2f} s "
+                               f"({result.users_per_sec:,.0f} users/s)")
+            with col2:
+                if st.button("Бенчмарк 1/2/4/8 процессов", key="precompute_benchmark"):
+                    from core.precompute import benchmark_precompute
+                    with st.spinner("Измеряем..."):
+                        st.dataframe(benchmark_precompute(str(snapshot_file)))
+        
         # Измерение производительности
         st.subheader("Измерение производительности")
         if st.button("Измерить производительность кэша", key="measure_perf"):
@@ -404,6 +541,104 @@ elif page == "Reports":
                     with col3:
                         st.metric("Ускорение", f"{perf_data['speedup']}x")
 
+elif page == "Search":
+    st.header("🔎 Search")
+    if not DATA:
+        st.info("Перейди во вкладку Data и нажми «Load seed».")
+    else:
+        # Индекс строится один раз на версию каталога и общий для всех сессий
+        index = STORE.entry(st.session_state["DATA_SOURCE"]).derived("search")
+        
+        query = st.text_input("Название книги или текст отзыва:", key="search_query")
+        kind = st.radio("Искать в:", ["all", "book", "review"], horizontal=True, key="search_kind")
+        if query:
+            suggestions = index.complete(query)
+            if suggestions:
+                st.caption("Подсказки: " + ", ".join(suggestions))
+            hits = index.search(query, k=200, kind=None if kind == "all" else kind, prefix=True)
+            if not hits:
+                st.warning("Ничего не найдено")
+            # рендерится только текущая страница, одним блоком markdown
+            lines = []
+            for hit in page_of(hits, "search_page", size=10).items:
+                if hit.kind == "book":
+                    book = DATA.books_by_id[hit.id]
+                    lines.append(f"- 📖 **{book.title}** ({book.year}) — `{hit.id}` · {hit.score:.2f}")
+                else:
+                    review = DATA.reviews_by_id[hit.id]
+                    book = DATA.books_by_id.get(review.book_id)
+                    title = book.title if book else review.book_id
+                    lines.append(f"- 💬 {review.text} — *{title}* · {hit.score:.2f}")
+            if lines:
+                st.markdown("\n".join(lines))
+        
+        # Фасеты: пересечение битовых индексов жанров, тегов и лет (core.bitmap)
+        with st.expander("Фильтр по фасетам"):
+            years = [b.year for b in DATA.books]
+            col1, col2 = st.columns(2)
+            facet_genres = col1.multiselect("Жанры:", [g.id for g in DATA.genres], key="facet_genres",
+                                            format_func=lambda gid: DATA.genres_by_id[gid].name)
+            facet_tags = col2.multiselect("Теги:", [t.id for t in DATA.tags], key="facet_tags",
+                                          format_func=lambda tid: DATA.tags_by_id[tid].name)
+            year_from, year_to = st.slider("Годы:", min(years), max(years), (min(years), max(years)),
+                                           key="facet_years")
+            recursive = st.checkbox("Включая поджанры и подтеги", value=True, key="facet_recursive")
+            found = fn.books_by_facets(DATA, facet_genres, facet_tags, year_from=year_from,
+                                       year_to=year_to, recursive=recursive)
+            lines = [f"- 📖 **{b.title}** ({b.year}) — `{b.id}`" for b in page_of(found, "facet_page").items]
+            if lines:
+                st.markdown("\n".join(lines))
+            else:
+                st.caption("Ничего не найдено")
+        
+        # Похожие книги: MinHash/LSH по жанрам, тегам и авторам
+        try:
+            from core.similar import similar_books
+        except ImportError:
+            similar_books = None
+        if similar_books is not None:
+            st.subheader("Похожие книги")
+            selected = pick("Книга:", st.session_state["DATA_SOURCE"], "book", "similar_book")
+            if selected:
+                st.markdown("\n".join(
+                    f"- 📖 **{DATA.books_by_id[book_id].title}** ({DATA.books_by_id[book_id].year})"
+                    f" — `{book_id}` · {score:.2f}"
+                    for book_id, score in similar_books(DATA, selected)
+                ))
+
+elif page == "Diagnostics":
+    st.header("🩺 Diagnostics")
+    from core import instrument
+    
+    enabled = st.toggle("Собирать метрики", value=instrument.is_enabled(), key="metrics_enabled")
+    instrument.enable(enabled)
+    st.caption("Счётчики вызовов, гистограммы задержек и изменение числа выделенных блоков памяти "
+               "для load_seed, пайплайнов, фильтров и recommend_for_user.")
+    
+    metrics = instrument.snapshot()
+    if not metrics:
+        st.info("Метрик пока нет — включите сбор и поработайте с другими вкладками.")
+    else:
+        st.dataframe([
+            {"call": name, **{k: v for k, v in m.items() if k != "buckets"}}
+            for name, m in metrics.items()
+        ])
+        col1, col2, col3 = st.columns(3)
+        col1.download_button("JSON", instrument.to_json(), file_name="metrics.json", mime="application/json")
+        col2.download_button("Prometheus", instrument.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+        if col3.button("Сбросить", key="metrics_reset"):
+            instrument.REGISTRY.reset()
+            st.rerun()
+    
+    st.subheader("Кэш каталогов")
+    store_stats = STORE.stats()
+    st.write(f"Загрузок: {store_stats['loads']}, попаданий: {store_stats['hits']}")
+    if store_stats["paths"]:
+        st.dataframe([
+            {"path": path, **info, "derived": ", ".join(info["derived"])}
+            for path, info in store_stats["paths"].items()
+        ])
+
 elif page == "Tests":
     st.header("Tests")
     st.write("PYTHONPATH=. pytest -q")
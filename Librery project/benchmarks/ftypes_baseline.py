@@ -0,0 +1,139 @@
+# benchmarks/ftypes_baseline.py
+"""Maybe / Either exactly as they were before the slotted redesign.
+
+Kept unchanged (no ``__slots__``, a new ``Nothing`` per call) outside the
+application package, only as the reference side of
+``core.bench.benchmark_containers``.
+"""
+from typing import TypeVar, Generic, Callable, Any
+
+T = TypeVar('T')
+E = TypeVar('E')
+U = TypeVar('U')
+
+# ========== MAYBE ==========
+
+class Maybe(Generic[T]):
+    """Container for optional values"""
+    
+    @staticmethod
+    def just(value: T) -> 'Just[T]':
+        return Just(value)
+    
+    @staticmethod
+    def nothing() -> 'Nothing':
+        return Nothing()
+    
+    @staticmethod
+    def from_value(value: T | None) -> 'Maybe[T]':
+        return Just(value) if value is not None else Nothing()
+
+class Just(Maybe[T]):
+    def __init__(self, value: T):
+        self._value = value
+    
+    def map(self, fn: Callable[[T], U]) -> 'Maybe[U]':
+        return Just(fn(self._value))
+    
+    def bind(self, fn: Callable[[T], Maybe[U]]) -> Maybe[U]:
+        return fn(self._value)
+    
+    def get_or_else(self, default: T) -> T:
+        return self._value
+    
+    def is_just(self) -> bool:
+        return True
+    
+    def is_nothing(self) -> bool:
+        return False
+    
+    def __eq__(self, other):
+        return isinstance(other, Just) and self._value == other._value
+    
+    def __str__(self):
+        return f"Just({self._value})"
+
+class Nothing(Maybe[Any]):
+    def map(self, fn: Callable[[Any], Any]) -> 'Nothing':
+        return self
+    
+    def bind(self, fn: Callable[[Any], Maybe[Any]]) -> 'Nothing':
+        return self
+    
+    def get_or_else(self, default: T) -> T:
+        return default
+    
+    def is_just(self) -> bool:
+        return False
+    
+    def is_nothing(self) -> bool:
+        return True
+    
+    def __eq__(self, other):
+        return isinstance(other, Nothing)
+    
+    def __str__(self):
+        return "Nothing"
+
+# ========== EITHER ==========
+
+class Either(Generic[E, T]):
+    """Container for operations that can fail"""
+    
+    @staticmethod
+    def right(value: T) -> 'Right[T]':
+        return Right(value)
+    
+    @staticmethod
+    def left(error: E) -> 'Left[E]':
+        return Left(error)
+
+class Right(Either[Any, T]):
+    def __init__(self, value: T):
+        self._value = value
+    
+    def map(self, fn: Callable[[T], U]) -> 'Either[Any, U]':
+        return Right(fn(self._value))
+    
+    def bind(self, fn: Callable[[T], Either[E, U]]) -> 'Either[E, U]':
+        return fn(self._value)
+    
+    def get_or_else(self, default: T) -> T:
+        return self._value
+    
+    def is_right(self) -> bool:
+        return True
+    
+    def is_left(self) -> bool:
+        return False
+    
+    def __eq__(self, other):
+        return isinstance(other, Right) and self._value == other._value
+    
+    def __str__(self):
+        return f"Right({self._value})"
+
+class Left(Either[E, Any]):
+    def __init__(self, error: E):
+        self._error = error
+    
+    def map(self, fn: Callable[[Any], Any]) -> 'Left[E]':
+        return self
+    
+    def bind(self, fn: Callable[[Any], Either[E, Any]]) -> 'Left[E]':
+        return self
+    
+    def get_or_else(self, default: T) -> T:
+        return default
+    
+    def is_right(self) -> bool:
+        return False
+    
+    def is_left(self) -> bool:
+        return True
+    
+    def __eq__(self, other):
+        return isinstance(other, Left) and self._error == other._error
+    
+    def __str__(self):
+        return f"Left({self._error})"
@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+from itertools import chain
+from typing import Dict, Iterable, Iterator, Tuple
+
+from core.domain import BookID, Rating
+from core.persistent import PersistentMap
+
+
+@dataclass(frozen=True, slots=True)
+class RatingStats:
+    """Running count / sum / sum of squares of one book's ratings"""
+    count: int = 0
+    total: int = 0
+    total_sq: int = 0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def variance(self) -> float:
+        if not self.count:
+            return 0.0
+        m = self.total / self.count
+        return max(0.0, self.total_sq / self.count - m * m)
+
+    def add(self, value: int) -> "RatingStats":
+        return RatingStats(self.count + 1, self.total + value, self.total_sq + value * value)
+
+
+EMPTY_STATS = RatingStats()
+
+
+class RatingAggregates:
+    """Per-book rating aggregates, built in one pass; ``add`` returns a new version.
+
+    Immutable like the rating collections, so the cached aggregates of a
+    Catalog or a ``RatingsTable`` always describe the ratings they came from.
+    A new version shares the per-book table with the old one and keeps the
+    changed books in a ``PersistentMap`` (O(log n) per rating), folded into a
+    fresh table once it grows past a fraction of the catalog.
+    """
+    __slots__ = ("_base", "_delta")
+
+    def __init__(self, ratings: Iterable[Rating] = ()):
+        base: Dict[BookID, RatingStats] = {}
+        for r in ratings:
+            base[r.book_id] = base.get(r.book_id, EMPTY_STATS).add(r.value)
+        self._base, self._delta = base, _NO_DELTA
+
+    @classmethod
+    def from_stats(cls, stats: Dict[BookID, RatingStats]) -> "RatingAggregates":
+        return cls._make(dict(stats), _NO_DELTA)
+
+    @classmethod
+    def _make(cls, base: Dict[BookID, RatingStats], delta: PersistentMap) -> "RatingAggregates":
+        agg = cls.__new__(cls)
+        agg._base, agg._delta = base, delta
+        return agg
+
+    def add(self, rating: Rating) -> "RatingAggregates":
+        """Aggregates with ``rating`` included; ``self`` is left unchanged"""
+        delta = self._delta.set(rating.book_id, self.get(rating.book_id).add(rating.value))
+        if len(delta) > _MAX_DELTA + len(self._base) // 16:
+            base = dict(self._base)
+            base.update(delta.items())
+            return self._make(base, _NO_DELTA)
+        return self._make(self._base, delta)
+
+    def get(self, book_id: BookID) -> RatingStats:
+        if self._delta:
+            stats = self._delta.get(book_id)
+            if stats is not None:
+                return stats
+        return self._base.get(book_id, EMPTY_STATS)
+
+    def mean(self, book_id: BookID) -> float:
+        return self.get(book_id).mean
+
+    def items(self) -> Iterator[Tuple[BookID, RatingStats]]:
+        if not self._delta:
+            return iter(self._base.items())
+        delta = self._delta
+        changed = ((b, delta[b]) for b in delta if b not in self._base)
+        return chain(((b, delta.get(b, s)) for b, s in self._base.items()), changed)
+
+    def __contains__(self, book_id: object) -> bool:
+        return book_id in self._base or book_id in self._delta
+
+    def __len__(self) -> int:
+        return len(self._base) + sum(1 for b in self._delta if b not in self._base)
+
+
+_NO_DELTA = PersistentMap()
+_MAX_DELTA = 64  # изменённых книг до слияния в новую таблицу
@@ -0,0 +1,285 @@
+# core/bench.py
+"""Benchmark suite over synthetic catalogs.
+
+Each case is timed with ``perf_counter`` over many calls with varying
+arguments (p50 / p90 / p99 / mean in ms), then run once more under
+``tracemalloc`` for peak memory. Results are plain JSON, so two runs can be
+compared with ``compare_results``::
+
+    PYTHONPATH=. python -m core.bench --sizes 1000 10000 100000 --out bench.json
+    PYTHONPATH=. python -m core.bench --sizes 1000 --out new.json --compare bench.json
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from core.catalog import Catalog
+from core.domain import Rating
+from core.ftypes import Either, Just, Maybe, Right, rating_batch_errors, validate_rating, validate_ratings_all
+from core.functional import book_in_genre_recursive, books_by_facets, books_in_genre_subtree, top_books_by_avg
+from core.instrument import percentile
+from core.memo import RecommendationCache, recommend_for_user
+from core.query import Query
+from core.snapshot import load_snapshot, save_snapshot, touch
+from core.streaming import save_seed
+from core.synthetic import generate_catalog
+from core.transforms import avg_rating_for_book, load_seed
+
+RESULTS_VERSION = 1
+
+
+def measure(fn: Callable[[int], Any], calls: int, warmup: int = 3) -> Dict[str, float]:
+    """Latency percentiles (ms) of ``fn(i)`` for ``i`` in ``range(calls)`` plus peak memory"""
+    for i in range(min(warmup, calls)):
+        fn(i)
+    times = []
+    for i in range(calls):
+        start = time.perf_counter()
+        fn(i)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+
+    # отдельный прогон под tracemalloc — его накладные расходы не попадают в задержки
+    tracemalloc.start()
+    try:
+        fn(0)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "calls": calls,
+        "p50_ms": round(percentile(times, 0.50), 4),
+        "p90_ms": round(percentile(times, 0.90), 4),
+        "p99_ms": round(percentile(times, 0.99), 4),
+        "mean_ms": round(statistics.fmean(times), 4),
+        "min_ms": round(times[0], 4),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def _cases(catalog: Catalog, seed_path: str, rnd: random.Random, calls: int,
+           snapshot_path: Optional[str] = None) -> Dict[str, tuple]:
+    """name -> (fn(i), number of calls)"""
+    books = [b.id for b in catalog.books]
+    active_users = list(catalog.ratings_by_user)
+    genres = [g.id for g in catalog.genres]
+    roots = [g.id for g in catalog.genres if g.parent_id is None]
+    sample_books = [rnd.choice(books) for _ in range(calls)]
+    sample_users = [rnd.choice(active_users) for _ in range(calls)]
+    sample_genres = [rnd.choice(genres) for _ in range(calls)]
+    new_ratings = [Rating(rnd.choice(active_users), rnd.choice(books), rnd.randint(1, 5)) for _ in range(calls)]
+    ratings_tuple = catalog.ratings
+    heavy = max(1, calls // 10)  # дорогие операции над всем каталогом — меньше вызовов
+
+    loads = max(3, calls // 50)
+    cases = {
+        # индексы каталога ленивые: *.ready — загрузка плюс разделы и основные индексы
+        "load_seed": (lambda i: load_seed(seed_path), loads),
+        "load_seed.ready": (lambda i: touch(load_seed(seed_path)), loads),
+        "avg_rating_for_book.tuple": (lambda i: avg_rating_for_book(ratings_tuple, sample_books[i]), heavy),
+        "avg_rating_for_book.catalog": (lambda i: avg_rating_for_book(catalog, sample_books[i]), calls),
+        "top_books_by_avg": (lambda i: top_books_by_avg(catalog, catalog, 10), heavy),
+        "validate_rating": (lambda i: validate_rating(new_ratings[i], catalog, catalog, catalog), calls),
+        # свежий кэш на каждый вызов — измеряется расчёт, а не попадания в кэш
+        "recommend_for_user": (
+            lambda i: recommend_for_user(sample_users[i], catalog, catalog, RecommendationCache()), heavy,
+        ),
+        "book_in_genre_recursive": (
+            lambda i: book_in_genre_recursive(catalog.books[i % len(books)], catalog, sample_genres[i]), calls,
+        ),
+        "books_in_genre_subtree": (lambda i: books_in_genre_subtree(catalog, catalog, roots[i % len(roots)]), heavy),
+        "books_by_facets": (
+            lambda i: books_by_facets(catalog, [sample_genres[i]], year_from=1950, year_to=1990,
+                                      exclude_authors=[catalog.authors[0].id]), calls,
+        ),
+        "query.genre_avg_top": (
+            lambda i: Query(catalog).genre(roots[i % len(roots)], recursive=True)
+            .avg_ge(3.5).order_by("avg").limit(20).scored(), heavy,
+        ),
+    }
+    if snapshot_path is not None:
+        cases["load_snapshot"] = (lambda i: load_snapshot(snapshot_path), loads)
+        cases["load_snapshot.ready"] = (lambda i: touch(load_snapshot(snapshot_path)), loads)
+    return cases
+
+
+def run_benchmarks(sizes: Sequence[int] = (1_000, 10_000, 100_000), seed: int = 0, calls: int = 200,
+                   only: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    results: Dict[str, Any] = {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": seed,
+        "sizes": {},
+    }
+    for n in sizes:
+        started = time.perf_counter()
+        catalog = generate_catalog(n, seed=seed)
+        generated_s = time.perf_counter() - started
+        with tempfile.TemporaryDirectory() as tmp:
+            seed_path = str(Path(tmp) / "seed.json")
+            snapshot_path = str(Path(tmp) / "seed.snapshot")
+            save_seed(catalog, seed_path)
+            save_snapshot(catalog, snapshot_path)
+            cases = _cases(catalog, seed_path, random.Random(seed), calls, snapshot_path)
+            entry: Dict[str, Any] = {
+                "counts": {section: len(catalog[section]) for section in catalog},
+                "generate_s": round(generated_s, 3),
+                "seed_bytes": Path(seed_path).stat().st_size,
+                "cases": {},
+            }
+            for name, (fn, n_calls) in cases.items():
+                if only and name not in only:
+                    continue
+                entry["cases"][name] = measure(fn, n_calls)
+        results["sizes"][str(n)] = entry
+    return results
+
+
+# ---------- Maybe / Either: накладные расходы на запись ----------
+# Эталон — прежние контейнеры без изменений (benchmarks.ftypes_baseline, вне пакета core).
+
+def _per_op_ns(fn: Callable[[], Any], ops: int, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best / ops * 1e9, 1)
+
+
+def benchmark_containers(n: int = 10_000, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """Per-record cost of the baseline Maybe/Either vs the slotted ones and batch helpers.
+
+    Timing rows hold ``baseline_ns`` / ``new_ns`` per record; the
+    ``instance size`` row holds ``baseline_bytes`` / ``new_bytes``. Both sides
+    of the validation row run the same checks, so only container cost differs.
+    """
+    from benchmarks import ftypes_baseline as baseline
+
+    rnd = random.Random(seed)
+    catalog = generate_catalog(max(n, 1_000), seed=seed)
+    users, books = [u.id for u in catalog.users], [b.id for b in catalog.books]
+    batch = [Rating(rnd.choice(users), rnd.choice(books), rnd.randint(0, 6)) for _ in range(n)]
+    items = list(range(n))
+
+    def baseline_chain():
+        for x in items:
+            baseline.Just(x).map(lambda v: v + 1).bind(lambda v: baseline.Just(v))
+            baseline.Maybe.nothing()
+
+    def slotted_chain():
+        for x in items:
+            Just(x).map(lambda v: v + 1).bind(lambda v: Just(v))
+            Maybe.nothing()
+
+    def baseline_collect():
+        # без traverse: контейнер на каждый элемент и цепочка bind для накопления
+        acc = baseline.Right([])
+        for x in items:
+            acc = acc.bind(lambda xs, x=x: baseline.Right(x).map(lambda v: (xs.append(v), xs)[1]))
+        return acc
+
+    def slotted_traverse():
+        return Either.traverse(items, Right)
+
+    def baseline_validate():
+        # Left/Right прежних классов на каждую строку, ошибки собираются вручную
+        report = [baseline.Left(errors) if errors else baseline.Right(rating)
+                  for rating, errors in rating_batch_errors(batch, catalog, catalog, catalog)]
+        return [(i, e._error) for i, e in enumerate(report) if e.is_left()]
+
+    def validated_batch():
+        return validate_ratings_all(batch, catalog, catalog, catalog)
+
+    rows = {
+        "map+bind+nothing": (baseline_chain, slotted_chain),
+        "collect n values": (baseline_collect, slotted_traverse),
+        "validate n ratings": (baseline_validate, validated_batch),
+    }
+    results: Dict[str, Dict[str, float]] = {}
+    for name, (old, new) in rows.items():
+        before, after = _per_op_ns(old, n), _per_op_ns(new, n)
+        results[name] = {"baseline_ns": before, "new_ns": after,
+                         "speedup": round(before / after, 2) if after else 0.0}
+    old_just = baseline.Just(1)
+    results["instance size"] = {
+        "baseline_bytes": sys.getsizeof(old_just) + sys.getsizeof(old_just.__dict__),
+        "new_bytes": sys.getsizeof(Just(1)),
+    }
+    return results
+
+
+def save_results(results: Dict[str, Any], path: str) -> None:
+    Path(path).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def compare_results(old: Dict[str, Any], new: Dict[str, Any], metric: str = "p50_ms",
+                    threshold: float = 1.2) -> List[Dict[str, Any]]:
+    """Cases present in both runs whose ``metric`` grew by more than ``threshold``x"""
+    regressions = []
+    for size, entry in new["sizes"].items():
+        old_cases = old.get("sizes", {}).get(size, {}).get("cases", {})
+        for name, stats in entry["cases"].items():
+            before = old_cases.get(name, {}).get(metric)
+            if before and stats[metric] / before > threshold:
+                regressions.append({
+                    "size": size, "case": name, "metric": metric,
+                    "old": before, "new": stats[metric], "ratio": round(stats[metric] / before, 2),
+                })
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Library core benchmarks on synthetic catalogs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="number of ratings per catalog (10^3 ... 10^7)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--only", nargs="*", help="run only these cases")
+    parser.add_argument("--out", default="bench.json")
+    parser.add_argument("--compare", help="previous results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    parser.add_argument("--containers", action="store_true",
+                        help="only the Maybe/Either per-record microbenchmark")
+    args = parser.parse_args(argv)
+
+    if args.containers:
+        for name, row in benchmark_containers(args.calls * 50, args.seed).items():
+            if "baseline_bytes" in row:
+                print(f"  {name:24} baseline {row['baseline_bytes']:>8} B    new {row['new_bytes']:>8} B")
+            else:
+                print(f"  {name:24} baseline {row['baseline_ns']:>8} ns   new {row['new_ns']:>8} ns   "
+                      f"x{row['speedup']}")
+        return 0
+
+    results = run_benchmarks(args.sizes, args.seed, args.calls, args.only)
+    save_results(results, args.out)
+    for size, entry in results["sizes"].items():
+        print(f"== {size} ratings ==")
+        for name, stats in entry["cases"].items():
+            print(f"  {name:32} p50 {stats['p50_ms']:>10.3f} ms   p99 {stats['p99_ms']:>10.3f} ms   "
+                  f"peak {stats['peak_kib']:>10.1f} KiB")
+    if args.compare:
+        regressions = compare_results(load_results(args.compare), results, threshold=args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['size']} {r['case']}: {r['old']} -> {r['new']} ms ({r['ratio']}x)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+# core/bitmap.py
+"""Roaring-style compressed bitmaps and facet indexes over book ordinals.
+
+A ``Bitmap`` splits 32-bit ordinals into 65536-wide chunks keyed by the high
+16 bits. A chunk with at most ``ARRAY_MAX`` members is a sorted tuple of low
+bits (array container); a denser chunk is one Python ``int`` used as a
+65536-bit set (bitmap container), so AND / OR / ANDNOT of dense chunks are
+single big-int operations. Pure Python, no NumPy.
+
+``FacetIndex`` maps every genre, tag, author and publication year to the
+bitmap of book positions, so a multi-facet filter such as "genre g3 AND
+tag t7 AND 1950 <= year <= 1990 AND NOT author a2" is a handful of bitmap
+operations followed by one slice of the result.
+"""
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from core.catalog import Books, Catalog, Genres, Tags, all_books, genre_tree, per_catalog, tag_tree
+from core.domain import Book
+from core.hierarchy import Hierarchy
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+LOW_MASK = CHUNK_SIZE - 1
+ARRAY_MAX = 4096           # как в Roaring: выше — плотный контейнер
+_CHUNK_BYTES = CHUNK_SIZE // 8
+
+Container = Union[Tuple[int, ...], int]
+
+
+# ---------- Контейнеры ----------
+
+def _array_to_bits(values: Tuple[int, ...]) -> int:
+    buf = bytearray(_CHUNK_BYTES)
+    for v in values:
+        buf[v >> 3] |= 1 << (v & 7)
+    return int.from_bytes(buf, "little")
+
+
+# позиции установленных битов для каждого значения байта
+_BYTE_BITS = tuple(tuple(j for j in range(8) if byte >> j & 1) for byte in range(256))
+
+
+def _bits_to_array(bits: int) -> Tuple[int, ...]:
+    out: List[int] = []
+    for i, byte in enumerate(bits.to_bytes(_CHUNK_BYTES, "little")):
+        if byte:
+            base = i << 3
+            out.extend(base | j for j in _BYTE_BITS[byte])
+    return tuple(out)
+
+
+def _as_bits(c: Container) -> int:
+    return c if isinstance(c, int) else _array_to_bits(c)
+
+
+def _compact(bits: int) -> Optional[Container]:
+    """Pick the container for a chunk; None when it is empty"""
+    n = bits.bit_count()
+    if not n:
+        return None
+    return _bits_to_array(bits) if n <= ARRAY_MAX else bits
+
+
+def _filter(values: Tuple[int, ...], bits: int, keep: bool) -> Tuple[int, ...]:
+    raw = bits.to_bytes(_CHUNK_BYTES, "little")
+    return tuple(v for v in values if bool(raw[v >> 3] >> (v & 7) & 1) is keep)
+
+
+def _and(a: Container, b: Container) -> Optional[Container]:
+    if isinstance(a, int) and isinstance(b, int):
+        return _compact(a & b)
+    if isinstance(a, int):
+        a, b = b, a
+    if isinstance(b, int):
+        return _filter(a, b, True) or None
+    small, big = (a, b) if len(a) <= len(b) else (b, a)
+    other = set(big)
+    return tuple(v for v in small if v in other) or None
+
+
+def _or(a: Container, b: Container) -> Container:
+    if isinstance(a, tuple) and isinstance(b, tuple) and len(a) + len(b) <= ARRAY_MAX:
+        return tuple(sorted(set(a).union(b)))
+    return _compact(_as_bits(a) | _as_bits(b))
+
+
+def _andnot(a: Container, b: Container) -> Optional[Container]:
+    if isinstance(a, tuple):
+        if isinstance(b, int):
+            return _filter(a, b, False) or None
+        drop = set(b)
+        return tuple(v for v in a if v not in drop) or None
+    return _compact(a & ~_as_bits(b))
+
+
+def _len(c: Container) -> int:
+    return c.bit_count() if isinstance(c, int) else len(c)
+
+
+# ---------- Bitmap ----------
+
+class Bitmap:
+    """Immutable compressed set of non-negative ints (book ordinals)"""
+    __slots__ = ("_chunks", "_len")
+
+    def __init__(self, values: Iterable[int] = ()):
+        groups: Dict[int, List[int]] = {}
+        for v in values:
+            groups.setdefault(v >> CHUNK_BITS, []).append(v & LOW_MASK)
+        chunks = {}
+        for high in sorted(groups):
+            lows = tuple(sorted(set(groups[high])))
+            chunks[high] = lows if len(lows) <= ARRAY_MAX else _array_to_bits(lows)
+        self._chunks: Dict[int, Container] = chunks
+        self._len = sum(map(_len, chunks.values()))
+
+    @classmethod
+    def _from_chunks(cls, chunks: Dict[int, Container]) -> "Bitmap":
+        bm = cls.__new__(cls)
+        bm._chunks = chunks
+        bm._len = sum(map(_len, chunks.values()))
+        return bm
+
+    @classmethod
+    def range(cls, n: int) -> "Bitmap":
+        """All ordinals ``0 .. n-1``"""
+        chunks: Dict[int, Container] = {}
+        for high in range(-(-n // CHUNK_SIZE)):
+            width = min(CHUNK_SIZE, n - high * CHUNK_SIZE)
+            chunks[high] = tuple(range(width)) if width <= ARRAY_MAX else (1 << width) - 1
+        return cls._from_chunks(chunks)
+
+    @classmethod
+    def union_all(cls, bitmaps: Iterable["Bitmap"]) -> "Bitmap":
+        """Multi-way OR: array chunks are set in one buffer, dense chunks OR-ed as ints"""
+        bitmaps = list(bitmaps)
+        if len(bitmaps) <= 1:
+            return bitmaps[0] if bitmaps else EMPTY
+        dense: Dict[int, int] = {}
+        sparse: Dict[int, bytearray] = {}
+        for bm in bitmaps:
+            for high, c in bm._chunks.items():
+                if isinstance(c, int):
+                    dense[high] = dense.get(high, 0) | c
+                else:
+                    buf = sparse.get(high)
+                    if buf is None:
+                        buf = sparse[high] = bytearray(_CHUNK_BYTES)
+                    for v in c:
+                        buf[v >> 3] |= 1 << (v & 7)
+        chunks = {}
+        for high in sorted(dense.keys() | sparse.keys()):
+            bits = dense.get(high, 0)
+            if high in sparse:
+                bits |= int.from_bytes(sparse[high], "little")
+            c = _compact(bits)
+            if c is not None:
+                chunks[high] = c
+        return cls._from_chunks(chunks)
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        chunks = {}
+        for high, c in self._chunks.items():
+            o = other._chunks.get(high)
+            if o is not None:
+                r = _and(c, o)
+                if r is not None:
+                    chunks[high] = r
+        return Bitmap._from_chunks(chunks)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        chunks = dict(self._chunks)
+        for high, o in other._chunks.items():
+            c = chunks.get(high)
+            chunks[high] = o if c is None else _or(c, o)
+        return Bitmap._from_chunks(dict(sorted(chunks.items())))
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        chunks = {}
+        for high, c in self._chunks.items():
+            o = other._chunks.get(high)
+            r = c if o is None else _andnot(c, o)
+            if r is not None:
+                chunks[high] = r
+        return Bitmap._from_chunks(chunks)
+
+    andnot = __sub__
+
+    def dense(self) -> "Bitmap":
+        """Same set with every chunk as a bitset: larger, but fastest to OR repeatedly"""
+        return Bitmap._from_chunks({high: _as_bits(c) for high, c in self._chunks.items()})
+
+    def __contains__(self, value: object) -> bool:
+        if not isinstance(value, int) or value < 0:
+            return False
+        c = self._chunks.get(value >> CHUNK_BITS)
+        if c is None:
+            return False
+        low = value & LOW_MASK
+        if isinstance(c, int):
+            return bool(c >> low & 1)
+        i = bisect_left(c, low)
+        return i < len(c) and c[i] == low
+
+    def __iter__(self) -> Iterator[int]:
+        for high, c in self._chunks.items():
+            base = high << CHUNK_BITS
+            for low in (_bits_to_array(c) if isinstance(c, int) else c):
+                yield base | low
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __bool__(self) -> bool:
+        return self._len > 0
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Bitmap):
+            return NotImplemented
+        return self._len == other._len and list(self) == list(other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"Bitmap(len={self._len}, chunks={len(self._chunks)})"
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate payload size: 2 bytes per array entry, 8 KiB per dense chunk"""
+        return sum(_CHUNK_BYTES if isinstance(c, int) else 2 * len(c) for c in self._chunks.values())
+
+
+EMPTY = Bitmap()
+
+
+# ---------- Фасетный индекс книг ----------
+
+def _postings(books: Tuple[Book, ...], keys) -> Dict[str, Bitmap]:
+    groups: Dict[str, List[int]] = {}
+    for i, b in enumerate(books):
+        for k in keys(b):
+            groups.setdefault(k, []).append(i)
+    return {k: Bitmap(v) for k, v in groups.items()}
+
+
+class FacetIndex:
+    """Bitmaps of book positions per genre, tag, author and year"""
+    __slots__ = ("books", "universe", "by_genre", "by_tag", "by_author", "by_year", "by_decade",
+                 "_years", "_genre_tree", "_tag_tree")
+
+    def __init__(self, books: Tuple[Book, ...], genres: Optional[Hierarchy] = None,
+                 tags: Optional[Hierarchy] = None):
+        self.books = books
+        self.universe = Bitmap.range(len(books))
+        self.by_genre = _postings(books, lambda b: b.genres)
+        self.by_tag = _postings(books, lambda b: b.tags)
+        self.by_author = _postings(books, lambda b: b.author_ids)
+        self.by_year = _postings(books, lambda b: (b.year,))
+        self._years = sorted(self.by_year)
+        # десятилетия — диапазон лет собирается из нескольких плотных битмапов, а не из сотни мелких
+        self.by_decade = {
+            d: Bitmap.union_all(self.by_year[y] for y in self._years if y // 10 == d).dense()
+            for d in {y // 10 for y in self._years}
+        }
+        self._genre_tree = genres
+        self._tag_tree = tags
+
+    def _subtree(self, postings: Dict[str, Bitmap], tree: Optional[Hierarchy], key: str,
+                 recursive: bool, kind: str) -> Bitmap:
+        if not recursive:
+            return postings.get(key, EMPTY)
+        if tree is None:
+            raise ValueError(f"recursive {kind} facet needs the {kind} hierarchy")
+        return Bitmap.union_all(postings[k] for k in tree.subtree(key) if k in postings)
+
+    def genre(self, genre_id: str, recursive: bool = False) -> Bitmap:
+        return self._subtree(self.by_genre, self._genre_tree, genre_id, recursive, "genre")
+
+    def tag(self, tag_id: str, recursive: bool = False) -> Bitmap:
+        return self._subtree(self.by_tag, self._tag_tree, tag_id, recursive, "tag")
+
+    def author(self, author_id: str) -> Bitmap:
+        return self.by_author.get(author_id, EMPTY)
+
+    def years(self, lo: Optional[int] = None, hi: Optional[int] = None) -> Bitmap:
+        """Books with ``lo <= year <= hi`` (open bounds allowed)"""
+        start = 0 if lo is None else bisect_left(self._years, lo)
+        stop = len(self._years) if hi is None else bisect_right(self._years, hi)
+        if start == 0 and stop == len(self._years):
+            return self.universe
+        years = self._years[start:stop]
+        if not years:
+            return EMPTY
+        first, last = years[0], years[-1]
+        parts = []
+        decades = set()
+        for y in years:
+            d = y // 10
+            # целое десятилетие внутри диапазона берём одним битмапом — один раз, по первому его году
+            if first <= d * 10 and d * 10 + 9 <= last:
+                if d not in decades:
+                    decades.add(d)
+                    parts.append(self.by_decade[d])
+            else:
+                parts.append(self.by_year[y])
+        return Bitmap.union_all(parts)
+
+    def within_years(self, bitmap: Bitmap, lo: Optional[int] = None, hi: Optional[int] = None) -> Bitmap:
+        """``bitmap & years(lo, hi)``; a small ``bitmap`` is filtered book by book instead"""
+        if lo is None and hi is None:
+            return bitmap
+        if len(bitmap) > ARRAY_MAX:
+            return bitmap & self.years(lo, hi)
+        books = self.books
+        return Bitmap(i for i in bitmap
+                      if (lo is None or books[i].year >= lo) and (hi is None or books[i].year <= hi))
+
+    def any_of(self, facet: str, keys: Iterable[str], recursive: bool = False) -> Bitmap:
+        """OR of one facet's bitmaps (``facet`` is genre / tag / author)"""
+        if facet == "author":
+            return Bitmap.union_all(self.author(k) for k in keys)
+        lookup = self.genre if facet == "genre" else self.tag
+        return Bitmap.union_all(lookup(k, recursive) for k in keys)
+
+    def select(self, bitmap: Bitmap) -> Tuple[Book, ...]:
+        """Books of ``bitmap`` in catalog order"""
+        books = self.books
+        return tuple(books[i] for i in bitmap)
+
+
+def build_facet_index(books: Books, genres: Optional[Genres] = None, tags: Optional[Tags] = None) -> FacetIndex:
+    if isinstance(books, Catalog):
+        genres = books if genres is None else genres
+        tags = books if tags is None else tags
+    return FacetIndex(
+        all_books(books),
+        genre_tree(genres) if genres is not None else None,
+        tag_tree(tags) if tags is not None else None,
+    )
+
+
+@per_catalog
+def facet_index(books: Books) -> FacetIndex:
+    """``build_facet_index`` cached per Catalog (tuples are indexed every call)"""
+    return build_facet_index(books)
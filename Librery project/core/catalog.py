@@ -0,0 +1,356 @@
+import threading
+import weakref
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Tuple, Dict, Optional, Union, Iterator, Any, Callable, Container
+
+from core.domain import (
+    Author, Book, User, Rating, Review, Loan, Tag, Genre,
+    BookID, UserID, AuthorID, TagID, GenreID,
+)
+from core.aggregates import RatingAggregates
+from core.ratings_table import RatingsTable
+from core.hierarchy import Hierarchy, GenreTree, TagTree, build_hierarchy
+from core.persistent import PersistentVector, SideTable
+
+SECTIONS = ("authors", "books", "users", "ratings", "reviews", "loans", "tags", "genres")
+
+
+def _by_id(items) -> Dict[str, Any]:
+    return {x.id: x for x in items}
+
+
+def _group(items, key) -> Dict[str, Tuple[Any, ...]]:
+    groups: Dict[str, list] = {}
+    for x in items:
+        groups.setdefault(key(x), []).append(x)
+    return {k: tuple(v) for k, v in groups.items()}
+
+
+def _group_many(books: Tuple[Book, ...], keys) -> Dict[str, Tuple[Book, ...]]:
+    groups: Dict[str, list] = {}
+    for b in books:
+        # dict.fromkeys — книга попадает в группу один раз даже при повторах в кортеже
+        for k in dict.fromkeys(keys(b)):
+            groups.setdefault(k, []).append(b)
+    return {k: tuple(v) for k, v in groups.items()}
+
+
+@dataclass(frozen=True, slots=True, eq=False, weakref_slot=True)
+class Catalog(Mapping):
+    """Immutable dataset with hash indexes, each built once on first access.
+
+    Behaves like the ``load_seed`` dict (``catalog["books"]``, ``.items()``)
+    so existing callers keep working, while lookups go through the indexes.
+    ``ratings`` may be a columnar ``RatingsTable``; ``Catalog.lazy`` also
+    defers the sections themselves (used by ``load_snapshot``).
+    """
+    authors: Tuple[Author, ...] = ()
+    books: Tuple[Book, ...] = ()
+    users: Tuple[User, ...] = ()
+    ratings: Union[Tuple[Rating, ...], RatingsTable] = ()
+    reviews: Tuple[Review, ...] = ()
+    loans: Tuple[Loan, ...] = ()
+    tags: Tuple[Tag, ...] = ()
+    genres: Tuple[Genre, ...] = ()
+
+    # Первичные индексы (id -> сущность)
+    authors_by_id: Dict[AuthorID, Author] = field(init=False, repr=False)
+    books_by_id: Dict[BookID, Book] = field(init=False, repr=False)
+    users_by_id: Dict[UserID, User] = field(init=False, repr=False)
+    reviews_by_id: Dict[str, Review] = field(init=False, repr=False)
+    loans_by_id: Dict[str, Loan] = field(init=False, repr=False)
+    tags_by_id: Dict[TagID, Tag] = field(init=False, repr=False)
+    genres_by_id: Dict[GenreID, Genre] = field(init=False, repr=False)
+
+    # Вторичные индексы (ключ -> кортеж сущностей в исходном порядке)
+    # для RatingsTable — RatingGroups: номера строк, Rating создаются при обращении
+    ratings_by_user: Mapping[UserID, Tuple[Rating, ...]] = field(init=False, repr=False)
+    ratings_by_book: Mapping[BookID, Tuple[Rating, ...]] = field(init=False, repr=False)
+    loans_by_user: Dict[UserID, Tuple[Loan, ...]] = field(init=False, repr=False)
+    reviews_by_book: Dict[BookID, Tuple[Review, ...]] = field(init=False, repr=False)
+    books_by_genre: Dict[GenreID, Tuple[Book, ...]] = field(init=False, repr=False)
+    books_by_tag: Dict[TagID, Tuple[Book, ...]] = field(init=False, repr=False)
+    books_by_author: Dict[AuthorID, Tuple[Book, ...]] = field(init=False, repr=False)
+
+    # Порядковые номера книг (id -> позиция первого вхождения в books)
+    book_ordinals: Dict[BookID, int] = field(init=False, repr=False)
+
+    # Агрегаты оценок по книгам (count / sum / sum of squares)
+    rating_stats: RatingAggregates = field(init=False, repr=False)
+
+    # Иерархии жанров и тегов с предвычисленными замыканиями
+    genre_tree: GenreTree = field(init=False, repr=False)
+    tag_tree: TagTree = field(init=False, repr=False)
+
+    # Загрузчики разделов для ленивого каталога (см. ``Catalog.lazy``)
+    _loaders: Optional[Dict[str, Callable[[], Any]]] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        put = object.__setattr__
+        for name in SECTIONS:
+            put(self, name, _section(getattr(self, name)))
+
+    @classmethod
+    def lazy(cls, loaders: Dict[str, Callable[[], Any]]) -> "Catalog":
+        """Catalog whose sections come from ``loaders`` on first access (missing ones are empty)"""
+        catalog = object.__new__(cls)
+        object.__setattr__(catalog, "_loaders", dict(loaders))
+        return catalog
+
+    def __getattr__(self, name: str) -> Any:
+        # вызывается только для ещё не заполненных слотов: разделы ленивого каталога и индексы
+        if name not in SECTIONS and name not in _INDEXES:
+            raise AttributeError(name)
+        with _LAZY_LOCK:
+            try:
+                return object.__getattribute__(self, name)   # другой поток уже построил
+            except AttributeError:
+                pass
+            if name in SECTIONS:
+                loader = (self._loaders or {}).get(name)
+                value = _section(loader() if loader is not None else ())
+            else:
+                value = _INDEXES[name](self)
+            object.__setattr__(self, name, value)
+            return value
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # индексы и загрузчики не сериализуются — индексы строятся заново по запросу
+        return {name: getattr(self, name) for name in SECTIONS}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        object.__setattr__(self, "_loaders", None)
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    # Каталог неизменяем, поэтому равенство и хэш — по идентичности (O(1) для кэшей по каталогу)
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def __getitem__(self, key: str) -> Tuple[Any, ...]:
+        if key not in SECTIONS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(SECTIONS)
+
+    def __len__(self) -> int:
+        return len(SECTIONS)
+
+
+def _section(items: Any) -> Any:
+    # колоночные оценки остаются RatingsTable, остальное — кортежи
+    return items if isinstance(items, RatingsTable) else tuple(items)
+
+
+def _rating_stats(c: Catalog) -> RatingAggregates:
+    return c.ratings.aggregates() if isinstance(c.ratings, RatingsTable) else RatingAggregates(c.ratings)
+
+
+def _ratings_by(c: Catalog, by: str) -> Mapping[str, Tuple[Rating, ...]]:
+    if isinstance(c.ratings, RatingsTable):
+        return c.ratings.grouped(by)
+    return _group(c.ratings, (lambda r: r.user_id) if by == "user" else (lambda r: r.book_id))
+
+
+def _book_ordinals(c: Catalog) -> Dict[BookID, int]:
+    ordinals: Dict[BookID, int] = {}
+    for i, b in enumerate(c.books):
+        ordinals.setdefault(b.id, i)
+    return ordinals
+
+
+# Индексы строятся при первом обращении: загрузка каталога (особенно из снимка) их не ждёт
+_INDEXES: Dict[str, Callable[[Catalog], Any]] = {
+    "authors_by_id": lambda c: _by_id(c.authors),
+    "books_by_id": lambda c: _by_id(c.books),
+    "users_by_id": lambda c: _by_id(c.users),
+    "reviews_by_id": lambda c: _by_id(c.reviews),
+    "loans_by_id": lambda c: _by_id(c.loans),
+    "tags_by_id": lambda c: _by_id(c.tags),
+    "genres_by_id": lambda c: _by_id(c.genres),
+    "ratings_by_user": lambda c: _ratings_by(c, "user"),
+    "ratings_by_book": lambda c: _ratings_by(c, "book"),
+    "loans_by_user": lambda c: _group(c.loans, lambda l: l.user_id),
+    "reviews_by_book": lambda c: _group(c.reviews, lambda rv: rv.book_id),
+    "books_by_genre": lambda c: _group_many(c.books, lambda b: b.genres),
+    "books_by_tag": lambda c: _group_many(c.books, lambda b: b.tags),
+    "books_by_author": lambda c: _group_many(c.books, lambda b: b.author_ids),
+    "book_ordinals": _book_ordinals,
+    "rating_stats": _rating_stats,
+    "genre_tree": lambda c: build_hierarchy(c.genres),
+    "tag_tree": lambda c: build_hierarchy(c.tags),
+}
+_LAZY_LOCK = threading.RLock()
+
+
+
+def per_catalog(build: Callable[..., Any]) -> Callable[..., Any]:
+    """Cache ``build(catalog)`` per Catalog instance.
+
+    Catalogs are held by weak references, so a dropped or reloaded catalog
+    takes its value with it; tuples are never hashed and are built every call.
+    """
+    values: "weakref.WeakKeyDictionary[Catalog, Any]" = weakref.WeakKeyDictionary()
+    lock = threading.RLock()
+
+    @wraps(build)
+    def cached(source: Any) -> Any:
+        if not isinstance(source, Catalog):
+            return build(source)
+        value = values.get(source)
+        if value is None:
+            with lock:
+                value = values.get(source)
+                if value is None:
+                    value = values[source] = build(source)
+        return value
+
+    return cached
+
+# ---------- Поиск: кортеж или Catalog ----------
+# Функции ядра принимают либо исходные кортежи (линейный поиск), либо Catalog (O(1)).
+# Оценки также могут храниться колоночно в RatingsTable, а оценки, отзывы и выдачи —
+# в PersistentVector (добавление без копирования всего кортежа).
+
+Books = Union[Tuple[Book, ...], Catalog]
+Users = Union[Tuple[User, ...], Catalog]
+Ratings = Union[Tuple[Rating, ...], Catalog, RatingsTable, PersistentVector]
+Reviews = Union[Tuple[Review, ...], Catalog, PersistentVector]
+Loans = Union[Tuple[Loan, ...], Catalog, PersistentVector]
+Genres = Union[Tuple[Genre, ...], Catalog, Hierarchy]
+Tags = Union[Tuple[Tag, ...], Catalog, Hierarchy]
+RatingSource = Union[Tuple[Rating, ...], Catalog, RatingsTable, PersistentVector, RatingAggregates]
+
+
+def all_books(books: Books) -> Tuple[Book, ...]:
+    return books.books if isinstance(books, Catalog) else books
+
+
+def all_ratings(ratings: Ratings) -> Union[Tuple[Rating, ...], RatingsTable]:
+    return ratings.ratings if isinstance(ratings, Catalog) else ratings
+
+
+def all_reviews(reviews: Reviews) -> Tuple[Review, ...]:
+    return reviews.reviews if isinstance(reviews, Catalog) else reviews
+
+
+def all_loans(loans: Loans) -> Tuple[Loan, ...]:
+    return loans.loans if isinstance(loans, Catalog) else loans
+
+
+# Агрегаты, поддерживаемые вместе с версией PersistentVector оценок (см. transforms.add_rating)
+_VECTOR_STATS = SideTable()
+
+
+def attach_aggregates(ratings: PersistentVector, stats: RatingAggregates) -> PersistentVector:
+    _VECTOR_STATS.set(ratings, stats)
+    return ratings
+
+
+def rating_aggregates(ratings: RatingSource) -> Optional[RatingAggregates]:
+    if isinstance(ratings, Catalog):
+        return ratings.rating_stats
+    if isinstance(ratings, RatingsTable):
+        return ratings.aggregates()
+    if isinstance(ratings, PersistentVector):
+        return _VECTOR_STATS.get(ratings)
+    return ratings if isinstance(ratings, RatingAggregates) else None
+
+
+def genre_tree(genres: Genres) -> GenreTree:
+    if isinstance(genres, Catalog):
+        return genres.genre_tree
+    return genres if isinstance(genres, Hierarchy) else build_hierarchy(genres)
+
+
+def tag_tree(tags: Tags) -> TagTree:
+    if isinstance(tags, Catalog):
+        return tags.tag_tree
+    return tags if isinstance(tags, Hierarchy) else build_hierarchy(tags)
+
+
+def book_ids(books: Books) -> Container[BookID]:
+    """Set-like view of book ids for bulk membership checks"""
+    return books.books_by_id if isinstance(books, Catalog) else {b.id for b in books}
+
+
+def user_ids(users: Users) -> Container[UserID]:
+    return users.users_by_id if isinstance(users, Catalog) else {u.id for u in users}
+
+
+def rated_pairs(ratings: Ratings) -> Callable[[UserID, BookID], bool]:
+    """Duplicate check for many (user, book) pairs; builds a set once for tuples"""
+    if isinstance(ratings, (Catalog, RatingsTable)):
+        return lambda user_id, book_id: has_rating(ratings, user_id, book_id)
+    pairs = {(r.user_id, r.book_id) for r in ratings}
+    return lambda user_id, book_id: (user_id, book_id) in pairs
+
+
+def book_by_id(books: Books, book_id: BookID) -> Optional[Book]:
+    if isinstance(books, Catalog):
+        return books.books_by_id.get(book_id)
+    return next((b for b in books if b.id == book_id), None)
+
+
+def user_by_id(users: Users, user_id: UserID) -> Optional[User]:
+    if isinstance(users, Catalog):
+        return users.users_by_id.get(user_id)
+    return next((u for u in users if u.id == user_id), None)
+
+
+def user_ratings(ratings: Ratings, user_id: UserID) -> Tuple[Rating, ...]:
+    if isinstance(ratings, Catalog):
+        return ratings.ratings_by_user.get(user_id, ())
+    if isinstance(ratings, RatingsTable):
+        return ratings.for_user(user_id)
+    return tuple(r for r in ratings if r.user_id == user_id)
+
+
+def book_ratings(ratings: Ratings, book_id: BookID) -> Tuple[Rating, ...]:
+    if isinstance(ratings, Catalog):
+        return ratings.ratings_by_book.get(book_id, ())
+    if isinstance(ratings, RatingsTable):
+        return ratings.for_book(book_id)
+    return tuple(r for r in ratings if r.book_id == book_id)
+
+
+def has_rating(ratings: Ratings, user_id: UserID, book_id: BookID) -> bool:
+    if isinstance(ratings, Catalog):
+        return any(r.book_id == book_id for r in ratings.ratings_by_user.get(user_id, ()))
+    if isinstance(ratings, RatingsTable):
+        return ratings.has(user_id, book_id)
+    return any(r.user_id == user_id and r.book_id == book_id for r in ratings)
+
+
+def user_loans(loans: Loans, user_id: UserID) -> Tuple[Loan, ...]:
+    if isinstance(loans, Catalog):
+        return loans.loans_by_user.get(user_id, ())
+    return tuple(l for l in loans if l.user_id == user_id)
+
+
+def book_reviews(reviews: Reviews, book_id: BookID) -> Tuple[Review, ...]:
+    if isinstance(reviews, Catalog):
+        return reviews.reviews_by_book.get(book_id, ())
+    return tuple(r for r in reviews if r.book_id == book_id)
+
+
+def genre_books(books: Books, genre_id: GenreID) -> Tuple[Book, ...]:
+    if isinstance(books, Catalog):
+        return books.books_by_genre.get(genre_id, ())
+    return tuple(b for b in books if genre_id in b.genres)
+
+
+def tag_books(books: Books, tag_id: TagID) -> Tuple[Book, ...]:
+    if isinstance(books, Catalog):
+        return books.books_by_tag.get(tag_id, ())
+    return tuple(b for b in books if tag_id in b.tags)
+
+
+def author_books(books: Books, author_id: AuthorID) -> Tuple[Book, ...]:
+    if isinstance(books, Catalog):
+        return books.books_by_author.get(author_id, ())
+    return tuple(b for b in books if author_id in b.author_ids)
@@ -1,16 +1,26 @@
-from typing import TypeVar, Generic, Callable, Any, Tuple, Dict
-from functools import wraps
+from typing import TypeVar, Generic, Callable, Any, Tuple, Dict, Iterable
+from functools import reduce, wraps
 from core.domain import Book, Rating, Review, User
-from core.transforms import avg_rating_for_book
+from core.transforms import avg_rating_for_book, add_rating as append_rating, persistent_ratings, persistent_reviews
+from core.memo import RecommendationCache
+from core.leaderboard import Leaderboard
+from core.search import SearchIndex
+from core.instrument import instrumented
+from core.catalog import (
+    Books, Users, Ratings, Reviews, RatingSource, all_reviews,
+    book_by_id, user_by_id, has_rating, book_ids, user_ids, rated_pairs,
+)
 
 T = TypeVar('T')
 E = TypeVar('E')
 U = TypeVar('U')
 
 # ========== MAYBE ==========
+# Контейнеры со __slots__: без __dict__ на экземпляр; Nothing — единственный экземпляр.
 
 class Maybe(Generic[T]):
     """Container for optional values"""
+    __slots__ = ()
     
     @staticmethod
     def just(value: T) -> 'Just[T]':
@@ -18,13 +28,35 @@ class Maybe(Generic[T]):
     
     @staticmethod
     def nothing() -> 'Nothing':
-        return Nothing()
+        return NOTHING
     
     @staticmethod
     def from_value(value: T | None) -> 'Maybe[T]':
-        return Just(value) if value is not None else Nothing()
+        return Just(value) if value is not None else NOTHING
+    
+    @staticmethod
+    def traverse(items: Iterable[T], fn: Callable[[T], 'Maybe[U]']) -> 'Maybe[Tuple[U, ...]]':
+        """Just of all results, or Nothing at the first Nothing (one loop, no bind chain)"""
+        out = []
+        for item in items:
+            result = fn(item)
+            if result is NOTHING:
+                return NOTHING
+            out.append(result._value)
+        return Just(tuple(out))
+    
+    @staticmethod
+    def sequence(maybes: Iterable['Maybe[T]']) -> 'Maybe[Tuple[T, ...]]':
+        out = []
+        for m in maybes:
+            if m is NOTHING:
+                return NOTHING
+            out.append(m._value)
+        return Just(tuple(out))
 
 class Just(Maybe[T]):
+    __slots__ = ("_value",)
+    
     def __init__(self, value: T):
         self._value = value
     
@@ -48,8 +80,19 @@ class Just(Maybe[T]):
     
     def __str__(self):
         return f"Just({self._value})"
+    
+    __repr__ = __str__
 
 class Nothing(Maybe[Any]):
+    __slots__ = ()
+    _instance: 'Nothing | None' = None
+    
+    def __new__(cls):
+        # Nothing() и Maybe.nothing() возвращают один и тот же объект
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+    
     def map(self, fn: Callable[[Any], Any]) -> 'Nothing':
         return self
     
@@ -68,13 +111,21 @@ class Nothing(Maybe[Any]):
     def __eq__(self, other):
         return isinstance(other, Nothing)
     
+    def __reduce__(self):
+        return (Nothing, ())
+    
     def __str__(self):
         return "Nothing"
+    
+    __repr__ = __str__
+
+NOTHING = Nothing()
 
 # ========== EITHER ==========
 
 class Either(Generic[E, T]):
     """Container for operations that can fail"""
+    __slots__ = ()
     
     @staticmethod
     def right(value: T) -> 'Right[T]':
@@ -83,8 +134,30 @@ class Either(Generic[E, T]):
     @staticmethod
     def left(error: E) -> 'Left[E]':
         return Left(error)
+    
+    @staticmethod
+    def traverse(items: Iterable[T], fn: Callable[[T], 'Either[E, U]']) -> 'Either[E, Tuple[U, ...]]':
+        """Right of all results, or the first Left (short-circuits)"""
+        out = []
+        for item in items:
+            result = fn(item)
+            if type(result) is Left:
+                return result
+            out.append(result._value)
+        return Right(tuple(out))
+    
+    @staticmethod
+    def sequence(eithers: Iterable['Either[E, T]']) -> 'Either[E, Tuple[T, ...]]':
+        out = []
+        for e in eithers:
+            if type(e) is Left:
+                return e
+            out.append(e._value)
+        return Right(tuple(out))
 
 class Right(Either[Any, T]):
+    __slots__ = ("_value",)
+    
     def __init__(self, value: T):
         self._value = value
     
@@ -103,13 +176,20 @@ class Right(Either[Any, T]):
     def is_left(self) -> bool:
         return False
     
+    def to_validated(self) -> 'Valid[T]':
+        return Valid(self._value)
+    
     def __eq__(self, other):
         return isinstance(other, Right) and self._value == other._value
     
     def __str__(self):
         return f"Right({self._value})"
+    
+    __repr__ = __str__
 
 class Left(Either[E, Any]):
+    __slots__ = ("_error",)
+    
     def __init__(self, error: E):
         self._error = error
     
@@ -128,31 +208,138 @@ class Left(Either[E, Any]):
     def is_left(self) -> bool:
         return True
     
+    def to_validated(self) -> 'Invalid[E]':
+        return Invalid((self._error,))
+    
     def __eq__(self, other):
         return isinstance(other, Left) and self._error == other._error
     
     def __str__(self):
         return f"Left({self._error})"
+    
+    __repr__ = __str__
+
+# ========== VALIDATED ==========
+# Аппликативная валидация: в отличие от Either не останавливается на первой
+# ошибке, а накапливает все ошибки (кортеж errors).
+
+class Validated(Generic[E, T]):
+    """Validation result that accumulates every error instead of stopping at the first"""
+    __slots__ = ()
+    
+    @staticmethod
+    def valid(value: T) -> 'Valid[T]':
+        return Valid(value)
+    
+    @staticmethod
+    def invalid(error: E) -> 'Invalid[E]':
+        return Invalid((error,))
+    
+    @staticmethod
+    def traverse(items: Iterable[T], fn: Callable[[T], 'Validated[E, U]']) -> 'Validated[E, Tuple[U, ...]]':
+        """All values if every item is valid, otherwise all errors of all items (one pass)"""
+        values, errors = [], []
+        for item in items:
+            result = fn(item)
+            if type(result) is Invalid:
+                errors.extend(result.errors)
+            elif not errors:
+                values.append(result._value)
+        return Invalid(tuple(errors)) if errors else Valid(tuple(values))
+    
+    @staticmethod
+    def sequence(validated: Iterable['Validated[E, T]']) -> 'Validated[E, Tuple[T, ...]]':
+        return Validated.traverse(validated, lambda v: v)
+
+class Valid(Validated[Any, T]):
+    __slots__ = ("_value",)
+    
+    def __init__(self, value: T):
+        self._value = value
+    
+    def map(self, fn: Callable[[T], U]) -> 'Valid[U]':
+        return Valid(fn(self._value))
+    
+    def zip(self, other: 'Validated[E, U]') -> 'Validated[E, Tuple[T, U]]':
+        """Pair two results; errors of both sides are kept"""
+        if type(other) is Invalid:
+            return other
+        return Valid((self._value, other._value))
+    
+    def get_or_else(self, default: T) -> T:
+        return self._value
+    
+    def is_valid(self) -> bool:
+        return True
+    
+    def to_either(self) -> 'Right[T]':
+        return Right(self._value)
+    
+    def __eq__(self, other):
+        return isinstance(other, Valid) and self._value == other._value
+    
+    def __str__(self):
+        return f"Valid({self._value})"
+    
+    __repr__ = __str__
+
+class Invalid(Validated[E, Any]):
+    __slots__ = ("errors",)
+    
+    def __init__(self, errors: Tuple[E, ...]):
+        self.errors = errors
+    
+    def map(self, fn: Callable[[Any], Any]) -> 'Invalid[E]':
+        return self
+    
+    def zip(self, other: 'Validated[E, Any]') -> 'Invalid[E]':
+        if type(other) is Invalid:
+            return Invalid(self.errors + other.errors)
+        return self
+    
+    def get_or_else(self, default: T) -> T:
+        return default
+    
+    def is_valid(self) -> bool:
+        return False
+    
+    def to_either(self) -> 'Left[Tuple[E, ...]]':
+        return Left(self.errors)
+    
+    def __eq__(self, other):
+        return isinstance(other, Invalid) and self.errors == other.errors
+    
+    def __str__(self):
+        return f"Invalid({self.errors})"
+    
+    __repr__ = __str__
 
 # ========== SAFE OPERATIONS ==========
 
-def safe_book(books: Tuple[Book, ...], book_id: str) -> Maybe[Book]:
+def safe_book(books: Books, book_id: str) -> Maybe[Book]:
     """Safe book lookup by ID"""
-    book = next((b for b in books if b.id == book_id), None)
-    return Maybe.from_value(book)
+    return Maybe.from_value(book_by_id(books, book_id))
 
-def safe_user(users: Tuple[User, ...], user_id: str) -> Maybe[User]:
+def safe_user(users: Users, user_id: str) -> Maybe[User]:
     """Safe user lookup by ID"""
-    user = next((u for u in users if u.id == user_id), None)
-    return Maybe.from_value(user)
+    return Maybe.from_value(user_by_id(users, user_id))
 
 # ========== VALIDATION ==========
 
 def validate_rating(rating: Rating, 
-                   books: Tuple[Book, ...], 
-                   users: Tuple[User, ...],
-                   existing_ratings: Tuple[Rating, ...]) -> Either[Dict[str, str], Rating]:
+                   books: Books, 
+                   users: Users,
+                   existing_ratings: Ratings) -> Either[Dict[str, str], Rating]:
     """Rating validation"""
+    errors = _rating_errors(
+        rating,
+        book_exists=book_by_id(books, rating.book_id) is not None,
+        user_exists=user_by_id(users, rating.user_id) is not None,
+        duplicate=has_rating(existing_ratings, rating.user_id, rating.book_id),
+    )
+    return Either.left(errors) if errors else Either.right(rating)
+
+def _rating_errors(rating: Rating, book_exists: bool, user_exists: bool, duplicate: bool) -> Dict[str, str]:
     errors = {}
     
     # Value range check
@@ -160,69 +347,194 @@ def validate_rating(rating: Rating,
         errors["value"] = "Rating must be between 1 and 5"
     
     # Book existence check
-    if not any(b.id == rating.book_id for b in books):
+    if not book_exists:
         errors["book_id"] = f"Book with ID {rating.book_id} not found"
     
     # User existence check
-    if not any(u.id == rating.user_id for u in users):
+    if not user_exists:
         errors["user_id"] = f"User with ID {rating.user_id} not found"
     
     # Duplicate check
-    if any(r.user_id == rating.user_id and r.book_id == rating.book_id 
-           for r in existing_ratings):
+    if duplicate:
         errors["duplicate"] = "User already rated this book"
     
-    return Either.left(errors) if errors else Either.right(rating)
+    return errors
 
 def validate_review(review: Review,
-                   books: Tuple[Book, ...],
-                   users: Tuple[User, ...]) -> Either[Dict[str, str], Review]:
+                   books: Books,
+                   users: Users) -> Either[Dict[str, str], Review]:
     """Review validation"""
+    errors = _review_errors(
+        review,
+        book_exists=book_by_id(books, review.book_id) is not None,
+        user_exists=user_by_id(users, review.user_id) is not None,
+    )
+    return Either.left(errors) if errors else Either.right(review)
+
+def _review_errors(review: Review, book_exists: bool, user_exists: bool) -> Dict[str, str]:
     errors = {}
     
     # Book existence
-    if not any(b.id == review.book_id for b in books):
+    if not book_exists:
         errors["book_id"] = f"Book with ID {review.book_id} not found"
     
     # User existence
-    if not any(u.id == review.user_id for u in users):
+    if not user_exists:
         errors["user_id"] = f"User with ID {review.user_id} not found"
     
     # Text validation
     if not review.text or len(review.text.strip()) < 10:
         errors["text"] = "Review text must contain at least 10 characters"
     
-    return Either.left(errors) if errors else Either.right(review)
+    return errors
+
+# ========== BULK VALIDATION ==========
+
+def rating_batch_errors(new_ratings: Iterable[Rating],
+                        books: Books,
+                        users: Users,
+                        existing_ratings: Ratings) -> Iterable[Tuple[Rating, Dict[str, str]]]:
+    """(rating, errors) per row; valid rows count towards in-batch duplicates"""
+    known_books, known_users = book_ids(books), user_ids(users)
+    already_rated = rated_pairs(existing_ratings)
+    seen = set()
+    for rating in new_ratings:
+        pair = (rating.user_id, rating.book_id)
+        errors = _rating_errors(
+            rating,
+            book_exists=rating.book_id in known_books,
+            user_exists=rating.user_id in known_users,
+            duplicate=already_rated(*pair),
+        )
+        if pair in seen:
+            errors["duplicate"] = "Duplicate rating within the batch"
+        if not errors:
+            seen.add(pair)
+        yield rating, errors
+
+def validate_ratings_bulk(new_ratings: Iterable[Rating],
+                          books: Books,
+                          users: Users,
+                          existing_ratings: Ratings) -> Tuple[Either[Dict[str, str], Rating], ...]:
+    """Per-row validation of a batch against set-based indexes"""
+    return tuple(
+        Left(errors) if errors else Right(rating)
+        for rating, errors in rating_batch_errors(new_ratings, books, users, existing_ratings)
+    )
+
+def validate_ratings_all(new_ratings: Iterable[Rating],
+                         books: Books,
+                         users: Users,
+                         existing_ratings: Ratings) -> Validated[Tuple[int, Dict[str, str]], Tuple[Rating, ...]]:
+    """Whole-batch validation in one pass: Valid(all ratings) or Invalid((row, errors), ...)
+
+    No container is built per row; only failing rows allocate an error entry.
+    """
+    values, errors = [], []
+    for row, (rating, row_errors) in enumerate(rating_batch_errors(new_ratings, books, users, existing_ratings)):
+        if row_errors:
+            errors.append((row, row_errors))
+        elif not errors:
+            values.append(rating)
+    return Invalid(tuple(errors)) if errors else Valid(tuple(values))
+
+def validate_reviews_bulk(new_reviews: Iterable[Review],
+                          books: Books,
+                          users: Users,
+                          existing_reviews: Reviews = ()) -> Tuple[Either[Dict[str, str], Review], ...]:
+    """Per-row review validation; also rejects repeated review IDs"""
+    known_books, known_users = book_ids(books), user_ids(users)
+    taken = {rv.id for rv in all_reviews(existing_reviews)}
+    report = []
+    for review in new_reviews:
+        errors = _review_errors(
+            review,
+            book_exists=review.book_id in known_books,
+            user_exists=review.user_id in known_users,
+        )
+        if review.id in taken:
+            errors["id"] = f"Review with ID {review.id} already exists"
+        if errors:
+            report.append(Either.left(errors))
+        else:
+            taken.add(review.id)
+            report.append(Either.right(review))
+    return tuple(report)
 
 # ========== PIPELINES ==========
 
+@instrumented()
 def add_rating_pipeline(rating: Rating,
-                       ratings: Tuple[Rating, ...],
-                       books: Tuple[Book, ...],
-                       users: Tuple[User, ...]) -> Either[Dict[str, str], Tuple[Rating, ...]]:
-    """Rating addition pipeline"""
+                       ratings: Ratings,
+                       books: Books,
+                       users: Users,
+                       cache: RecommendationCache | None = None,
+                       leaderboard: Leaderboard | None = None) -> Either[Dict[str, str], Ratings]:
+    """Rating addition pipeline (updates ``cache`` and ``leaderboard`` on success).
+
+    The result is persistent (``PersistentVector`` or ``RatingsTable``) and keeps
+    maintained aggregates, so chained calls append in O(log n).
+    """
     
-    def add_rating(valid_rating: Rating) -> Either[Dict[str, str], Tuple[Rating, ...]]:
-        return Either.right(ratings + (valid_rating,))
+    def add_rating(valid_rating: Rating) -> Either[Dict[str, str], Ratings]:
+        if cache is not None:
+            cache.record_rating(valid_rating)
+        if leaderboard is not None:
+            leaderboard.add(valid_rating)  # O(log n) вместо пересчёта топа
+        return Either.right(append_rating(persistent_ratings(ratings), valid_rating))
     
     return validate_rating(rating, books, users, ratings).bind(add_rating)
 
+@instrumented()
 def add_review_pipeline(review: Review,
-                       reviews: Tuple[Review, ...],
-                       books: Tuple[Book, ...],
-                       users: Tuple[User, ...],
-                       ratings: Tuple[Rating, ...]) -> Either[Dict[str, str], Tuple[Review, ...]]:
-    """Review addition pipeline"""
-    
-    def add_review(valid_review: Review) -> Either[Dict[str, str], Tuple[Review, ...]]:
-        new_reviews = reviews + (valid_review,)
-        return Either.right(new_reviews)
+                       reviews: Reviews,
+                       books: Books,
+                       users: Users,
+                       ratings: Ratings,
+                       search_index: SearchIndex | None = None) -> Either[Dict[str, str], Reviews]:
+    """Review addition pipeline (indexes the review for search on success; returns a ``PersistentVector``)"""
+    
+    def add_review(valid_review: Review) -> Either[Dict[str, str], Reviews]:
+        if search_index is not None:
+            search_index.add_review(valid_review)
+        return Either.right(persistent_reviews(reviews).append(valid_review))
     
     return validate_review(review, books, users).bind(add_review)
 
-def safe_book_analysis(books: Tuple[Book, ...], 
+@instrumented()
+def add_ratings_bulk(new_ratings: Iterable[Rating],
+                     ratings: Ratings,
+                     books: Books,
+                     users: Users,
+                     cache: RecommendationCache | None = None,
+                     leaderboard: Leaderboard | None = None) -> Tuple[Tuple[Either[Dict[str, str], Rating], ...], Ratings]:
+    """Bulk rating import: per-row report plus ratings with all valid rows appended at once"""
+    report = validate_ratings_bulk(new_ratings, books, users, ratings)
+    accepted = tuple(e.get_or_else(None) for e in report if e.is_right())
+    for rating in accepted:
+        if cache is not None:
+            cache.record_rating(rating)
+        if leaderboard is not None:
+            leaderboard.add(rating)
+    return report, reduce(append_rating, accepted, persistent_ratings(ratings))
+
+@instrumented()
+def add_reviews_bulk(new_reviews: Iterable[Review],
+                     reviews: Reviews,
+                     books: Books,
+                     users: Users,
+                     search_index: SearchIndex | None = None) -> Tuple[Tuple[Either[Dict[str, str], Review], ...], Reviews]:
+    """Bulk review import: per-row report plus reviews with all valid rows appended at once"""
+    report = validate_reviews_bulk(new_reviews, books, users, reviews)
+    accepted = tuple(e.get_or_else(None) for e in report if e.is_right())
+    if search_index is not None:
+        for review in accepted:
+            search_index.add_review(review)
+    return report, persistent_reviews(reviews).extend(accepted)
+
+def safe_book_analysis(books: Books, 
                       book_id: str, 
-                      ratings: Tuple[Rating, ...]) -> Maybe[Tuple[str, float]]:
+                      ratings: RatingSource) -> Maybe[Tuple[str, float]]:
     """Safe book analysis with Maybe composition"""
     
     def calculate_avg(book: Book) -> Maybe[Tuple[str, float]]:
@@ -1,20 +1,39 @@
-from typing import Tuple
+import heapq
+from typing import Iterable, Optional, Tuple
 from core.domain import Book, Rating, Review, Loan, Genre
 from core.transforms import avg_rating_for_book
+from core.aggregates import RatingAggregates
+from core.catalog import (
+    Catalog, Books, RatingSource, Reviews, Loans, Genres, Tags,
+    all_books, all_loans, user_loans, book_reviews, genre_books, rating_aggregates, genre_tree, tag_tree,
+)
+from core.hierarchy import Hierarchy
+from core.bitmap import facet_index
+from core.loans import LoanEngine
+from core.instrument import instrumented
 
 
 
-def user_has_active_loan(loans: Tuple[Loan, ...], user_id: str) -> bool:
+def user_has_active_loan(loans: Loans | LoanEngine, user_id: str) -> bool:
    
-    return any(l.user_id == user_id and l.status == "active" for l in loans)
+    if isinstance(loans, LoanEngine):
+        return loans.has_active_loan(user_id)
+    return any(l.status == "active" for l in user_loans(loans, user_id))
 
 
-def book_has_reviews(reviews: Tuple[Review, ...], book_id: str) -> bool:
+def book_is_lent_out(loans: Loans | LoanEngine, book_id: str) -> bool:
+    """True while some loan of the book is not returned (O(1) with LoanEngine)"""
+    if isinstance(loans, LoanEngine):
+        return loans.is_lent_out(book_id)
+    return any(l.book_id == book_id and l.status != "returned" for l in all_loans(loans))
+
+
+def book_has_reviews(reviews: Reviews, book_id: str) -> bool:
   
-    return any(r.book_id == book_id for r in reviews)
+    return bool(book_reviews(reviews, book_id))
 
 
-def book_avg_ge(ratings: Tuple[Rating, ...], book_id: str, threshold: float) -> bool:
+def book_avg_ge(ratings: RatingSource, book_id: str, threshold: float) -> bool:
    
     return avg_rating_for_book(ratings, book_id) >= threshold
 
@@ -31,46 +50,127 @@ def book_has_tag(book: Book, tag_id: str) -> bool:
 
 # ---------- Фильтры / выборки ----------
 
-def books_with_avg_ge(ratings: Tuple[Rating, ...], books: Tuple[Book, ...], threshold: float) -> Tuple[Book, ...]:
+def aggregates_of(ratings: RatingSource) -> RatingAggregates:
+    """Per-book stats of ``ratings``: the cached ones when the source has them, else one pass"""
+    stats = rating_aggregates(ratings)
+    return stats if stats is not None else RatingAggregates(ratings)
+
+
+@instrumented()
+def books_with_avg_ge(ratings: RatingSource, books: Books, threshold: float) -> Tuple[Book, ...]:
   
-    return tuple(b for b in books if book_avg_ge(ratings, b.id, threshold))
+    stats = aggregates_of(ratings)
+    return tuple(b for b in all_books(books) if stats.mean(b.id) >= threshold)
+
+
+@instrumented()
+def books_of_genre(books: Books, genre_id: str) -> Tuple[Book, ...]:
+
+    return genre_books(books, genre_id)
+
+
+@instrumented()
+def top_books_by_avg(ratings: RatingSource, books: Books, n: int) -> Tuple[tuple[str, float], ...]:
+
+    stats = aggregates_of(ratings)
+    avgs = ((b.id, stats.mean(b.id)) for b in all_books(books))
+    # куча на n элементов вместо полной сортировки; порядок тот же, что у sorted()[:n]
+    return tuple(heapq.nlargest(n, avgs, key=lambda x: x[1]))
+
+
+
+def genre_ancestors(genres: Genres, genre_id: str) -> Tuple[Genre, ...]:
+
+    return genre_tree(genres).ancestors(genre_id)
+
+
+def book_in_genre_recursive(book: Book, genres: Genres, target_genre_id: str) -> bool:
+
+    tree = genre_tree(genres)
+    return any(tree.is_under(gid, target_genre_id) for gid in book.genres)
+
+
+def book_has_tag_recursive(book: Book, tags: Tags, target_tag_id: str) -> bool:
 
+    tree = tag_tree(tags)
+    return any(tree.is_under(tid, target_tag_id) for tid in book.tags)
 
-def books_of_genre(books: Tuple[Book, ...], genre_id: str) -> Tuple[Book, ...]:
 
-    return tuple(b for b in books if genre_id in b.genres)
+def _books_in_subtree(books: Books, tree: Hierarchy, node_id: str, index_of, keys_of) -> Tuple[Book, ...]:
+    subtree = tree.subtree(node_id)
+    if isinstance(books, Catalog):
+        # объединение списков из инвертированного индекса по узлам поддерева
+        index = index_of(books)
+        found = {}
+        for x in subtree:
+            for b in index.get(x, ()):
+                found.setdefault(id(b), b)
+        ordinal = books.book_ordinals
+        return tuple(sorted(found.values(), key=lambda b: ordinal[b.id]))
+    wanted = set(subtree)
+    return tuple(b for b in books if any(k in wanted for k in keys_of(b)))
 
 
-def top_books_by_avg(ratings: Tuple[Rating, ...], books: Tuple[Book, ...], n: int) -> Tuple[tuple[str, float], ...]:
+@instrumented()
+def books_in_genre_subtree(books: Books, genres: Genres, genre_id: str) -> Tuple[Book, ...]:
 
-    avgs = [(b.id, avg_rating_for_book(ratings, b.id)) for b in books]
-    avgs_sorted = sorted(avgs, key=lambda x: x[1], reverse=True)
-    return tuple(avgs_sorted[:n])
+    return _books_in_subtree(books, genre_tree(genres), genre_id,
+                             lambda c: c.books_by_genre, lambda b: b.genres)
 
 
+@instrumented()
+def books_in_tag_subtree(books: Books, tags: Tags, tag_id: str) -> Tuple[Book, ...]:
 
-def genre_ancestors(genres: Tuple[Genre, ...], genre_id: str) -> Tuple[Genre, ...]:
+    return _books_in_subtree(books, tag_tree(tags), tag_id,
+                             lambda c: c.books_by_tag, lambda b: b.tags)
 
-    by_id = {g.id: g for g in genres}
 
-    def recurse(gid: str) -> Tuple[Genre, ...]:
-        g = by_id.get(gid)
-        if g is None or g.parent_id is None:
-            return ()
-        parent = by_id.get(g.parent_id)
-        return (parent,) + recurse(parent.id)
+# ---------- Фасетный поиск (битовые индексы) ----------
 
-    return recurse(genre_id)
+@instrumented()
+def books_by_facets(
+    books: Books,
+    genres: Iterable[str] = (),
+    tags: Iterable[str] = (),
+    authors: Iterable[str] = (),
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    exclude_genres: Iterable[str] = (),
+    exclude_tags: Iterable[str] = (),
+    exclude_authors: Iterable[str] = (),
+    recursive: bool = False,
+) -> Tuple[Book, ...]:
+    """Books matching any of the given ids within each facet, and all facets together.
 
+    With a Catalog this is AND / OR / ANDNOT over cached bitmaps
+    (``core.bitmap``); ``recursive`` widens genres and tags to their subtrees.
+    Tuples fall back to a linear scan with the same semantics.
+    """
+    include = {"genre": tuple(genres), "tag": tuple(tags), "author": tuple(authors)}
+    exclude = {"genre": tuple(exclude_genres), "tag": tuple(exclude_tags), "author": tuple(exclude_authors)}
+    if isinstance(books, Catalog):
+        index = facet_index(books)
+        # сначала самые узкие множества — промежуточные результаты быстрее сжимаются
+        parts = sorted((index.any_of(f, keys, recursive) for f, keys in include.items() if keys), key=len)
+        result = parts[0] if parts else index.universe
+        for part in parts[1:]:
+            result &= part
+        result = index.within_years(result, year_from, year_to)
+        for f, keys in exclude.items():
+            if keys and result:
+                result -= index.any_of(f, keys, recursive)
+        return index.select(result)
 
-def book_in_genre_recursive(book: Book, genres: Tuple[Genre, ...], target_genre_id: str) -> bool:
+    if recursive:
+        raise ValueError("recursive facets need a Catalog (genre/tag hierarchies)")
+    facets = {"genre": lambda b: b.genres, "tag": lambda b: b.tags, "author": lambda b: b.author_ids}
 
-    def descendants(gid: str) -> set[str]:
-        children = [g.id for g in genres if g.parent_id == gid]
-        result = set(children)
-        for c in children:
-            result |= descendants(c)
-        return result
+    def ok(b: Book) -> bool:
+        if year_from is not None and b.year < year_from or year_to is not None and b.year > year_to:
+            return False
+        for f, keys in include.items():
+            if keys and not any(k in facets[f](b) for k in keys):
+                return False
+        return not any(k in facets[f](b) for f, keys in exclude.items() for k in keys)
 
-    valid_ids = {target_genre_id} | descendants(target_genre_id)
-    return any(gid in valid_ids for gid in book.genres)
+    return tuple(b for b in books if ok(b))
@@ -0,0 +1,93 @@
+# core/hierarchy.py
+"""Precomputed genre / tag hierarchies.
+
+Nodes are numbered in DFS pre-order; every subtree is the contiguous range
+``[tin, tout]`` of that numbering, so "is X under Y" is two integer
+comparisons and a node's descendants are a slice of ``order``.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from core.domain import Genre, Tag
+
+Node = Union[Genre, Tag]
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Hierarchy:
+    nodes: Dict[str, Node]
+    order: Tuple[str, ...]            # id в порядке pre-order
+    tin: Dict[str, int]               # позиция узла в order
+    tout: Dict[str, int]              # последняя позиция его поддерева
+    ancestors_of: Dict[str, Tuple[str, ...]]  # ближайший предок первым
+
+    def __contains__(self, node_id: object) -> bool:
+        return node_id in self.tin
+
+    def is_under(self, node_id: str, ancestor_id: str) -> bool:
+        """True if ``node_id`` is ``ancestor_id`` or one of its descendants"""
+        t, a = self.tin.get(node_id), self.tin.get(ancestor_id)
+        if t is None or a is None:
+            return node_id == ancestor_id
+        return a <= t <= self.tout[ancestor_id]
+
+    def subtree(self, node_id: str) -> Tuple[str, ...]:
+        """``node_id`` followed by all its descendants"""
+        t = self.tin.get(node_id)
+        if t is None:
+            return (node_id,)
+        return self.order[t:self.tout[node_id] + 1]
+
+    def descendants(self, node_id: str) -> Tuple[str, ...]:
+        return self.subtree(node_id)[1:]
+
+    def ancestors(self, node_id: str) -> Tuple[Node, ...]:
+        return tuple(self.nodes[a] for a in self.ancestors_of.get(node_id, ()))
+
+
+GenreTree = Hierarchy
+TagTree = Hierarchy
+
+
+def build_hierarchy(items: Iterable[Node]) -> Hierarchy:
+    nodes: Dict[str, Node] = {}
+    for x in items:
+        nodes.setdefault(x.id, x)
+
+    children: Dict[Optional[str], list] = {}
+    for x in nodes.values():
+        # родитель, которого нет в справочнике, — как корень
+        parent = x.parent_id if x.parent_id in nodes else None
+        children.setdefault(parent, []).append(x.id)
+
+    order: list = []
+    tin: Dict[str, int] = {}
+    tout: Dict[str, int] = {}
+    ancestors_of: Dict[str, Tuple[str, ...]] = {}
+
+    def walk(root: str) -> None:
+        # итеративный DFS — глубина дерева не ограничена стеком Python
+        tin[root] = len(order)
+        order.append(root)
+        ancestors_of[root] = ()
+        stack = [(root, iter(children.get(root, ())))]
+        while stack:
+            node, it = stack[-1]
+            child = next(it, None)
+            if child is None:
+                tout[node] = len(order) - 1
+                stack.pop()
+            elif child not in tin:
+                tin[child] = len(order)
+                order.append(child)
+                ancestors_of[child] = (node,) + ancestors_of[node]
+                stack.append((child, iter(children.get(child, ()))))
+
+    for root in children.get(None, ()):
+        walk(root)
+    # узлы в циклах недостижимы из корней: цикл разрывается на первом из них
+    for node_id in nodes:
+        if node_id not in tin:
+            walk(node_id)
+
+    return Hierarchy(nodes=nodes, order=tuple(order), tin=tin, tout=tout, ancestors_of=ancestors_of)
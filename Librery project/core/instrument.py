@@ -0,0 +1,210 @@
+# core/instrument.py
+"""Lightweight hot-path instrumentation.
+
+``@instrumented("name")`` / ``with timed("name"):`` record call counts,
+errors, a latency histogram and the net change in allocated memory blocks
+(``sys.getallocatedblocks``) per call. Disabled by default: a disabled
+wrapper costs one attribute check before calling through. Enable with
+``enable()`` or ``LIBRARY_METRICS=1``; export with ``to_json`` or
+``to_prometheus`` (text exposition format).
+"""
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Верхние границы корзин гистограммы, мс (последняя корзина — +Inf)
+BUCKETS_MS: Tuple[float, ...] = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class _State:
+    __slots__ = ("enabled",)
+
+    def __init__(self):
+        self.enabled = os.environ.get("LIBRARY_METRICS", "") not in ("", "0")
+
+
+STATE = _State()
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Exact ``q`` quantile of already sorted samples, linearly interpolated"""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+class Metric:
+    """Aggregates of one instrumented call site"""
+    __slots__ = ("name", "count", "errors", "total_ms", "max_ms", "buckets", "alloc_blocks")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.alloc_blocks = 0
+
+    def record(self, elapsed_ms: float, blocks: int, failed: bool) -> None:
+        self.count += 1
+        self.errors += failed
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.buckets[bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+        self.alloc_blocks += blocks
+
+    def quantile(self, q: float) -> float:
+        """Upper bucket bound containing the ``q`` quantile (``max_ms`` for +Inf)"""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS_MS, self.buckets):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.max_ms
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": round(self.total_ms, 4),
+            "mean_ms": round(self.total_ms / self.count, 4) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 4),
+            "p50_ms": self.quantile(0.5),
+            "p99_ms": self.quantile(0.99),
+            "alloc_blocks": self.alloc_blocks,
+            "buckets": dict(zip([str(b) for b in BUCKETS_MS] + ["+Inf"], self.buckets)),
+        }
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()  # Streamlit выполняет сессии в разных потоках
+
+    def record(self, name: str, elapsed_ms: float, blocks: int, failed: bool) -> None:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Metric(name)
+            metric.record(elapsed_ms, blocks, failed)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def metrics(self) -> List[Metric]:
+        with self._lock:
+            return sorted(self._metrics.values(), key=lambda m: m.name)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+
+
+REGISTRY = Registry()
+
+
+def enable(on: bool = True) -> None:
+    STATE.enabled = on
+
+
+def disable() -> None:
+    STATE.enabled = False
+
+
+def is_enabled() -> bool:
+    return STATE.enabled
+
+
+@contextmanager
+def timed(name: str, registry: Registry = REGISTRY) -> Iterator[None]:
+    if not STATE.enabled:
+        yield
+        return
+    blocks = sys.getallocatedblocks()
+    start = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        registry.record(name, elapsed, sys.getallocatedblocks() - blocks, failed)
+
+
+def instrumented(name: Optional[str] = None, registry: Registry = REGISTRY) -> Callable[[F], F]:
+    """Decorator form of ``timed``; the metric name defaults to ``module.qualname``"""
+    def decorate(fn: F) -> F:
+        metric = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not STATE.enabled:
+                return fn(*args, **kwargs)
+            blocks = sys.getallocatedblocks()
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                elapsed = (time.perf_counter() - start) * 1000
+                registry.record(metric, elapsed, sys.getallocatedblocks() - blocks, failed)
+
+        return wrapper  # type: ignore[return-value]
+    return decorate
+
+
+# ---------- Экспорт ----------
+
+def snapshot(registry: Registry = REGISTRY) -> Dict[str, Dict[str, Any]]:
+    return {m.name: m.as_dict() for m in registry.metrics()}
+
+
+def to_json(registry: Registry = REGISTRY) -> str:
+    return json.dumps({"enabled": STATE.enabled, "metrics": snapshot(registry)}, indent=2)
+
+
+def _label(name: str) -> str:
+    return name.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def to_prometheus(registry: Registry = REGISTRY, prefix: str = "library") -> str:
+    """Prometheus text exposition: one histogram plus counters, labelled by call site"""
+    lines = [
+        f"# HELP {prefix}_call_duration_seconds Latency of instrumented calls",
+        f"# TYPE {prefix}_call_duration_seconds histogram",
+    ]
+    metrics = registry.metrics()
+    for m in metrics:
+        fn = _label(m.name)
+        cumulative = 0
+        for bound, n in zip(BUCKETS_MS, m.buckets):
+            cumulative += n
+            lines.append(f'{prefix}_call_duration_seconds_bucket{{fn="{fn}",le="{bound / 1000:g}"}} {cumulative}')
+        lines.append(f'{prefix}_call_duration_seconds_bucket{{fn="{fn}",le="+Inf"}} {m.count}')
+        lines.append(f'{prefix}_call_duration_seconds_sum{{fn="{fn}"}} {m.total_ms / 1000:.6f}')
+        lines.append(f'{prefix}_call_duration_seconds_count{{fn="{fn}"}} {m.count}')
+    for metric, kind, help_text, attr in (
+        ("call_errors_total", "counter", "Instrumented calls that raised", "errors"),
+        # чистое изменение числа блоков может быть отрицательным — поэтому gauge
+        ("alloc_blocks", "gauge", "Net allocated memory blocks across calls", "alloc_blocks"),
+    ):
+        lines.append(f"# HELP {prefix}_{metric} {help_text}")
+        lines.append(f"# TYPE {prefix}_{metric} {kind}")
+        lines.extend(f'{prefix}_{metric}{{fn="{_label(m.name)}"}} {getattr(m, attr)}' for m in metrics)
+    return "\n".join(lines) + "\n"
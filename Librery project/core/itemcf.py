@@ -0,0 +1,270 @@
+# core/itemcf.py
+"""Item-item collaborative filtering.
+
+Ratings are held as a sparse user x book matrix (CSR in both directions).
+For every book the similarity to all co-rated books is one sparse dot
+product (cosine, or adjusted cosine on ratings centred by the user's mean),
+and only the top-K neighbours are kept in two fixed-width arrays
+(``int32`` ids, ``float32`` similarities). A user is scored from the
+neighbour lists of the books they rated, so online recommendation touches
+O(rated x K) numbers instead of the whole catalog.
+
+The neighbour build is split into book ranges that can run in a process
+pool; ``ItemCF.add`` + ``refresh`` recompute only the rows a new rating
+changes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Literal, Optional, Set, Tuple
+
+import numpy as np
+
+from core.domain import BookID, Rating, UserID
+from core.catalog import Books, Catalog, Ratings, all_books, all_ratings, per_catalog
+from core.vectorized import top_k
+
+Similarity = Literal["cosine", "adjusted_cosine"]
+
+
+@dataclass(frozen=True, slots=True)
+class _Matrix:
+    """User x book ratings in CSR by book and by user, plus book column norms"""
+    book_ptr: np.ndarray
+    book_users: np.ndarray
+    book_vals: np.ndarray
+    user_ptr: np.ndarray
+    user_books: np.ndarray
+    user_vals: np.ndarray
+    norms: np.ndarray
+
+
+def _csr(keys: np.ndarray, other: np.ndarray, vals: np.ndarray, n: int):
+    order = np.argsort(keys, kind="stable")
+    ptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=ptr[1:])
+    return ptr, other[order], vals[order]
+
+
+def _build_matrix(users: np.ndarray, books: np.ndarray, values: np.ndarray,
+                  n_users: int, n_books: int, similarity: Similarity) -> _Matrix:
+    vals = values.astype(np.float64)
+    if similarity == "adjusted_cosine" and vals.size:
+        counts = np.bincount(users, minlength=n_users)
+        means = np.bincount(users, weights=vals, minlength=n_users) / np.maximum(counts, 1)
+        vals = vals - means[users]
+    book_ptr, book_users, book_vals = _csr(books, users, vals, n_books)
+    user_ptr, user_books, user_vals = _csr(users, books, vals, n_users)
+    norms = np.sqrt(np.bincount(books, weights=vals * vals, minlength=n_books))
+    return _Matrix(book_ptr, book_users, book_vals, user_ptr, user_books, user_vals, norms)
+
+
+def _neighbour_rows(m: _Matrix, lo: int, hi: int, k: int, min_support: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k neighbours (positive similarity only) of books ``lo..hi-1``"""
+    ids = np.full((hi - lo, k), -1, dtype=np.int32)
+    sims = np.zeros((hi - lo, k), dtype=np.float32)
+    for row, i in enumerate(range(lo, hi)):
+        a, b = m.book_ptr[i], m.book_ptr[i + 1]
+        if a == b or m.norms[i] == 0:
+            continue
+        us, ws = m.book_users[a:b], m.book_vals[a:b]
+        starts = m.user_ptr[us]
+        lengths = m.user_ptr[us + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(int(lengths.sum()))
+        other = m.user_books[offsets]
+        prod = m.user_vals[offsets] * np.repeat(ws, lengths)
+
+        # скалярные произведения только с реально совместно оценёнными книгами
+        uniq, inv = np.unique(other, return_inverse=True)
+        dot = np.bincount(inv, weights=prod, minlength=uniq.size)
+        support = np.bincount(inv, minlength=uniq.size)
+        denom = m.norms[i] * m.norms[uniq]
+        sim = np.divide(dot, denom, out=np.zeros_like(dot), where=denom > 0)
+        keep = np.flatnonzero((sim > 0) & (support >= min_support) & (uniq != i))
+        top = top_k(sim, keep, k)
+        ids[row, :top.size] = uniq[top]
+        sims[row, :top.size] = sim[top]
+    return ids, sims
+
+
+# Матрица для процессов пула: передаётся один раз через initializer
+_WORKER_MATRIX: Optional[_Matrix] = None
+
+
+def _init_worker(m: _Matrix) -> None:
+    global _WORKER_MATRIX
+    _WORKER_MATRIX = m
+
+
+def _worker_rows(args: Tuple[int, int, int, int]) -> Tuple[int, np.ndarray, np.ndarray]:
+    lo, hi, k, min_support = args
+    ids, sims = _neighbour_rows(_WORKER_MATRIX, lo, hi, k, min_support)
+    return lo, ids, sims
+
+
+class ItemCF:
+    """Item-item CF model; mutable like ``RatingAggregates`` (``add`` + ``refresh``)"""
+
+    def __init__(
+        self,
+        ratings: Iterable[Rating] = (),
+        k: int = 20,
+        similarity: Similarity = "adjusted_cosine",
+        min_support: int = 1,
+        books: Optional[Books] = None,
+        workers: int = 1,
+    ):
+        if similarity not in ("cosine", "adjusted_cosine"):
+            raise ValueError(f"Unknown similarity: {similarity}")
+        self.k = k
+        self.similarity = similarity
+        self.min_support = min_support
+        self.workers = workers
+        self.book_ids: List[BookID] = []
+        self.user_ids: List[UserID] = []
+        self._book_index: Dict[BookID, int] = {}
+        self._user_index: Dict[UserID, int] = {}
+        self._by_user: Dict[int, Dict[int, int]] = {}
+        self._dirty: Set[int] = set()
+        # книги каталога регистрируются первыми — порядок каталога решает ничьи
+        for book in all_books(books) if books is not None else ():
+            self._intern(self.book_ids, self._book_index, book.id)
+        for r in ratings:
+            self._store(r)
+        self.neighbours = np.full((len(self.book_ids), k), -1, dtype=np.int32)
+        self.sims = np.zeros((len(self.book_ids), k), dtype=np.float32)
+        self.rebuild()
+
+    @staticmethod
+    def _intern(ids: List[str], index: Dict[str, int], key: str) -> int:
+        i = index.get(key)
+        if i is None:
+            i = index[key] = len(ids)
+            ids.append(key)
+        return i
+
+    def _store(self, r: Rating) -> Tuple[int, int]:
+        u = self._intern(self.user_ids, self._user_index, r.user_id)
+        b = self._intern(self.book_ids, self._book_index, r.book_id)
+        self._by_user.setdefault(u, {})[b] = r.value
+        return u, b
+
+    def _matrix(self) -> _Matrix:
+        n = sum(len(x) for x in self._by_user.values())
+        users = np.fromiter((u for u, row in self._by_user.items() for _ in row), dtype=np.int64, count=n)
+        books = np.fromiter((b for row in self._by_user.values() for b in row), dtype=np.int64, count=n)
+        values = np.fromiter((v for row in self._by_user.values() for v in row.values()), dtype=np.float64, count=n)
+        return _build_matrix(users, books, values, len(self.user_ids), len(self.book_ids), self.similarity)
+
+    def _grow(self) -> None:
+        extra = len(self.book_ids) - self.neighbours.shape[0]
+        if extra > 0:
+            self.neighbours = np.vstack((self.neighbours, np.full((extra, self.k), -1, dtype=np.int32)))
+            self.sims = np.vstack((self.sims, np.zeros((extra, self.k), dtype=np.float32)))
+
+    # ---------- Построение ----------
+
+    def rebuild(self, workers: Optional[int] = None) -> None:
+        """Full neighbour build; book ranges go to a process pool when ``workers > 1``"""
+        workers = self.workers if workers is None else workers
+        self._grow()
+        m = self._matrix()
+        n = len(self.book_ids)
+        if workers <= 1 or n < 2:
+            if n:
+                self.neighbours[:], self.sims[:] = _neighbour_rows(m, 0, n, self.k, self.min_support)
+        else:
+            step = -(-n // (workers * 4))  # несколько диапазонов на процесс — равномернее нагрузка
+            tasks = [(lo, min(lo + step, n), self.k, self.min_support) for lo in range(0, n, step)]
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(m,)) as pool:
+                for lo, ids, sims in pool.map(_worker_rows, tasks):
+                    self.neighbours[lo:lo + len(ids)] = ids
+                    self.sims[lo:lo + len(sims)] = sims
+        self._dirty.clear()
+
+    def add(self, rating: Rating) -> None:
+        """Record a new rating; affected rows are recomputed by ``refresh``"""
+        u, b = self._store(rating)
+        self._grow()
+        # меняются норма и скалярные произведения книги b со всеми книгами пользователя,
+        # а при adjusted cosine — и центрированные оценки всех его книг
+        self._dirty.update(self._by_user[u])
+
+    def refresh(self) -> int:
+        """Recompute the neighbour lists of books touched since the last build.
+
+        Lists of other books that contain a touched book keep their slightly
+        stale similarity until the next ``rebuild``.
+        """
+        if not self._dirty:
+            return 0
+        m = self._matrix()
+        dirty = sorted(self._dirty)
+        for i in dirty:
+            ids, sims = _neighbour_rows(m, i, i + 1, self.k, self.min_support)
+            self.neighbours[i], self.sims[i] = ids[0], sims[0]
+        self._dirty.clear()
+        return len(dirty)
+
+    # ---------- Запросы ----------
+
+    def neighbours_of(self, book_id: BookID) -> Tuple[Tuple[BookID, float], ...]:
+        i = self._book_index.get(book_id)
+        if i is None:
+            return ()
+        return tuple(
+            (self.book_ids[j], float(s)) for j, s in zip(self.neighbours[i], self.sims[i]) if j >= 0
+        )
+
+    def recommend(self, user_id: UserID, k: int = 10) -> Tuple[BookID, ...]:
+        """Books scored by sum(sim(i, j) * (r_ui - 3)) over the user's rated books i"""
+        rated = self._by_user.get(self._user_index.get(user_id, -1))
+        if not rated:
+            return tuple()
+        rows = np.fromiter(rated, dtype=np.int64, count=len(rated))
+        weights = np.fromiter(rated.values(), dtype=np.float64, count=len(rated)) - 3  # в отличие от memo без отсечки: плохая оценка отталкивает соседей
+
+        cand = self.neighbours[rows].ravel()
+        contrib = (self.sims[rows] * weights[:, None]).ravel()
+        valid = cand >= 0
+        cand, contrib = cand[valid], contrib[valid]
+        keep = ~np.isin(cand, rows)
+        if not keep.any():
+            return tuple()
+        uniq, inv = np.unique(cand[keep], return_inverse=True)
+        scores = np.bincount(inv, weights=contrib[keep], minlength=uniq.size)
+        top = top_k(scores, np.flatnonzero(scores > 0), k)
+        return tuple(self.book_ids[uniq[t]] for t in top)
+
+    def nbytes(self) -> int:
+        """Size of the neighbour arrays"""
+        return self.neighbours.nbytes + self.sims.nbytes
+
+
+@per_catalog
+def _catalog_item_cf(catalog: Catalog) -> ItemCF:
+    return ItemCF(all_ratings(catalog), books=catalog)
+
+
+def item_cf(ratings_index: Catalog) -> ItemCF:
+    """``ItemCF`` for a Catalog's ratings, built once per Catalog.
+
+    Plain rating tuples carry no identity to cache on — build an ``ItemCF``
+    for them explicitly and pass it as ``model``.
+    """
+    if not isinstance(ratings_index, Catalog):
+        raise TypeError("item_cf caches per Catalog; build ItemCF(ratings) for plain ratings")
+    return _catalog_item_cf(ratings_index)
+
+
+def recommend_for_user_cf(
+    user_id: str,
+    ratings_index: Ratings,
+    books_index: Optional[Books] = None,
+    k: int = 10,
+    model: Optional[ItemCF] = None,
+) -> Tuple[str, ...]:
+    """Item-based recommendations; ``books_index`` is kept for parity with
+    ``recommend_for_user`` — the model only scores books that have ratings"""
+    if model is None:
+        model = item_cf(ratings_index)
+    return model.recommend(user_id, k)
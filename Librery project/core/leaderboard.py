@@ -0,0 +1,225 @@
+# core/leaderboard.py
+"""Incrementally maintained top-rated leaderboard.
+
+Books are kept ordered by score in an indexable skip list (every forward
+link stores how many positions it skips), so one new rating is an
+O(log n) remove + insert, ``rank`` is O(log n) and ``top(n)`` is
+O(log n + n). The score is the plain mean by default; with
+``prior_weight=C`` it is the Bayesian average
+``(C * prior_mean + sum) / (C + count)``, so a single 5-star rating cannot
+outrank a book with hundreds of 4.8s. ``prior_mean`` is fixed when the
+board is built (default: the global mean at that time); otherwise every
+rating would shift every score. Books with fewer than ``min_count``
+ratings stay off the board until they qualify.
+
+With the defaults, ``top(n)`` equals ``functional.top_books_by_avg``: ties
+keep catalog order.
+"""
+import random
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from core.aggregates import EMPTY_STATS, RatingAggregates, RatingStats
+from core.catalog import Books, RatingSource, all_books, rating_aggregates
+from core.domain import BookID, Rating
+
+MAX_LEVELS = 24   # до ~16 млн книг при p = 1/2
+
+Key = Tuple[float, int]   # (-score, порядковый номер книги)
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key: Optional[Key], levels: int):
+        self.key = key
+        self.next: List[Optional["_Node"]] = [None] * levels
+        self.width: List[int] = [1] * levels
+
+
+class _SkipList:
+    """Sorted keys with O(log n) insert / remove / rank / positional access"""
+    __slots__ = ("_head", "_size", "_rnd")
+
+    def __init__(self, seed: int = 0):
+        self._head = _Node(None, MAX_LEVELS)
+        self._size = 0
+        self._rnd = random.Random(seed)
+
+    @classmethod
+    def from_sorted(cls, keys: List[Key], seed: int = 0) -> "_SkipList":
+        """Bulk build in O(n): link levels left to right instead of n searches"""
+        sl = cls(seed)
+        last: List[_Node] = [sl._head] * MAX_LEVELS
+        last_pos = [0] * MAX_LEVELS
+        for pos, key in enumerate(keys, 1):
+            node = _Node(key, sl._level())
+            for level in range(len(node.next)):
+                last[level].next[level] = node
+                last[level].width[level] = pos - last_pos[level]
+                last[level], last_pos[level] = node, pos
+        # ширина последнего звена каждого уровня — до позиции за концом списка
+        for level in range(MAX_LEVELS):
+            last[level].width[level] = len(keys) + 1 - last_pos[level]
+        sl._size = len(keys)
+        return sl
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _level(self) -> int:
+        level = 1
+        while level < MAX_LEVELS and self._rnd.random() < 0.5:
+            level += 1
+        return level
+
+    def insert(self, key: Key) -> None:
+        chain: List[_Node] = [self._head] * MAX_LEVELS
+        steps = [0] * MAX_LEVELS
+        node = self._head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                steps[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+        height = self._level()
+        new = _Node(key, height)
+        skipped = 0
+        for level in range(height):
+            prev = chain[level]
+            new.next[level] = prev.next[level]
+            prev.next[level] = new
+            new.width[level] = prev.width[level] - skipped
+            prev.width[level] = skipped + 1
+            skipped += steps[level]
+        for level in range(height, MAX_LEVELS):
+            chain[level].width[level] += 1
+        self._size += 1
+
+    def remove(self, key: Key) -> None:
+        chain: List[_Node] = [self._head] * MAX_LEVELS
+        node = self._head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                node = node.next[level]
+            chain[level] = node
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        for level in range(len(target.next)):
+            prev = chain[level]
+            prev.width[level] += target.width[level] - 1
+            prev.next[level] = target.next[level]
+        for level in range(len(target.next), MAX_LEVELS):
+            chain[level].width[level] -= 1
+        self._size -= 1
+
+    def rank(self, key: Key) -> int:
+        """0-based position of ``key`` (which must be present)"""
+        node, pos = self._head, 0
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                pos += node.width[level]
+                node = node.next[level]
+        return pos
+
+    def iter_from(self, index: int) -> Iterator[Key]:
+        """Keys from position ``index`` on: O(log n) to find it, then O(1) per key"""
+        if index >= self._size:
+            return
+        node, remaining = self._head, index + 1
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+
+class Leaderboard:
+    """Books ordered by (adjusted) average rating, updated one rating at a time"""
+
+    def __init__(self, books: Books, ratings: RatingSource = (), min_count: int = 0,
+                 prior_weight: float = 0.0, prior_mean: Optional[float] = None, seed: int = 0):
+        stats = rating_aggregates(ratings)
+        if stats is None:
+            stats = RatingAggregates(ratings)
+        self.min_count = min_count
+        self.prior_weight = prior_weight
+        if prior_mean is None:
+            count = sum(s.count for _, s in stats.items())
+            prior_mean = sum(s.total for _, s in stats.items()) / count if count else 0.0
+        self.prior_mean = prior_mean
+
+        self._ordinal: Dict[BookID, int] = {}
+        for b in all_books(books):
+            self._ordinal.setdefault(b.id, len(self._ordinal))
+        for book_id, _ in stats.items():
+            self._ordinal.setdefault(book_id, len(self._ordinal))
+        self._stats: Dict[BookID, RatingStats] = {book_id: stats.get(book_id) for book_id in self._ordinal}
+        self._ids: List[BookID] = list(self._ordinal)   # порядковый номер -> id
+        keys = sorted(filter(None, (self._key(book_id) for book_id in self._ids)))
+        self._keys: Dict[BookID, Key] = {self._ids[key[1]]: key for key in keys}
+        self._list = _SkipList.from_sorted(keys, seed)
+
+    # ---------- Счёт ----------
+
+    def score_of(self, stats: RatingStats) -> float:
+        if self.prior_weight:
+            return (self.prior_weight * self.prior_mean + stats.total) / (self.prior_weight + stats.count)
+        return stats.mean
+
+    def _key(self, book_id: BookID) -> Optional[Key]:
+        stats = self._stats[book_id]
+        if stats.count < self.min_count:
+            return None
+        return (-self.score_of(stats), self._ordinal[book_id])
+
+    # ---------- Обновление ----------
+
+    def add(self, rating: Rating) -> Optional[int]:
+        """Account for one new rating in O(log n); returns the book's new 1-based rank"""
+        book_id = rating.book_id
+        if book_id not in self._ordinal:
+            self._ordinal[book_id] = len(self._ids)
+            self._ids.append(book_id)
+            self._stats[book_id] = EMPTY_STATS
+        self._stats[book_id] = self._stats[book_id].add(rating.value)
+        old = self._keys.pop(book_id, None)
+        if old is not None:
+            self._list.remove(old)
+        key = self._key(book_id)
+        if key is None:
+            return None
+        self._list.insert(key)
+        self._keys[book_id] = key
+        return self._list.rank(key) + 1
+
+    # ---------- Запросы ----------
+
+    def top(self, n: int = 10, offset: int = 0) -> Tuple[Tuple[BookID, float], ...]:
+        """``(book_id, score)`` for ranks ``offset + 1 .. offset + n``"""
+        out = []
+        for key in self._list.iter_from(max(offset, 0)):
+            if len(out) >= n:
+                break
+            out.append((self._ids[key[1]], -key[0]))
+        return tuple(out)
+
+    def rank(self, book_id: BookID) -> Optional[int]:
+        """1-based rank, or None if the book is not on the board"""
+        key = self._keys.get(book_id)
+        return None if key is None else self._list.rank(key) + 1
+
+    def score(self, book_id: BookID) -> Optional[float]:
+        key = self._keys.get(book_id)
+        return None if key is None else -key[0]
+
+    def stats(self, book_id: BookID) -> RatingStats:
+        return self._stats.get(book_id, EMPTY_STATS)
+
+    def __len__(self) -> int:
+        return len(self._list)
+
+    def __contains__(self, book_id: object) -> bool:
+        return book_id in self._keys
@@ -0,0 +1,129 @@
+# core/loans.py
+"""Loan status engine.
+
+Loans are kept in a ``PersistentMap`` (id -> Loan) changed only through
+``update_loan``, with indexes by user, by book and a min-heap of due dates
+for loans that are still "active". ``sweep(now)`` pops exactly the loans
+that fell due since the previous sweep (O(k log n)); availability of a book
+is a dict lookup.
+"""
+import heapq
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from core.domain import BookID, Loan, UserID
+from core.persistent import PersistentMap
+from core.transforms import update_loan
+
+DEFAULT_LOAN_DAYS = 14
+OPEN_STATUSES = frozenset({"active", "overdue"})  # книга ещё не возвращена
+
+Day = date | str
+
+
+def _day(value: Day) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+class LoanEngine:
+    """Indexed loans with overdue detection; mutable like ``RatingAggregates``"""
+    __slots__ = ("loan_days", "_loans", "_order", "_by_user", "_by_book", "_open_by_book", "_due")
+
+    def __init__(self, loans: Iterable[Loan] = (), loan_days: int = DEFAULT_LOAN_DAYS):
+        self.loan_days = loan_days
+        self._loans: PersistentMap = PersistentMap()
+        self._order: List[str] = []
+        self._by_user: Dict[UserID, List[str]] = {}
+        self._by_book: Dict[BookID, List[str]] = {}
+        self._open_by_book: Dict[BookID, Set[str]] = {}
+        self._due: List[Tuple[date, int, str]] = []  # (срок, порядковый номер, loan id)
+        for loan in loans:
+            self.add(loan)
+
+    # ---------- Изменение ----------
+
+    def add(self, loan: Loan) -> None:
+        if loan.id in self._loans:
+            raise ValueError(f"Loan with ID {loan.id} already exists")
+        self._loans = self._loans.set(loan.id, loan)
+        self._order.append(loan.id)
+        self._by_user.setdefault(loan.user_id, []).append(loan.id)
+        self._by_book.setdefault(loan.book_id, []).append(loan.id)
+        self._index_status(loan)
+
+    def lend(self, loan_id: str, user_id: UserID, book_id: BookID, start: Day) -> Loan:
+        loan = Loan(loan_id, user_id, book_id, _day(start).isoformat(), None, "active")
+        self.add(loan)
+        return loan
+
+    def _index_status(self, loan: Loan) -> None:
+        open_ids = self._open_by_book.setdefault(loan.book_id, set())
+        if loan.status in OPEN_STATUSES:
+            open_ids.add(loan.id)
+        else:
+            open_ids.discard(loan.id)
+        if loan.status == "active":
+            heapq.heappush(self._due, (self.due_date(loan), len(self._order), loan.id))
+
+    def update(self, loan_id: str, status: str, end: Optional[str]) -> Loan:
+        """Change one loan through ``update_loan`` (O(log n)) and reindex it"""
+        if loan_id not in self._loans:
+            raise KeyError(loan_id)
+        self._loans = update_loan(self._loans, loan_id, status, end)
+        loan = self._loans[loan_id]
+        self._index_status(loan)
+        return loan
+
+    def return_loan(self, loan_id: str, day: Day) -> Loan:
+        return self.update(loan_id, "returned", _day(day).isoformat())
+
+    def sweep(self, now: Day) -> Tuple[Loan, ...]:
+        """Mark as "overdue" every active loan whose due date is before ``now``"""
+        now = _day(now)
+        overdue = []
+        while self._due and self._due[0][0] < now:
+            due, _, loan_id = heapq.heappop(self._due)
+            loan = self._loans[loan_id]
+            # запись в куче устарела, если выдачу уже вернули или пометили
+            if loan.status != "active" or self.due_date(loan) != due:
+                continue
+            overdue.append(self.update(loan_id, "overdue", due.isoformat()))
+        return tuple(overdue)
+
+    # ---------- Запросы ----------
+
+    def due_date(self, loan: Loan) -> date:
+        return _day(loan.start) + timedelta(days=self.loan_days)
+
+    def get(self, loan_id: str) -> Optional[Loan]:
+        return self._loans.get(loan_id)
+
+    def is_lent_out(self, book_id: BookID) -> bool:
+        return bool(self._open_by_book.get(book_id))
+
+    def open_loans(self, book_id: BookID) -> Tuple[Loan, ...]:
+        return tuple(self._loans[i] for i in self._open_by_book.get(book_id, ()))
+
+    def user_loans(self, user_id: UserID) -> Tuple[Loan, ...]:
+        return tuple(self._loans[i] for i in self._by_user.get(user_id, ()))
+
+    def book_loans(self, book_id: BookID) -> Tuple[Loan, ...]:
+        return tuple(self._loans[i] for i in self._by_book.get(book_id, ()))
+
+    def has_active_loan(self, user_id: UserID) -> bool:
+        return any(l.status == "active" for l in self.user_loans(user_id))
+
+    @property
+    def loans(self) -> PersistentMap:
+        """Current loans by id (a persistent snapshot, safe to keep)"""
+        return self._loans
+
+    def to_tuple(self) -> Tuple[Loan, ...]:
+        """Current loans in insertion order"""
+        return tuple(self._loans[i] for i in self._order)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, loan_id: object) -> bool:
+        return loan_id in self._loans
@@ -1,27 +1,155 @@
-from functools import lru_cache
-from typing import Tuple, List, Dict, Any
+from collections import OrderedDict
+from typing import Tuple, Dict, Any, Iterable, Optional
+import threading
 import time
+import weakref
 
-from .domain import Book, Rating
+from .domain import Book, Rating, BookID, UserID
 from .transforms import load_seed 
+from .catalog import Books, Catalog, Ratings, all_books, book_by_id, user_ratings as ratings_of_user
+from .instrument import instrumented
 
 
-@lru_cache(maxsize=128)
+class RecommendationCache:
+    """LRU of recommendations keyed on (user_id, dataset version).
+
+    ``version`` is a counter bumped by ``record_rating`` (called from
+    ``add_rating_pipeline``). A new rating only invalidates its author's entry
+    and entries registered as depending on the rated book's aggregates; other
+    users keep hitting. An entry stored with ``basis`` (the user's ratings it
+    was computed from) only hits for the same basis, so a different ratings
+    source never gets another dataset's result. Invalid entries are dropped
+    lazily on lookup.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.version = 0
+        self._entries: "OrderedDict[UserID, Tuple[int, Tuple[BookID, ...], frozenset, Any]]" = OrderedDict()
+        self._user_version: Dict[UserID, int] = {}
+        self._book_version: Dict[BookID, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id: UserID, basis: Any = None) -> Optional[Tuple[BookID, ...]]:
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            version, value, depends_on, stored = entry
+            if self._is_fresh(user_id, version, depends_on) and (stored is basis or stored == basis):
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return value
+            del self._entries[user_id]
+            self.invalidations += 1
+        self.misses += 1
+        return None
+
+    def put(self, user_id: UserID, value: Tuple[BookID, ...], depends_on: Iterable[BookID] = (),
+            basis: Any = None) -> None:
+        """Store ``value``; ``depends_on`` lists books whose aggregates it used"""
+        self._entries[user_id] = (self.version, value, frozenset(depends_on), basis)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def record_rating(self, rating: Rating) -> int:
+        self.version += 1
+        self._user_version[rating.user_id] = self.version
+        self._book_version[rating.book_id] = self.version
+        return self.version
+
+    def _is_fresh(self, user_id: UserID, version: int, depends_on: frozenset) -> bool:
+        if self._user_version.get(user_id, 0) > version:
+            return False
+        return all(self._book_version.get(b, 0) <= version for b in depends_on)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "version": self.version,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Кэши по умолчанию — по одному на источник книг. Каталоги держим по слабым ссылкам;
+# кортежи слабых ссылок не поддерживают, поэтому их (как прежний lru_cache) — в небольшом LRU
+_CATALOG_CACHES: "weakref.WeakKeyDictionary[Catalog, RecommendationCache]" = weakref.WeakKeyDictionary()
+_TUPLE_CACHES: "OrderedDict[int, Tuple[Books, RecommendationCache]]" = OrderedDict()
+_MAX_TUPLE_DATASETS = 8
+_CACHES_LOCK = threading.Lock()
+
+
+def cache_for(books_index: Books) -> RecommendationCache:
+    """Default recommendation cache of a books source (a Catalog or a books tuple)"""
+    with _CACHES_LOCK:
+        if isinstance(books_index, Catalog):
+            cache = _CATALOG_CACHES.get(books_index)
+            if cache is None:
+                cache = _CATALOG_CACHES[books_index] = RecommendationCache()
+            return cache
+        # ключ — идентичность кортежа; сам кортеж в записи не даёт id переиспользоваться
+        entry = _TUPLE_CACHES.get(id(books_index))
+        if entry is None:
+            entry = _TUPLE_CACHES[id(books_index)] = (books_index, RecommendationCache())
+            while len(_TUPLE_CACHES) > _MAX_TUPLE_DATASETS:
+                _TUPLE_CACHES.popitem(last=False)
+        _TUPLE_CACHES.move_to_end(id(books_index))
+        return entry[1]
+
+
+@instrumented()
 def recommend_for_user(
     user_id: str,
-    ratings_index: Tuple[Rating, ...],
-    books_index: Tuple[Book, ...]
+    ratings_index: Ratings,
+    books_index: Books,
+    cache: RecommendationCache | None = None,
 ) -> Tuple[str, ...]:
-    user_ratings = [r for r in ratings_index if r.user_id == user_id]
-    
+    """Top-10 content-based recommendations.
+
+    Without ``cache`` the books source's default cache is used (see
+    ``cache_for``). Entries are checked against the user's current ratings, so
+    the same books with another ratings source never return a stale result.
+    """
+    if cache is None:
+        cache = cache_for(books_index)
+    user_ratings = ratings_of_user(ratings_index, user_id)
+    cached = cache.get(user_id, user_ratings)
+    if cached is not None:
+        return cached
+    result = rank_books(user_ratings, books_index)
+    # новая оценка любой из рекомендованных книг сбрасывает запись
+    cache.put(user_id, result, depends_on=result, basis=user_ratings)
+    return result
+
+
+def recommend_uncached(user_id: str, ratings_index: Ratings, books_index: Books) -> Tuple[str, ...]:
+    """``recommend_for_user`` without any cache (batch jobs, executors)"""
+    return rank_books(ratings_of_user(ratings_index, user_id), books_index)
+
+
+def rank_books(user_ratings: Tuple[Rating, ...], books_index: Books) -> Tuple[str, ...]:
+    """Top-10 unrated books for a user's ratings by content similarity"""
     if not user_ratings:
         return tuple()
     
     user_profile = _build_user_profile(user_ratings, books_index)
+    rated_ids = {r.book_id for r in user_ratings}
 
     book_scores = []
-    for book in books_index:
-        if not any(r.book_id == book.id for r in user_ratings):
+    for book in all_books(books_index):
+        if book.id not in rated_ids:
             score = _calculate_similarity(user_profile, book)
             book_scores.append((book.id, score))
     
@@ -29,11 +157,11 @@ def recommend_for_user(
     return tuple(book_id for book_id, _ in book_scores[:10])
 
 
-def _build_user_profile(user_ratings: List[Rating], books: Tuple[Book, ...]) -> Dict[str, Dict[str, float]]:
+def _build_user_profile(user_ratings: Tuple[Rating, ...], books: Books) -> Dict[str, Dict[str, float]]:
     profile = {'genres': {}, 'authors': {}, 'tags': {}}
     
     for rating in user_ratings:
-        book = next((b for b in books if b.id == rating.book_id), None)
+        book = book_by_id(books, rating.book_id)
         if book:
             weight = max(0, rating.value - 3)  # Вес оценки
             
@@ -67,30 +195,30 @@ def _calculate_similarity(profile: Dict[str, Dict[str, float]], book: Book) -> f
 def measure_recommendation_performance() -> Dict[str, Any]:
     try:
         data = load_seed("data/seed.json")  
-        books = tuple(data["books"])
-        ratings = tuple(data["ratings"])
         
-        users_with_ratings = list({r.user_id for r in ratings})
+        users_with_ratings = list(data.ratings_by_user)
         test_users = users_with_ratings[:5] if len(users_with_ratings) >= 5 else users_with_ratings
         
         if not test_users:
             return {"error": "Нет пользователей с оценками"}
         
-        start_time = time.time()
+        cache = RecommendationCache()
+        start_time = time.perf_counter()
         for user_id in test_users:
-            recommend_for_user(user_id, ratings, books)
-        first_call_time = time.time() - start_time
+            recommend_for_user(user_id, data, data, cache)
+        first_call_time = time.perf_counter() - start_time
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         for user_id in test_users:
-            recommend_for_user(user_id, ratings, books)
-        second_call_time = time.time() - start_time
+            recommend_for_user(user_id, data, data, cache)
+        second_call_time = time.perf_counter() - start_time
         
         return {
             "first_call_avg_ms": round((first_call_time / len(test_users)) * 1000, 2),
             "second_call_avg_ms": round((second_call_time / len(test_users)) * 1000, 2),
             "speedup": round(first_call_time / second_call_time, 2) if second_call_time > 0 else 0,
-            "users_tested": len(test_users)
+            "users_tested": len(test_users),
+            "cache": cache.stats(),
         }
     
     except Exception as e:
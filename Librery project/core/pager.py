@@ -0,0 +1,130 @@
+# core/pager.py
+"""Server-side pagination and search-as-you-type option indexes.
+
+``OptionIndex`` holds ``(id, label)`` pairs once per catalog version (it is
+a derived index in ``core.store``) and answers prefix queries over ids and
+label words with ``bisect`` on a sorted word list, so a picker only ever
+ships ``limit`` options to the browser however large the catalog is.
+``paginate`` slices any sequence into fixed-size pages.
+"""
+import bisect
+from dataclasses import dataclass
+from typing import Dict, Generic, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from core.catalog import Catalog
+from core.search import normalize
+
+T = TypeVar("T")
+
+DEFAULT_PAGE_SIZE = 20
+
+
+@dataclass(frozen=True, slots=True)
+class Page(Generic[T]):
+    items: Tuple[T, ...]
+    page: int      # с 1
+    pages: int
+    total: int
+    size: int
+
+    @property
+    def start(self) -> int:
+        """1-based position of the first item (0 for an empty page)"""
+        return (self.page - 1) * self.size + 1 if self.items else 0
+
+    @property
+    def has_next(self) -> bool:
+        return self.page < self.pages
+
+    @property
+    def has_prev(self) -> bool:
+        return self.page > 1
+
+
+def paginate(items: Sequence[T], page: int = 1, size: int = DEFAULT_PAGE_SIZE) -> Page[T]:
+    """Page ``page`` (1-based, clamped to the valid range) of ``items``"""
+    if size <= 0:
+        raise ValueError("page size must be positive")
+    total = len(items)
+    pages = max(1, -(-total // size))
+    page = min(max(page, 1), pages)
+    lo = (page - 1) * size
+    return Page(tuple(items[lo:lo + size]), page, pages, total, size)
+
+
+class OptionIndex:
+    """Id/label picker index: prefix search over ids and label words"""
+    __slots__ = ("ids", "labels", "_row", "_words", "_word_rows", "_tokens")
+
+    def __init__(self, items: Iterable[Tuple[str, str]]):
+        ids: List[str] = []
+        labels: List[str] = []
+        keys: List[Tuple[str, int]] = []
+        tokens: List[Tuple[str, ...]] = []
+        for row, (item_id, label) in enumerate(items):
+            ids.append(item_id)
+            labels.append(label)
+            words = tuple(dict.fromkeys([item_id.casefold(), *normalize(label)]))
+            tokens.append(words)
+            keys.extend((w, row) for w in words)
+        keys.sort()
+        self.ids: Tuple[str, ...] = tuple(ids)
+        self.labels: Tuple[str, ...] = tuple(labels)
+        self._row: Dict[str, int] = {item_id: row for row, item_id in enumerate(ids)}
+        self._words: List[str] = [w for w, _ in keys]
+        self._word_rows: List[int] = [row for _, row in keys]
+        self._tokens: Tuple[Tuple[str, ...], ...] = tuple(tokens)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, item_id: object) -> bool:
+        return item_id in self._row
+
+    def label(self, item_id: Optional[str]) -> str:
+        row = self._row.get(item_id) if item_id is not None else None
+        return self.labels[row] if row is not None else str(item_id or "")
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        lo = bisect.bisect_left(self._words, prefix)
+        return lo, bisect.bisect_left(self._words, prefix + "\uffff", lo)
+
+    def search(self, query: str, limit: int = 50) -> List[str]:
+        """Up to ``limit`` ids whose id or label words start with every query word.
+
+        An exact id match comes first; an empty query returns the first ids.
+        Cost is O(log n) plus the scanned prefix range, not O(n).
+        """
+        words = normalize(query)
+        if not words:
+            return list(self.ids[:limit])
+        exact = query.strip()
+        found: List[str] = [exact] if exact in self._row else []
+        seen = {self._row[exact]} if found else set()
+
+        # перебираем самый узкий диапазон, остальные слова проверяем по токенам строки
+        by_width = sorted(((self._range(w), w) for w in words), key=lambda rw: rw[0][1] - rw[0][0])
+        (lo, hi), _ = by_width[0]
+        rest = [w for _, w in by_width[1:]]
+        for i in range(lo, hi):
+            if len(found) >= limit:
+                break
+            row = self._word_rows[i]
+            if row in seen:
+                continue
+            seen.add(row)
+            tokens = self._tokens[row]
+            if all(any(t.startswith(w) for t in tokens) for w in rest):
+                found.append(self.ids[row])
+        return found[:limit]
+
+    def page(self, page: int = 1, size: int = DEFAULT_PAGE_SIZE) -> Page[str]:
+        return paginate(self.ids, page, size)
+
+
+def book_options(catalog: Catalog) -> OptionIndex:
+    return OptionIndex((b.id, f"{b.id} - {b.title}") for b in catalog.books)
+
+
+def user_options(catalog: Catalog) -> OptionIndex:
+    return OptionIndex((u.id, f"{u.id} - {u.name}") for u in catalog.users)
@@ -0,0 +1,346 @@
+# core/persistent.py
+"""Persistent (immutable, structurally shared) collections.
+
+``PersistentVector`` is a 32-way bit-partitioned trie with a tail buffer:
+``append`` and ``set`` copy only the O(log32 n) nodes on one path.
+``PersistentMap`` is a hash array mapped trie (HAMT) with the same cost for
+``set`` / ``delete``. Older versions stay valid and share all untouched nodes.
+``SideTable`` attaches derived data (aggregates, key positions) to a version.
+"""
+import weakref
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+
+
+# ========== VECTOR ==========
+
+class PersistentVector(Sequence):
+    __slots__ = ("_count", "_shift", "_root", "_tail", "__weakref__")
+
+    def __init__(self, items: Iterable[Any] = ()):
+        # сразу целыми листьями по 32 — то же дерево, что дали бы n вызовов append
+        items = tuple(items)
+        count = len(items)
+        tail_offset = 0 if count < _WIDTH else ((count - 1) >> _BITS) << _BITS
+        nodes = [items[i:i + _WIDTH] for i in range(0, tail_offset, _WIDTH)]
+        shift = _BITS
+        while len(nodes) > _WIDTH:
+            nodes = [tuple(nodes[i:i + _WIDTH]) for i in range(0, len(nodes), _WIDTH)]
+            shift += _BITS
+        self._count, self._shift, self._root, self._tail = count, shift, tuple(nodes), items[tail_offset:]
+
+    @classmethod
+    def _make(cls, count: int, shift: int, root: tuple, tail: tuple) -> "PersistentVector":
+        vec = cls.__new__(cls)
+        vec._count, vec._shift, vec._root, vec._tail = count, shift, root, tail
+        return vec
+
+    def _tail_offset(self) -> int:
+        return 0 if self._count < _WIDTH else ((self._count - 1) >> _BITS) << _BITS
+
+    def _leaf(self, i: int) -> tuple:
+        if i >= self._tail_offset():
+            return self._tail
+        node = self._root
+        for level in range(self._shift, 0, -_BITS):
+            node = node[(i >> level) & _MASK]
+        return node
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(self[j] for j in range(*i.indices(self._count)))
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("PersistentVector index out of range")
+        return self._leaf(i)[i & _MASK]
+
+    def __iter__(self) -> Iterator[Any]:
+        for start in range(0, self._tail_offset(), _WIDTH):
+            yield from self._leaf(start)
+        yield from self._tail
+
+    def append(self, x: Any) -> "PersistentVector":
+        if len(self._tail) < _WIDTH:
+            return self._make(self._count + 1, self._shift, self._root, self._tail + (x,))
+        # хвост заполнен — переносим его в дерево
+        tail_node, shift = self._tail, self._shift
+        if (self._count >> _BITS) > (1 << shift):
+            root = (self._root, self._new_path(shift, tail_node))
+            shift += _BITS
+        else:
+            root = self._push_tail(shift, self._root, tail_node)
+        return self._make(self._count + 1, shift, root, (x,))
+
+    def _push_tail(self, level: int, parent: tuple, tail_node: tuple) -> tuple:
+        sub = ((self._count - 1) >> level) & _MASK
+        if level == _BITS:
+            insert = tail_node
+        elif sub < len(parent):
+            insert = self._push_tail(level - _BITS, parent[sub], tail_node)
+        else:
+            insert = self._new_path(level - _BITS, tail_node)
+        return parent[:sub] + (insert,) + parent[sub + 1:]
+
+    @staticmethod
+    def _new_path(level: int, node: tuple) -> tuple:
+        for _ in range(level // _BITS):
+            node = (node,)
+        return node
+
+    def set(self, i: int, x: Any) -> "PersistentVector":
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("PersistentVector index out of range")
+        if i >= self._tail_offset():
+            j = i & _MASK
+            return self._make(self._count, self._shift, self._root, self._tail[:j] + (x,) + self._tail[j + 1:])
+
+        def assoc(level: int, node: tuple) -> tuple:
+            j = (i >> level) & _MASK
+            child = x if level == 0 else assoc(level - _BITS, node[j])
+            return node[:j] + (child,) + node[j + 1:]
+
+        return self._make(self._count, self._shift, assoc(self._shift, self._root), self._tail)
+
+    def extend(self, items: Iterable[Any]) -> "PersistentVector":
+        vec = self
+        for x in items:
+            vec = vec.append(x)
+        return vec
+
+    def __add__(self, other: Iterable[Any]) -> "PersistentVector":
+        return self.extend(other)
+
+    def __eq__(self, other: object) -> bool:
+        # сравнение поэлементно с любой последовательностью (в т.ч. кортежем)
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __hash__(self) -> int:
+        return hash(tuple(self))
+
+    def __repr__(self) -> str:
+        return f"PersistentVector({list(self)!r})"
+
+
+# ========== HAMT ==========
+
+class _Node:
+    __slots__ = ("bitmap", "entries")
+
+    def __init__(self, bitmap: int, entries: tuple):
+        self.bitmap = bitmap
+        self.entries = entries  # (hash, key, value) | _Node | _Collision
+
+
+class _Collision:
+    __slots__ = ("hash", "pairs")
+
+    def __init__(self, h: int, pairs: Tuple[Tuple[Any, Any], ...]):
+        self.hash = h
+        self.pairs = pairs
+
+
+def _hash(key: Any) -> int:
+    return hash(key) & 0xFFFFFFFFFFFFFFFF
+
+
+def _bit(h: int, shift: int) -> int:
+    return 1 << ((h >> shift) & _MASK)
+
+
+def _merge(shift: int, a: tuple, b: tuple):
+    if a[0] == b[0]:
+        return _Collision(a[0], ((a[1], a[2]), (b[1], b[2])))
+    ba, bb = _bit(a[0], shift), _bit(b[0], shift)
+    if ba == bb:
+        return _Node(ba, (_merge(shift + _BITS, a, b),))
+    return _Node(ba | bb, (a, b) if ba < bb else (b, a))
+
+
+def _assoc(node, shift: int, h: int, key: Any, value: Any):
+    """Returns (new node, added?)"""
+    if isinstance(node, _Collision):
+        if node.hash == h:
+            for i, (k, v) in enumerate(node.pairs):
+                if k == key:
+                    if v is value:
+                        return node, False
+                    return _Collision(h, node.pairs[:i] + ((key, value),) + node.pairs[i + 1:]), False
+            return _Collision(h, node.pairs + ((key, value),)), True
+        # другой хэш: поднимаем коллизию в обычный узел
+        wrapper = _Node(_bit(node.hash, shift), (node,))
+        return _assoc(wrapper, shift, h, key, value)
+
+    bit = _bit(h, shift)
+    idx = (node.bitmap & (bit - 1)).bit_count()
+    entries = node.entries
+    if not node.bitmap & bit:
+        return _Node(node.bitmap | bit, entries[:idx] + ((h, key, value),) + entries[idx:]), True
+    entry = entries[idx]
+    if isinstance(entry, (_Node, _Collision)):
+        new, added = _assoc(entry, shift + _BITS, h, key, value)
+        if new is entry:
+            return node, False
+    elif entry[0] == h and entry[1] == key:
+        if entry[2] is value:
+            return node, False
+        new, added = (h, key, value), False
+    else:
+        new, added = _merge(shift + _BITS, entry, (h, key, value)), True
+    return _Node(node.bitmap, entries[:idx] + (new,) + entries[idx + 1:]), added
+
+
+def _find(node, shift: int, h: int, key: Any) -> Optional[tuple]:
+    while True:
+        if isinstance(node, _Collision):
+            for k, v in node.pairs:
+                if k == key:
+                    return (h, k, v)
+            return None
+        bit = _bit(h, shift)
+        if not node.bitmap & bit:
+            return None
+        entry = node.entries[(node.bitmap & (bit - 1)).bit_count()]
+        if isinstance(entry, (_Node, _Collision)):
+            node, shift = entry, shift + _BITS
+        else:
+            return entry if entry[0] == h and entry[1] == key else None
+
+
+def _without(node, shift: int, h: int, key: Any):
+    """Returns the node without ``key`` (None if it became empty); same node if absent"""
+    if isinstance(node, _Collision):
+        pairs = tuple(p for p in node.pairs if p[0] != key)
+        if len(pairs) == len(node.pairs):
+            return node
+        if len(pairs) == 1:
+            return _Node(_bit(h, shift), ((h,) + pairs[0],))
+        return _Collision(h, pairs)
+
+    bit = _bit(h, shift)
+    if not node.bitmap & bit:
+        return node
+    idx = (node.bitmap & (bit - 1)).bit_count()
+    entry = node.entries[idx]
+    if isinstance(entry, (_Node, _Collision)):
+        new = _without(entry, shift + _BITS, h, key)
+        if new is entry:
+            return node
+        # единственный лист в подузле поднимаем на уровень выше
+        if isinstance(new, _Node) and len(new.entries) == 1 and isinstance(new.entries[0], tuple):
+            new = new.entries[0]
+    elif entry[0] == h and entry[1] == key:
+        new = None
+    else:
+        return node
+    if new is None:
+        if node.bitmap == bit:
+            return None
+        return _Node(node.bitmap ^ bit, node.entries[:idx] + node.entries[idx + 1:])
+    return _Node(node.bitmap, node.entries[:idx] + (new,) + node.entries[idx + 1:])
+
+
+def _walk(node) -> Iterator[Tuple[Any, Any]]:
+    if isinstance(node, _Collision):
+        yield from node.pairs
+        return
+    for entry in node.entries:
+        if isinstance(entry, (_Node, _Collision)):
+            yield from _walk(entry)
+        else:
+            yield entry[1], entry[2]
+
+
+class PersistentMap(Mapping):
+    __slots__ = ("_root", "_count")
+
+    def __init__(self, items: Any = ()):
+        self._root, self._count = _Node(0, ()), 0
+        pairs = items.items() if isinstance(items, Mapping) else items
+        m = self
+        for k, v in pairs:
+            m = m.set(k, v)
+        self._root, self._count = m._root, m._count
+
+    @classmethod
+    def _make(cls, root, count: int) -> "PersistentMap":
+        m = cls.__new__(cls)
+        m._root, m._count = root, count
+        return m
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, key: Any) -> Any:
+        entry = _find(self._root, 0, _hash(key), key)
+        if entry is None:
+            raise KeyError(key)
+        return entry[2]
+
+    def __contains__(self, key: object) -> bool:
+        return _find(self._root, 0, _hash(key), key) is not None
+
+    def __iter__(self) -> Iterator[Any]:
+        return (k for k, _ in _walk(self._root))
+
+    def items(self):
+        return _walk(self._root)
+
+    def set(self, key: Any, value: Any) -> "PersistentMap":
+        root, added = _assoc(self._root, 0, _hash(key), key, value)
+        if root is self._root:
+            return self
+        return self._make(root, self._count + added)
+
+    def delete(self, key: Any) -> "PersistentMap":
+        root = _without(self._root, 0, _hash(key), key)
+        if root is self._root:
+            return self
+        return self._make(root if root is not None else _Node(0, ()), self._count - 1)
+
+    def __hash__(self) -> int:
+        return hash(frozenset(self.items()))
+
+    def __repr__(self) -> str:
+        return f"PersistentMap({dict(self.items())!r})"
+
+
+# ========== ПРИВЯЗКА ДАННЫХ К ВЕРСИИ ==========
+
+class SideTable:
+    """Values attached to objects by identity (not by contents), dropped with the object.
+
+    ``WeakKeyDictionary`` would hash a ``PersistentVector`` by its elements;
+    here the key is ``id`` guarded by a weak reference.
+    """
+    __slots__ = ("_values",)
+
+    def __init__(self):
+        self._values: Dict[int, Tuple[weakref.ref, Any]] = {}
+
+    def get(self, obj: Any) -> Any:
+        entry = self._values.get(id(obj))
+        return entry[1] if entry is not None and entry[0]() is obj else None
+
+    def set(self, obj: Any, value: Any) -> None:
+        key, values = id(obj), self._values
+
+        def drop(ref: weakref.ref) -> None:
+            if values.get(key, (None,))[0] is ref:
+                del values[key]
+
+        values[key] = (weakref.ref(obj, drop), value)
+
+    def __len__(self) -> int:
+        return len(self._values)
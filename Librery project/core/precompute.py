@@ -0,0 +1,171 @@
+# core/precompute.py
+"""Parallel precompute of recommendations for every user.
+
+Users are split into shards and scored in a ``ProcessPoolExecutor``. The
+catalog is not pickled per task: each worker maps the binary snapshot
+(``core.snapshot``) once in its initializer, and tasks carry only user ids.
+``worker_pool`` / ``rank_in_worker`` reuse the same workers for online
+scoring (``core.server``).
+Results go to a JSON lookup table that the UI loads once and reads by user.
+"""
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from core.catalog import Catalog
+from core.domain import BookID, Rating, UserID
+from core.memo import rank_books, recommend_uncached
+from core.snapshot import load_snapshot
+
+TABLE_VERSION = 1
+
+# Каталог процесса-исполнителя: загружается из снимка один раз в initializer
+_WORKER_CATALOG: Optional[Catalog] = None
+
+
+def _init_worker(source: Union[str, Catalog]) -> None:
+    global _WORKER_CATALOG
+    # путь к снимку отображается в память; каталог без снимка передаётся один раз на процесс
+    _WORKER_CATALOG = load_snapshot(source) if isinstance(source, str) else source
+
+
+def worker_pool(source: Union[str, Catalog], workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Process pool whose workers hold the catalog: a snapshot path is mapped,
+    a Catalog is pickled once per worker rather than per task"""
+    # не fork: дочерние процессы унаследовали бы открытые сокеты сервера / Streamlit
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    return ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(source,))
+
+
+def rank_in_worker(user_ratings: Tuple[Rating, ...]) -> Tuple[BookID, ...]:
+    """``rank_books`` against the worker's catalog (a task for ``worker_pool``)"""
+    return rank_books(user_ratings, _WORKER_CATALOG)
+
+
+def _recommend_shard(user_ids: Sequence[UserID], catalog: Optional[Catalog] = None) -> List[Tuple[UserID, Tuple[BookID, ...]]]:
+    if catalog is None:
+        catalog = _WORKER_CATALOG
+    return [(uid, recommend_uncached(uid, catalog, catalog)) for uid in user_ids]
+
+
+def _shards(user_ids: Sequence[UserID], workers: int, shard_size: Optional[int]) -> List[Sequence[UserID]]:
+    # по умолчанию ~4 шарда на процесс: хвост из медленных пользователей не держит весь пул
+    size = shard_size or max(1, -(-len(user_ids) // (workers * 4)))
+    return [user_ids[i:i + size] for i in range(0, len(user_ids), size)]
+
+
+@dataclass(frozen=True, slots=True)
+class PrecomputeResult:
+    recommendations: Dict[UserID, Tuple[BookID, ...]]
+    workers: int
+    elapsed_s: float
+
+    @property
+    def n_users(self) -> int:
+        return len(self.recommendations)
+
+    @property
+    def users_per_sec(self) -> float:
+        return self.n_users / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+
+def precompute_recommendations(
+    snapshot_path: str,
+    user_ids: Optional[Iterable[UserID]] = None,
+    workers: int = 4,
+    shard_size: Optional[int] = None,
+) -> PrecomputeResult:
+    """Recommendations for ``user_ids`` (default: every user) over the snapshot.
+
+    ``workers=1`` runs in-process, which is the baseline for the benchmark.
+    """
+    started = time.perf_counter()
+    catalog = None
+    if user_ids is None or workers <= 1:
+        catalog = load_snapshot(snapshot_path)
+    ids = list(dict.fromkeys(u.id for u in catalog.users) if user_ids is None else dict.fromkeys(user_ids))
+
+    result: Dict[UserID, Tuple[BookID, ...]] = {}
+    if workers <= 1:
+        result.update(_recommend_shard(ids, catalog))
+    else:
+        with worker_pool(snapshot_path, workers) as pool:
+            for shard in pool.map(_recommend_shard, _shards(ids, workers, shard_size)):
+                result.update(shard)
+    return PrecomputeResult(result, workers, time.perf_counter() - started)
+
+
+# ---------- Таблица результатов ----------
+
+def save_recommendation_table(result: PrecomputeResult, path: str, snapshot_path: str = "") -> int:
+    """Write the lookup table atomically; returns its size in bytes"""
+    payload = {
+        "version": TABLE_VERSION,
+        "snapshot": snapshot_path,
+        "created": time.time(),
+        "workers": result.workers,
+        "elapsed_s": round(result.elapsed_s, 4),
+        "recommendations": {uid: list(recs) for uid, recs in result.recommendations.items()},
+    }
+    p = Path(path)
+    tmp = p.with_suffix(p.suffix + ".tmp")
+    tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, p)  # читатели видят либо старую, либо новую таблицу целиком
+    return p.stat().st_size
+
+
+class RecommendationTable:
+    """Read side of the precomputed table: O(1) lookup per user"""
+    __slots__ = ("meta", "_recs")
+
+    def __init__(self, path: str):
+        with Path(path).open(encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != TABLE_VERSION:
+            raise ValueError(f"Unsupported recommendation table version {payload.get('version')}")
+        self._recs: Dict[UserID, Tuple[BookID, ...]] = {
+            uid: tuple(recs) for uid, recs in payload.pop("recommendations").items()
+        }
+        self.meta: Dict[str, Any] = payload
+
+    def get(self, user_id: UserID) -> Optional[Tuple[BookID, ...]]:
+        return self._recs.get(user_id)
+
+    def __contains__(self, user_id: object) -> bool:
+        return user_id in self._recs
+
+    def __len__(self) -> int:
+        return len(self._recs)
+
+
+# ---------- Бенчмарк ----------
+
+def benchmark_precompute(
+    snapshot_path: str,
+    workers: Iterable[int] = (1, 2, 4, 8),
+    user_ids: Optional[Iterable[UserID]] = None,
+) -> List[Dict[str, Any]]:
+    """Wall time per worker count; ``speedup`` / ``efficiency`` are relative to the first entry"""
+    ids = None if user_ids is None else list(user_ids)
+    rows: List[Dict[str, Any]] = []
+    base = None
+    for n in workers:
+        result = precompute_recommendations(snapshot_path, ids, workers=n)
+        if base is None:
+            base = (result.elapsed_s, n)
+        speedup = base[0] / result.elapsed_s if result.elapsed_s > 0 else 0.0
+        rows.append({
+            "workers": n,
+            "users": result.n_users,
+            "elapsed_s": round(result.elapsed_s, 4),
+            "users_per_sec": round(result.users_per_sec, 1),
+            "speedup": round(speedup, 2),
+            "efficiency": round(speedup * base[1] / n, 2),
+        })
+    return rows
@@ -0,0 +1,292 @@
+# core/query.py
+"""Lazy, composable queries over the books of a catalog.
+
+``Query`` only records a plan; nothing runs until ``books()`` / ``ids()`` /
+``scored()`` / iteration. At execution time the plan is optimised:
+
+* when ``books`` is a ``Catalog``, two or more genre / tag / author / year
+  filters are intersected as facet bitmaps (``core.bitmap``); a single one
+  scans its index posting (optionally a whole genre/tag subtree);
+  otherwise all books are scanned;
+* every other filter is fused into one predicate, cheap attribute checks
+  first, rating aggregates looked up once per book and only if needed;
+* ``order_by`` + ``limit`` becomes a bounded heap (``heapq.nlargest``)
+  instead of a full sort; ``limit`` alone stops the scan early.
+
+Each candidate book is touched at most once::
+
+    Query(catalog).genre("g1", recursive=True).avg_ge(4).order_by("avg").limit(20).scored()
+"""
+import heapq
+from dataclasses import dataclass, replace
+from itertools import islice
+from typing import Any, Callable, Iterator, List, Optional, Tuple, Union
+
+from core.bitmap import facet_index
+from core.aggregates import EMPTY_STATS, RatingAggregates, RatingStats
+from core.catalog import Books, Catalog, Genres, RatingSource, Tags, all_books, genre_tree, tag_tree
+from core.domain import Book, BookID
+from core.functional import aggregates_of
+from core.instrument import instrumented
+
+BookKey = Callable[[Book, RatingStats], Any]
+
+# Ключи сортировки: (функция, нужны ли агрегаты оценок)
+ORDER_KEYS = {
+    "avg": (lambda b, s: s.mean, True),
+    "count": (lambda b, s: s.count, True),
+    "year": (lambda b, s: b.year, False),
+    "title": (lambda b, s: b.title.casefold(), False),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class _Step:
+    kind: str            # "genre" | "tag" | "author" | "year" | "avg_ge" | "min_count" | "where"
+    arg: Any
+    recursive: bool = False
+
+    @property
+    def indexed(self) -> bool:
+        return self.kind in ("genre", "tag", "author")
+
+    @property
+    def needs_stats(self) -> bool:
+        return self.kind in ("avg_ge", "min_count")
+
+    def describe(self) -> str:
+        suffix = "/**" if self.recursive else ""
+        return f"{self.kind}={getattr(self.arg, '__name__', self.arg)}{suffix}"
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Query:
+    """Immutable query plan; every builder method returns a new ``Query``"""
+    source: Books
+    ratings: Optional[RatingSource] = None
+    genres: Optional[Genres] = None
+    tags: Optional[Tags] = None
+    steps: Tuple[_Step, ...] = ()
+    order: Optional[Tuple[Union[str, BookKey], bool]] = None
+    limit_n: Optional[int] = None
+
+    # ---------- Построение плана ----------
+
+    def _with(self, step: _Step) -> "Query":
+        return replace(self, steps=self.steps + (step,))
+
+    def genre(self, genre_id: str, recursive: bool = False) -> "Query":
+        return self._with(_Step("genre", genre_id, recursive))
+
+    def tag(self, tag_id: str, recursive: bool = False) -> "Query":
+        return self._with(_Step("tag", tag_id, recursive))
+
+    def author(self, author_id: str) -> "Query":
+        return self._with(_Step("author", author_id))
+
+    def year(self, lo: Optional[int] = None, hi: Optional[int] = None) -> "Query":
+        """Books published in ``[lo, hi]`` (either bound may be open)"""
+        return self._with(_Step("year", (lo, hi)))
+
+    def avg_ge(self, threshold: float) -> "Query":
+        return self._with(_Step("avg_ge", threshold))
+
+    def min_ratings(self, n: int) -> "Query":
+        return self._with(_Step("min_count", n))
+
+    def where(self, predicate: Callable[[Book], bool]) -> "Query":
+        return self._with(_Step("where", predicate))
+
+    def order_by(self, key: Union[str, BookKey] = "avg", desc: bool = True) -> "Query":
+        """Sort by ``"avg" | "count" | "year" | "title"`` or ``key(book, stats)``"""
+        if isinstance(key, str) and key not in ORDER_KEYS:
+            raise ValueError(f"Unknown order key {key!r}; expected one of {sorted(ORDER_KEYS)}")
+        return replace(self, order=(key, desc))
+
+    def limit(self, n: int) -> "Query":
+        if n < 0:
+            raise ValueError("limit must be non-negative")
+        return replace(self, limit_n=n if self.limit_n is None else min(n, self.limit_n))
+
+    # ---------- Планирование ----------
+
+    def _catalog(self) -> Optional[Catalog]:
+        return self.source if isinstance(self.source, Catalog) else None
+
+    def _tree(self, kind: str):
+        owner = self.genres if kind == "genre" else self.tags
+        if owner is None:
+            owner = self._catalog()
+        if owner is None:
+            raise ValueError(f"recursive {kind} filter needs {kind}s (or a Catalog source)")
+        return genre_tree(owner) if kind == "genre" else tag_tree(owner)
+
+    def _index(self, step: _Step):
+        c = self._catalog()
+        return {"genre": c.books_by_genre, "tag": c.books_by_tag, "author": c.books_by_author}[step.kind]
+
+    def _keys(self, step: _Step) -> Tuple[str, ...]:
+        return self._tree(step.kind).subtree(step.arg) if step.recursive else (step.arg,)
+
+    def _estimate(self, step: _Step) -> int:
+        index = self._index(step)
+        return sum(len(index.get(k, ())) for k in self._keys(step))
+
+    def _posting(self, step: _Step) -> Tuple[Book, ...]:
+        index = self._index(step)
+        keys = self._keys(step)
+        if len(keys) == 1:
+            return index.get(keys[0], ())
+        # объединение списков по узлам поддерева в порядке каталога
+        found = {}
+        for k in keys:
+            for b in index.get(k, ()):
+                found.setdefault(id(b), b)
+        ordinal = self._catalog().book_ordinals
+        return tuple(sorted(found.values(), key=lambda b: ordinal[b.id]))
+
+    def _driver(self) -> Optional[_Step]:
+        """Most selective index-backed filter, or None for a full scan"""
+        if self._catalog() is None:
+            return None
+        indexed = [s for s in self.steps if s.indexed]
+        return min(indexed, key=self._estimate) if indexed else None
+
+    def _bitmap_steps(self) -> Tuple[_Step, ...]:
+        """Filters answered together by facet bitmaps (two or more, Catalog only)"""
+        c = self._catalog()
+        if c is None:
+            return ()
+        own = {"genre": self.genres, "tag": self.tags}
+        # рекурсивные фильтры — только по иерархии самого каталога, она и лежит в FacetIndex
+        steps = tuple(s for s in self.steps if (s.indexed or s.kind == "year")
+                      and not (s.recursive and own[s.kind] not in (None, c)))
+        return steps if len(steps) >= 2 else ()
+
+    def _bitmap(self, index, step: _Step):
+        if step.kind == "author":
+            return index.author(step.arg)
+        return (index.genre if step.kind == "genre" else index.tag)(step.arg, step.recursive)
+
+    def _source_plan(self) -> Tuple[Tuple[_Step, ...], str, Callable[[], Tuple[Book, ...]]]:
+        """(filters consumed by the scan source, description, candidate books)"""
+        combined = self._bitmap_steps()
+        if combined:
+            def candidates() -> Tuple[Book, ...]:
+                index = facet_index(self._catalog())
+                facets = sorted((self._bitmap(index, s) for s in combined if s.kind != "year"), key=len)
+                result = facets[0] if facets else index.universe
+                for bm in facets[1:]:
+                    result &= bm
+                for s in combined:
+                    if s.kind == "year":
+                        result = index.within_years(result, *s.arg)
+                return index.select(result)
+            return combined, "bitmap AND " + " & ".join(s.describe() for s in combined), candidates
+        driver = self._driver()
+        if driver is not None:
+            return ((driver,), f"scan index {driver.describe()} (~{self._estimate(driver)} books)",
+                    lambda: self._posting(driver))
+        return (), f"scan all books ({len(all_books(self.source))})", lambda: all_books(self.source)
+
+    def _predicate(self, step: _Step) -> Callable[[Book, RatingStats], bool]:
+        kind, arg = step.kind, step.arg
+        if kind in ("genre", "tag") and step.recursive:
+            tree = self._tree(kind)
+            attr = "genres" if kind == "genre" else "tags"
+            return lambda b, s: any(tree.is_under(k, arg) for k in getattr(b, attr))
+        if kind == "genre":
+            return lambda b, s: arg in b.genres
+        if kind == "tag":
+            return lambda b, s: arg in b.tags
+        if kind == "author":
+            return lambda b, s: arg in b.author_ids
+        if kind == "year":
+            lo, hi = arg
+            return lambda b, s: (lo is None or b.year >= lo) and (hi is None or b.year <= hi)
+        if kind == "avg_ge":
+            return lambda b, s: s.mean >= arg
+        if kind == "min_count":
+            return lambda b, s: s.count >= arg
+        return lambda b, s: arg(b)
+
+    def _order_key(self) -> Tuple[Optional[BookKey], bool]:
+        if self.order is None:
+            return None, False
+        key = self.order[0]
+        return ORDER_KEYS[key] if isinstance(key, str) else (key, True)
+
+    def _stats(self) -> Optional[RatingAggregates]:
+        _, order_stats = self._order_key()
+        if not (order_stats or any(s.needs_stats for s in self.steps)):
+            return None
+        ratings = self.ratings if self.ratings is not None else self.source
+        return aggregates_of(ratings)
+
+    def explain(self) -> Tuple[str, ...]:
+        """Human-readable execution plan"""
+        consumed, source, _ = self._source_plan()
+        plan = [source]
+        rest = [s for s in self.steps if s not in consumed]
+        if rest:
+            ordered = sorted(rest, key=lambda s: s.needs_stats)
+            plan.append("fused filter: " + " AND ".join(s.describe() for s in ordered))
+        if self.order is not None:
+            name = getattr(self.order[0], "__name__", self.order[0])
+            direction = "desc" if self.order[1] else "asc"
+            if self.limit_n is not None:
+                plan.append(f"top-k heap: {name} {direction}, k={self.limit_n}")
+            else:
+                plan.append(f"sort: {name} {direction}")
+        elif self.limit_n is not None:
+            plan.append(f"limit {self.limit_n} (early exit)")
+        return tuple(plan)
+
+    # ---------- Выполнение ----------
+
+    @instrumented("core.query.Query.run")
+    def _run(self) -> List[Tuple[Book, RatingStats]]:
+        consumed, _, source = self._source_plan()
+        candidates = source()
+        # сначала дешёвые проверки атрибутов, затем проверки по агрегатам оценок
+        rest = sorted((s for s in self.steps if s not in consumed), key=lambda s: s.needs_stats)
+        predicates = [self._predicate(s) for s in rest]
+        stats = self._stats()
+        get = stats.get if stats is not None else (lambda _: EMPTY_STATS)
+
+        def matches() -> Iterator[Tuple[Book, RatingStats]]:
+            for b in candidates:
+                s = get(b.id)
+                if all(p(b, s) for p in predicates):
+                    yield b, s
+
+        key, _ = self._order_key()
+        if key is None:
+            rows = matches() if self.limit_n is None else islice(matches(), self.limit_n)
+            return list(rows)
+        desc = self.order[1]
+        by = lambda row: key(row[0], row[1])
+        if self.limit_n is not None:
+            # heapq.nlargest/nsmallest ≡ sorted(...)[:k], включая устойчивость при равенстве
+            pick = heapq.nlargest if desc else heapq.nsmallest
+            return pick(self.limit_n, matches(), key=by)
+        return sorted(matches(), key=by, reverse=desc)
+
+    def books(self) -> Tuple[Book, ...]:
+        return tuple(b for b, _ in self._run())
+
+    def ids(self) -> Tuple[BookID, ...]:
+        return tuple(b.id for b, _ in self._run())
+
+    def scored(self) -> Tuple[Tuple[BookID, Any], ...]:
+        """``(book_id, sort key)`` pairs, e.g. the average for ``order_by("avg")``"""
+        key, _ = self._order_key()
+        if key is None:
+            raise ValueError("scored() needs order_by()")
+        return tuple((b.id, key(b, s)) for b, s in self._run())
+
+    def count(self) -> int:
+        return len(self._run())
+
+    def __iter__(self) -> Iterator[Book]:
+        return iter(self.books())
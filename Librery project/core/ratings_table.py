@@ -0,0 +1,314 @@
+# core/ratings_table.py
+"""Columnar storage for ratings.
+
+Three parallel arrays (user index, book index, uint8 value) plus interned id
+tables: 9 bytes per rating instead of a ``Rating`` object each. ``Rating``
+objects are created only when a row is read and are never kept. Per-user /
+per-book groups are row-index arrays built lazily on first use.
+
+Tables are immutable, but ``table + rows`` on the newest table of a chain
+appends to the shared columns in place (amortised O(1) per rating): every
+table only sees its own prefix of rows and ids. Appending to an older table
+copies its prefix first.
+"""
+import threading
+from array import array
+from collections.abc import Mapping, Sequence
+from functools import reduce
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.aggregates import RatingAggregates, RatingStats
+from core.domain import BookID, Rating, UserID
+
+try:
+    import numpy as np
+except ImportError:  # numpy нужен только для векторных агрегатов
+    np = None
+
+# Дописывание в общие колонки: проверка «последняя ли таблица» и append — атомарно
+_APPEND_LOCK = threading.Lock()
+
+
+class RatingGroups(Mapping):
+    """``{user_id | book_id: ratings}`` over row indices; ``Rating`` views are built per lookup"""
+    __slots__ = ("_table", "_by", "_order", "_starts")
+
+    def __init__(self, table: "RatingsTable", by: str):
+        self._table, self._by = table, by
+        column, n_keys = (table.users, table._n_users) if by == "user" else (table.books, table._n_books)
+        n = len(table)
+        if np is not None and n:
+            keys = np.frombuffer(column, dtype=np.int32, count=n)
+            # строки, упорядоченные по ключу (внутри ключа — по номеру строки), и границы групп
+            self._order = np.argsort(keys, kind="stable").astype(np.int32)
+            self._starts = np.concatenate(([0], np.cumsum(np.bincount(keys, minlength=n_keys)))).tolist()
+        else:
+            rows: List[List[int]] = [[] for _ in range(n_keys)]
+            for i, key in enumerate(islice(column, n)):
+                rows[key].append(i)
+            self._order = array("i", (i for group in rows for i in group))
+            self._starts = [0]
+            for group in rows:
+                self._starts.append(self._starts[-1] + len(group))
+
+    def _rows(self, key: str):
+        k = self._table._code(self._by, key)
+        if k is None or self._starts[k] == self._starts[k + 1]:
+            return None
+        return self._order[self._starts[k]:self._starts[k + 1]]
+
+    def __getitem__(self, key: str) -> Tuple[Rating, ...]:
+        rows = self._rows(key)
+        if rows is None:
+            raise KeyError(key)
+        return tuple(map(self._table._row, rows.tolist()))
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._rows(key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        ids = self._table._user_ids if self._by == "user" else self._table._book_ids
+        starts = self._starts
+        return (ids[k] for k in range(len(starts) - 1) if starts[k] != starts[k + 1])
+
+    def __len__(self) -> int:
+        starts = self._starts
+        return sum(1 for k in range(len(starts) - 1) if starts[k] != starts[k + 1])
+
+    def nbytes(self) -> int:
+        return self._order.itemsize * len(self._order)
+
+
+class RatingsTable(Sequence):
+    """Immutable sequence of ratings backed by ``array`` columns"""
+    __slots__ = (
+        "_user_ids", "_book_ids", "_user_index", "_book_index", "_n", "_n_users", "_n_books",
+        "users", "books", "values", "_by_user", "_by_book", "_aggregates",
+    )
+
+    def __init__(self, ratings: Iterable[Rating] = ()):
+        self._user_ids: List[UserID] = []
+        self._book_ids: List[BookID] = []
+        self._user_index: Dict[UserID, int] = {}
+        self._book_index: Dict[BookID, int] = {}
+        self._n = self._n_users = self._n_books = 0
+        self.users = array("i")
+        self.books = array("i")
+        self.values = array("B")
+        self._reset_lazy()
+        self._extend(ratings)
+
+    def _reset_lazy(self) -> None:
+        self._by_user: Optional[RatingGroups] = None
+        self._by_book: Optional[RatingGroups] = None
+        self._aggregates: Optional[RatingAggregates] = None
+
+    @property
+    def user_ids(self) -> List[UserID]:
+        """Interned user ids visible to this table (code -> id)"""
+        return self._user_ids[:self._n_users]
+
+    @property
+    def book_ids(self) -> List[BookID]:
+        return self._book_ids[:self._n_books]
+
+    def _code(self, by: str, key: str) -> Optional[int]:
+        if by == "user":
+            i = self._user_index.get(key)
+            return i if i is not None and i < self._n_users else None
+        i = self._book_index.get(key)
+        return i if i is not None and i < self._n_books else None
+
+    def _intern_user(self, key: UserID) -> int:
+        i = self._user_index.get(key)
+        if i is None:
+            i = self._user_index[key] = self._n_users
+            self._user_ids.append(key)
+            self._n_users += 1
+        return i
+
+    def _intern_book(self, key: BookID) -> int:
+        i = self._book_index.get(key)
+        if i is None:
+            i = self._book_index[key] = self._n_books
+            self._book_ids.append(key)
+            self._n_books += 1
+        return i
+
+    def _extend(self, ratings: Iterable[Rating]) -> None:
+        for r in ratings:
+            # значение первым: OverflowError вне 0..255 не оставит колонки разной длины
+            self.values.append(r.value)
+            self.users.append(self._intern_user(r.user_id))
+            self.books.append(self._intern_book(r.book_id))
+            self._n += 1
+
+    @classmethod
+    def from_codes(cls, strings: List[str], user_codes, book_codes, values) -> "RatingsTable":
+        """Build from string-table codes (e.g. ``Snapshot`` columns) without Rating objects.
+
+        ``values`` is kept as given (a snapshot view stays zero-copy); the first
+        append copies it into an array.
+        """
+        table = cls()
+        table.users = cls._recode(strings, user_codes, table._user_ids, table._user_index)
+        table.books = cls._recode(strings, book_codes, table._book_ids, table._book_index)
+        table.values = values if isinstance(values, (array, memoryview)) else array("B", values)
+        table._n, table._n_users, table._n_books = len(table.values), len(table._user_ids), len(table._book_ids)
+        return table
+
+    @staticmethod
+    def _intern(ids: List[str], index: Dict[str, int], key: str) -> int:
+        i = index.get(key)
+        if i is None:
+            i = index[key] = len(ids)
+            ids.append(key)
+        return i
+
+    @classmethod
+    def _recode(cls, strings: List[str], codes, ids: List[str], index: Dict[str, int]) -> array:
+        """String-table codes -> interned row codes (ids in order of first appearance)"""
+        if np is not None and len(codes):
+            raw = np.frombuffer(codes, dtype=np.int32)
+            uniq, first, inverse = np.unique(raw, return_index=True, return_inverse=True)
+            order = np.argsort(first, kind="stable")
+            rank = np.empty(len(uniq), dtype=np.int32)
+            rank[order] = np.arange(len(uniq), dtype=np.int32)
+            for c in uniq[order].tolist():
+                cls._intern(ids, index, strings[c])
+            out = array("i")
+            out.frombytes(rank[inverse].astype(np.int32).tobytes())
+            return out
+        remap: Dict[int, int] = {}
+        out = array("i")
+        for c in codes:
+            i = remap.get(c)
+            if i is None:
+                i = remap[c] = cls._intern(ids, index, strings[c])
+            out.append(i)
+        return out
+
+    # ---------- Sequence ----------
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _row(self, i: int) -> Rating:
+        return Rating(self._user_ids[self.users[i]], self._book_ids[self.books[i]], self.values[i])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(self._row(j) for j in range(*i.indices(len(self))))
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("RatingsTable index out of range")
+        return self._row(i)
+
+    def __iter__(self) -> Iterator[Rating]:
+        uid, bid, n = self._user_ids, self._book_ids, self._n
+        return map(Rating, map(uid.__getitem__, islice(self.users, n)),
+                   map(bid.__getitem__, islice(self.books, n)), islice(self.values, n))
+
+    def __add__(self, other: Iterable[Rating]) -> "RatingsTable":
+        """``table + (rating,)`` — new table; appends in place when ``self`` is the newest table.
+
+        Already computed aggregates are carried over (``RatingAggregates.add``).
+        """
+        other = tuple(other)
+        table = RatingsTable.__new__(RatingsTable)
+        table._reset_lazy()
+        if self._aggregates is not None:
+            table._aggregates = reduce(RatingAggregates.add, other, self._aggregates)
+        with _APPEND_LOCK:
+            table._n, table._n_users, table._n_books = self._n, self._n_users, self._n_books
+            table.users, table.books, table.values = self.users, self.books, self.values
+            if not (len(self.values) == self._n and isinstance(self.values, array)):
+                # ветка от старой таблицы (или колонки снимка): копируем свой префикс строк
+                n = self._n
+                table.users, table.books = array("i", self.users[:n]), array("i", self.books[:n])
+                table.values = array("B", self.values[:n])
+            table._user_ids, table._user_index = self._user_ids, self._user_index
+            if len(self._user_ids) != self._n_users:
+                table._user_ids = self._user_ids[:self._n_users]
+                table._user_index = {u: i for i, u in enumerate(table._user_ids)}
+            table._book_ids, table._book_index = self._book_ids, self._book_index
+            if len(self._book_ids) != self._n_books:
+                table._book_ids = self._book_ids[:self._n_books]
+                table._book_index = {b: i for i, b in enumerate(table._book_ids)}
+            try:
+                table._extend(other)
+                return table
+            except BufferError:
+                pass
+        # колонку держит внешний буфер (np.frombuffer) — дописываем в копию
+        return RatingsTable(tuple(self)) + other
+
+    def __reduce__(self):
+        # только свой префикс строк и id; колонки снимка (memoryview) сериализуются байтами
+        n = self._n
+        return (_restore, (self.user_ids, self.book_ids, self.users[:n].tobytes(),
+                           self.books[:n].tobytes(), bytes(self.values[:n])))
+
+    # ---------- Индексы ----------
+
+    def grouped(self, by: str) -> RatingGroups:
+        """``{user_id | book_id: ratings}`` (``by`` is "user" or "book") in row order"""
+        if by == "user":
+            if self._by_user is None:
+                self._by_user = RatingGroups(self, "user")
+            return self._by_user
+        if self._by_book is None:
+            self._by_book = RatingGroups(self, "book")
+        return self._by_book
+
+    def for_user(self, user_id: UserID) -> Tuple[Rating, ...]:
+        return self.grouped("user").get(user_id, ())
+
+    def for_book(self, book_id: BookID) -> Tuple[Rating, ...]:
+        return self.grouped("book").get(book_id, ())
+
+    def has(self, user_id: UserID, book_id: BookID) -> bool:
+        b = self._code("book", book_id)
+        if b is None:
+            return False
+        rows = self.grouped("user")._rows(user_id)
+        return rows is not None and any(self.books[i] == b for i in rows.tolist())
+
+    def aggregates(self) -> RatingAggregates:
+        """Per-book count / sum / sum of squares (vectorized when numpy is available)"""
+        if self._aggregates is None:
+            if np is not None and len(self):
+                books = np.frombuffer(self.books, dtype=np.int32, count=self._n)
+                values = np.frombuffer(self.values, dtype=np.uint8, count=self._n).astype(np.int64)
+                n = self._n_books
+                count = np.bincount(books, minlength=n)
+                total = np.bincount(books, weights=values, minlength=n)
+                total_sq = np.bincount(books, weights=values * values, minlength=n)
+                del books  # отпускаем буфер колонки, иначе в неё нельзя будет дописать
+                # tolist() — один переход в Python-числа вместо скаляров numpy на каждую книгу
+                count, total, total_sq = count.tolist(), total.astype(np.int64).tolist(), total_sq.astype(np.int64).tolist()
+                self._aggregates = RatingAggregates.from_stats({
+                    self._book_ids[b]: RatingStats(count[b], total[b], total_sq[b])
+                    for b in range(n) if count[b]
+                })
+            else:
+                self._aggregates = RatingAggregates(self)
+        return self._aggregates
+
+    def nbytes(self) -> int:
+        """Size of this table's rows in the columns (without the shared id tables)"""
+        return sum(col.itemsize * self._n for col in (self.users, self.books, self.values))
+
+
+def _restore(user_ids: List[UserID], book_ids: List[BookID], users: bytes, books: bytes, values: bytes) -> RatingsTable:
+    table = RatingsTable()
+    table._user_ids, table._book_ids = user_ids, book_ids
+    table._user_index = {u: i for i, u in enumerate(user_ids)}
+    table._book_index = {b: i for i, b in enumerate(book_ids)}
+    table.users.frombytes(users)
+    table.books.frombytes(books)
+    table.values.frombytes(values)
+    table._n, table._n_users, table._n_books = len(table.values), len(user_ids), len(book_ids)
+    return table
@@ -0,0 +1,173 @@
+# core/search.py
+"""Full-text search over book titles and review texts.
+
+Inverted index (term -> {doc: term frequency}) ranked with BM25, with light
+Russian/English normalization (casefold, ё -> е, stop words, suffix
+stripping) and prefix completion over the surface vocabulary. Documents are
+added incrementally, e.g. from ``add_review_pipeline``.
+"""
+import bisect
+import heapq
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Literal, Optional, Tuple
+
+from core.domain import Book, Review
+
+DocKind = Literal["book", "review"]
+
+_TOKEN = re.compile(r"[^\W_]+")
+_CYRILLIC = re.compile(r"[а-я]")
+
+STOP_WORDS = frozenset("""
+и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по
+только ее мне было вот от меня еще нет о из ему теперь когда даже ну ли если уже
+или ни быть был него до вас нибудь опять уж вам ведь там потом себя ничего ей
+может они тут где есть надо ней для мы тебя их чем была сам чтоб без будто чего
+раз тоже себе под будет ж тогда кто этот того потому этого какой совсем ним здесь
+этом один почти мой тем чтобы нее сейчас были куда зачем всех никогда можно при
+the a an and or of to in on for is are was were be been by with at from this
+that it its as not but if then so than too very can will just into about over
+""".split())
+
+_RU_ENDINGS = tuple(sorted("""
+иями ями ами ого его ому ему ыми ими ешь ишь ете ите ться тся ть ет ит ут ют ат ят
+ой ей ий ый ая яя ое ее ые ие ую юю ов ев ам ям ах ях ом ем а я о е ы и у ю ь й
+""".split(), key=len, reverse=True))
+_EN_ENDINGS = ("ingly", "edly", "ing", "ies", "ed", "es", "ly", "s")
+
+
+def normalize(text: str) -> List[str]:
+    """Lowercased surface words (ё -> е), without stemming"""
+    return _TOKEN.findall(text.casefold().replace("ё", "е"))
+
+
+def stem(word: str) -> str:
+    endings = _RU_ENDINGS if _CYRILLIC.search(word) else _EN_ENDINGS
+    for end in endings:
+        if word.endswith(end) and len(word) - len(end) >= 3:
+            if end == "s" and word.endswith("ss"):
+                return word
+            return word[:-len(end)] + ("y" if end == "ies" else "")
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(w) for w in normalize(text) if w not in STOP_WORDS]
+
+
+@dataclass(frozen=True, slots=True)
+class SearchHit:
+    kind: DocKind
+    id: str
+    score: float
+
+
+class SearchIndex:
+    """Incremental BM25 index over books (title) and reviews (text)"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._docs: List[Tuple[DocKind, str]] = []
+        self._doc_no: Dict[Tuple[DocKind, str], int] = {}
+        self._lengths: List[int] = []
+        self._total_length = 0
+        self._postings: Dict[str, Dict[int, int]] = {}
+        # словарь поверхностных слов для автодополнения: слово -> число документов
+        self._words: Dict[str, int] = {}
+        self._sorted_words: List[str] = []
+        self._words_dirty = False
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, kind: DocKind, doc_id: str, text: str) -> None:
+        key = (kind, doc_id)
+        if key in self._doc_no:
+            return  # документы неизменяемы — повторное добавление игнорируется
+        doc = len(self._docs)
+        self._doc_no[key] = doc
+        self._docs.append(key)
+
+        terms = tokenize(text)
+        self._lengths.append(len(terms))
+        self._total_length += len(terms)
+        for term in terms:
+            posting = self._postings.setdefault(term, {})
+            posting[doc] = posting.get(doc, 0) + 1
+
+        for word in set(normalize(text)):
+            if word not in self._words:
+                self._words_dirty = True
+            self._words[word] = self._words.get(word, 0) + 1
+
+    def add_book(self, book: Book) -> None:
+        self.add("book", book.id, book.title)
+
+    def add_review(self, review: Review) -> None:
+        self.add("review", review.id, review.text)
+
+    def _idf(self, df: int) -> float:
+        n = len(self._docs)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def _expand(self, prefix: str, limit: int = 50) -> List[str]:
+        """Index terms for the words starting with ``prefix``"""
+        return list(dict.fromkeys(
+            t for t in (stem(w) for w in self.complete(prefix, limit)) if t in self._postings
+        ))
+
+    def search(self, query: str, k: int = 10, kind: Optional[DocKind] = None,
+               prefix: bool = False) -> List[SearchHit]:
+        """Top-k documents by BM25; with ``prefix`` the last word is completed"""
+        words = [w for w in normalize(query) if w not in STOP_WORDS]
+        if not words or not self._docs:
+            return []
+        groups = [[stem(w)] for w in words]
+        if prefix:
+            groups[-1] = self._expand(words[-1]) or groups[-1]
+
+        avg_len = self._total_length / len(self._docs) or 1.0
+        scores: Dict[int, float] = {}
+        for group in groups:
+            for term in dict.fromkeys(group):
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = self._idf(len(posting))
+                for doc, tf in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc] / avg_len)
+                    scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if kind is not None:
+            scores = {d: s for d, s in scores.items() if self._docs[d][0] == kind}
+        best = heapq.nsmallest(k, scores.items(), key=lambda x: (-x[1], x[0]))
+        return [SearchHit(self._docs[d][0], self._docs[d][1], s) for d, s in best]
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """Vocabulary words starting with ``prefix``, most frequent first"""
+        words = normalize(prefix)
+        if not words:
+            return []
+        p = words[-1]
+        if self._words_dirty:
+            self._sorted_words = sorted(self._words)
+            self._words_dirty = False
+        start = bisect.bisect_left(self._sorted_words, p)
+        matches = []
+        for word in self._sorted_words[start:]:
+            if not word.startswith(p):
+                break
+            matches.append(word)
+        return heapq.nsmallest(limit, matches, key=lambda w: (-self._words[w], w))
+
+
+def build_search_index(books: Iterable[Book], reviews: Iterable[Review] = ()) -> SearchIndex:
+    index = SearchIndex()
+    for book in books:
+        index.add_book(book)
+    for review in reviews:
+        index.add_review(review)
+    return index
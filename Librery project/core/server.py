@@ -0,0 +1,501 @@
+# core/server.py
+"""Local asyncio JSON API over one in-memory catalog.
+
+Plain ``asyncio`` streams speaking a minimal HTTP/1.1 (keep-alive,
+``Content-Length`` bodies, JSON in and out), so no web framework is needed::
+
+    GET  /health                           catalog sizes
+    GET  /books/<id>                       book, rating stats, leaderboard rank
+    GET  /users/<id>                       user and their ratings
+    GET  /users/<id>/recommendations       content-based top 10
+    GET  /top?n=10&offset=0&kind=mean      leaderboard page (kind: mean | bayes)
+    POST /ratings                          {"user_id", "book_id", "value"}
+    GET  /stats                            cache / coalescing / request counters
+
+The catalog comes from ``STORE`` and is never mutated: submitted ratings
+are kept per user on top of it and pushed into the service's own
+leaderboards and recommendation cache. Lookups and top-N answer on the
+event loop; recommendation scoring is CPU-bound pure Python, so on a machine
+with more than one CPU it runs by default in a process pool whose workers hold
+the catalog (``worker_pool``; a snapshot path is mapped, otherwise the catalog
+is pickled once per worker). Each task then costs a round trip of the user's
+ratings and the result; on one CPU, or when that outweighs scoring (tiny
+catalogs), pass ``workers=1`` or a ``ThreadPoolExecutor`` as ``executor`` to
+score in threads under the GIL. Identical in-flight requests share one
+computation (``Coalescer``). ``load_test``
+replays GET requests over keep-alive connections and reports p50 / p99
+latency and requests per second::
+
+    PYTHONPATH=. python -m core.server serve --port 8765
+    PYTHONPATH=. python -m core.server load --concurrency 32 --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+from concurrent.futures import Executor
+from http import HTTPStatus
+from itertools import cycle
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from core.catalog import Catalog, user_ratings
+from core.domain import Book, BookID, Rating, UserID
+from core.ftypes import add_rating_pipeline, safe_book, safe_user
+from core.instrument import percentile, timed
+from core.memo import RecommendationCache, rank_books
+from core.precompute import rank_in_worker, worker_pool
+from core.store import DERIVED_BUILDERS, STORE
+
+MAX_BODY = 64 * 1024
+MAX_TOP = 100
+
+Response = Tuple[int, Any]
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Coalescer:
+    """Runs one computation per key at a time; concurrent callers await the same future"""
+
+    def __init__(self):
+        self._inflight: Dict[Any, asyncio.Future] = {}
+        self.started = 0
+        self.joined = 0
+
+    async def run(self, key: Any, compute: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.joined += 1
+            # shield: отмена одного клиента не отменяет вычисление для остальных
+            return await asyncio.shield(future)
+        self.started += 1
+        future = asyncio.ensure_future(compute())
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._inflight
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, int]:
+        return {"started": self.started, "joined": self.joined, "inflight": len(self._inflight)}
+
+
+def _book_json(book: Book) -> Dict[str, Any]:
+    return {"id": book.id, "title": book.title, "author_ids": list(book.author_ids),
+            "genres": list(book.genres), "tags": list(book.tags), "year": book.year}
+
+
+class LibraryService:
+    """Request handlers over one catalog; transport-independent (see ``serve``)"""
+
+    def __init__(self, catalog: Catalog, executor: Optional[Executor] = None,
+                 workers: Optional[int] = None, snapshot_path: Optional[str] = None):
+        self.catalog = catalog
+        # None — свой пул процессов (``workers``), создаётся при первом расчёте; закрывается в close().
+        # Один процесс смысла не имеет: тогда пул потоков цикла по умолчанию
+        self.executor = executor
+        self._own_pool = executor is None and (workers or os.cpu_count() or 1) > 1
+        self._workers = workers
+        self._worker_source: Any = snapshot_path or catalog
+        self.cache = RecommendationCache()
+        self.coalescer = Coalescer()
+        # собственные экземпляры: доска обновляется оценками и не должна менять общий STORE
+        self.boards = {"mean": DERIVED_BUILDERS["leaderboard"](catalog),
+                       "bayes": DERIVED_BUILDERS["leaderboard_bayes"](catalog)}
+        self._ratings: Dict[UserID, Tuple[Rating, ...]] = {}   # оценки пользователя с учётом новых
+        self._revision: Dict[UserID, int] = {}
+        self.submitted = 0
+        self.requests = 0
+        # (метод, путь, допустимые параметры запроса, обработчик)
+        self._routes: List[Tuple[str, "re.Pattern[str]", Tuple[str, ...], Callable[..., Awaitable[Response]]]] = [
+            ("GET", re.compile(r"/health"), (), self.health),
+            ("GET", re.compile(r"/stats"), (), self.stats),
+            ("GET", re.compile(r"/top"), ("n", "offset", "kind"), self.top),
+            ("GET", re.compile(r"/books/([^/]+)"), (), self.book),
+            ("GET", re.compile(r"/users/([^/]+)"), (), self.user),
+            ("GET", re.compile(r"/users/([^/]+)/recommendations"), (), self.recommendations),
+            ("POST", re.compile(r"/ratings"), (), self.submit_rating),
+        ]
+
+    def close(self) -> None:
+        """Stop the service's own scoring processes (a passed executor is left alone)"""
+        if self._own_pool and self.executor is not None:
+            self.executor.shutdown(wait=False)  # не блокирует цикл событий; процессы доработают сами
+            self.executor = None
+
+    def ratings_of(self, user_id: UserID) -> Tuple[Rating, ...]:
+        found = self._ratings.get(user_id)
+        return found if found is not None else user_ratings(self.catalog, user_id)
+
+    # ---------- Маршрутизация ----------
+
+    async def dispatch(self, method: str, target: str, body: bytes = b"") -> Response:
+        """``(status, payload)`` for one request; errors become ``{"error": ...}``"""
+        self.requests += 1
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            allowed = False
+            for route_method, pattern, params, handler in self._routes:
+                match = pattern.fullmatch(url.path)
+                if match is None:
+                    continue
+                if route_method != method:
+                    allowed = True
+                    continue
+                unknown = sorted(set(query) - set(params))
+                if unknown:
+                    raise HttpError(HTTPStatus.BAD_REQUEST, f"Unexpected query parameters: {unknown}")
+                if method == "POST":
+                    return await handler(_parse_json(body))
+                return await handler(*match.groups(), **query)
+            if allowed:
+                raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed for {url.path}")
+            raise HttpError(HTTPStatus.NOT_FOUND, f"No route for {url.path}")
+        except HttpError as e:
+            return e.status, {"error": str(e)}
+
+    # ---------- Обработчики ----------
+
+    async def health(self) -> Response:
+        c = self.catalog
+        return HTTPStatus.OK, {"status": "ok", "books": len(c.books), "users": len(c.users),
+                               "ratings": len(c.ratings) + self.submitted}
+
+    async def stats(self) -> Response:
+        return HTTPStatus.OK, {"requests": self.requests, "submitted": self.submitted,
+                               "cache": self.cache.stats(), "coalescing": self.coalescer.stats()}
+
+    async def book(self, book_id: BookID) -> Response:
+        board = self.boards["mean"]
+
+        def describe(book: Book) -> Dict[str, Any]:
+            stats = board.stats(book.id)
+            return {**_book_json(book), "ratings": stats.count,
+                    "avg": round(stats.mean, 4), "rank": board.rank(book.id)}
+
+        found = safe_book(self.catalog, book_id).map(describe)
+        if found.is_nothing():
+            raise HttpError(HTTPStatus.NOT_FOUND, f"Book with ID {book_id} not found")
+        return HTTPStatus.OK, found.get_or_else(None)
+
+    async def user(self, user_id: UserID) -> Response:
+        found = safe_user(self.catalog, user_id).map(lambda u: {
+            "id": u.id, "name": u.name,
+            "ratings": [{"book_id": r.book_id, "value": r.value} for r in self.ratings_of(u.id)],
+        })
+        if found.is_nothing():
+            raise HttpError(HTTPStatus.NOT_FOUND, f"User with ID {user_id} not found")
+        return HTTPStatus.OK, found.get_or_else(None)
+
+    async def recommendations(self, user_id: UserID) -> Response:
+        if safe_user(self.catalog, user_id).is_nothing():
+            raise HttpError(HTTPStatus.NOT_FOUND, f"User with ID {user_id} not found")
+        ids = self.cache.get(user_id)
+        source = "cache"
+        if ids is None:
+            # ревизия в ключе: запрос после новой оценки не присоединится к устаревшему расчёту
+            key = ("recommend", user_id, self._revision.get(user_id, 0))
+            joined = key in self.coalescer
+            ids = await self.coalescer.run(key, lambda: self._compute(user_id))
+            source = "coalesced" if joined else "computed"
+        books = self.catalog.books_by_id
+        return HTTPStatus.OK, {"user_id": user_id, "source": source,
+                               "books": [{"id": b, "title": books[b].title} for b in ids]}
+
+    async def _compute(self, user_id: UserID) -> Tuple[BookID, ...]:
+        ratings = self.ratings_of(user_id)
+        loop = asyncio.get_running_loop()
+        with timed("core.server.recommend"):
+            if self._own_pool:
+                if self.executor is None:
+                    self.executor = worker_pool(self._worker_source, self._workers)
+                # в задаче только оценки пользователя: каталог уже в процессе-исполнителе
+                ids = await loop.run_in_executor(self.executor, rank_in_worker, ratings)
+            else:
+                ids = await loop.run_in_executor(self.executor, _score, ratings, self.catalog)
+        # кэш меняется только в потоке цикла; результат по устаревшим оценкам не сохраняем
+        if self.ratings_of(user_id) is ratings:
+            self.cache.put(user_id, ids, depends_on=ids)
+        return ids
+
+    async def top(self, n: str = "10", offset: str = "0", kind: str = "mean") -> Response:
+        board = self.boards.get(kind)
+        if board is None:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"kind must be one of {sorted(self.boards)}")
+        n_, offset_ = _int_arg("n", n, 1, MAX_TOP), _int_arg("offset", offset, 0, None)
+        books = self.catalog.books_by_id
+        rows = [{"rank": offset_ + i, "id": book_id, "score": round(score, 4),
+                 "title": books[book_id].title if book_id in books else None}
+                for i, (book_id, score) in enumerate(board.top(n_, offset_), 1)]
+        return HTTPStatus.OK, {"kind": kind, "total": len(board), "books": rows}
+
+    async def submit_rating(self, payload: Any) -> Response:
+        if not isinstance(payload, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Expected a JSON object")
+        value = payload.get("value")
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "value must be an integer")
+        rating = Rating(str(payload.get("user_id", "")), str(payload.get("book_id", "")), value)
+        # дубликаты проверяются только среди оценок этого пользователя
+        result = add_rating_pipeline(rating, self.ratings_of(rating.user_id), self.catalog, self.catalog,
+                                     cache=self.cache, leaderboard=self.boards["mean"])
+        if result.is_left():
+            return HTTPStatus.UNPROCESSABLE_ENTITY, {"errors": result._error}
+        self._ratings[rating.user_id] = result.get_or_else(())
+        self._revision[rating.user_id] = self._revision.get(rating.user_id, 0) + 1
+        self.boards["bayes"].add(rating)
+        self.submitted += 1
+        return HTTPStatus.CREATED, {"user_id": rating.user_id, "book_id": rating.book_id,
+                                    "value": rating.value, "rank": self.boards["mean"].rank(rating.book_id)}
+
+
+def _score(ratings: Tuple[Rating, ...], catalog: Catalog) -> Tuple[BookID, ...]:
+    # только чтение неизменяемых данных — безопасно вне потока цикла
+    return rank_books(ratings, catalog)
+
+
+def _int_arg(name: str, raw: str, lo: int, hi: Optional[int]) -> int:
+    try:
+        value = int(raw)
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer") from None
+    if value < lo or (hi is not None and value > hi):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be in [{lo}, {hi if hi is not None else '∞'}]")
+    return value
+
+
+def _parse_json(body: bytes) -> Any:
+    try:
+        return json.loads(body or b"null")
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Body is not valid JSON") from None
+
+
+# ========== HTTP ==========
+
+def _encode(status: int, payload: Any, keep_alive: bool) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, str, Dict[str, str]]]:
+    """``(method, target, version, headers)`` or None when the client closed the connection"""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    parts = line.decode("latin-1").split()
+    if len(parts) != 3:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return parts[0], parts[1], parts[2], headers
+
+
+async def _handle(service: LibraryService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            try:
+                head = await _read_head(reader)
+                if head is None:
+                    break
+                method, target, version, headers = head
+                length = int(headers.get("content-length", "0") or 0)
+                if length > MAX_BODY:
+                    raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body over {MAX_BODY} bytes")
+                body = await reader.readexactly(length) if length else b""
+            except HttpError as e:
+                writer.write(_encode(e.status, {"error": str(e)}, keep_alive=False))
+                break
+            except ValueError:
+                writer.write(_encode(HTTPStatus.BAD_REQUEST, {"error": "Bad Content-Length"}, keep_alive=False))
+                break
+            connection = headers.get("connection", "").lower()
+            keep_alive = connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+            status, payload = await service.dispatch(method.upper(), target, body)
+            writer.write(_encode(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service: LibraryService, host: str = "127.0.0.1", port: int = 8765) -> asyncio.AbstractServer:
+    """Start listening (``port=0`` picks a free port); close with ``server.close()``"""
+    return await asyncio.start_server(lambda r, w: _handle(service, r, w), host, port)
+
+
+# ========== LOAD GENERATOR ==========
+
+def default_paths(catalog: Catalog, n: int = 200, seed: int = 0) -> List[str]:
+    """Request mix: 40% book lookups, 20% user lookups, 30% recommendations, 10% top-N"""
+    rnd = random.Random(seed)
+    books, users = [b.id for b in catalog.books], [u.id for u in catalog.users]
+    kinds = rnd.choices(("book", "user", "recommend", "top"), weights=(4, 2, 3, 1), k=n)
+    paths = []
+    for kind in kinds:
+        if kind == "book":
+            paths.append(f"/books/{rnd.choice(books)}")
+        elif kind == "user":
+            paths.append(f"/users/{rnd.choice(users)}")
+        elif kind == "recommend":
+            paths.append(f"/users/{rnd.choice(users)}/recommendations")
+        else:
+            paths.append(f"/top?n=10&offset={rnd.randrange(0, 50)}")
+    return paths
+
+
+async def _request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, path: str) -> int:
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def load_test(host: str, port: int, paths: Sequence[str], concurrency: int = 16,
+                    requests: int = 1000) -> Dict[str, Any]:
+    """Replay ``paths`` round-robin over ``concurrency`` keep-alive connections"""
+    targets = cycle(paths)
+    remaining = [requests]
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    errors = [0]
+
+    async def worker() -> None:
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                path = next(targets)
+                start = time.perf_counter()
+                try:
+                    status = await _request(reader, writer, host, path)
+                except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+                    errors[0] += 1
+                    writer.close()
+                    reader, writer = await asyncio.open_connection(host, port)
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    seconds = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "concurrency": concurrency,
+        "seconds": round(seconds, 3),
+        "rps": round(len(latencies) / seconds, 1) if seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+# ========== CLI ==========
+
+def _service(path: str, workers: Optional[int]) -> LibraryService:
+    entry = STORE.entry(path)
+    # каталог из снимка: процессы-исполнители отображают тот же файл, а не получают копию
+    snapshot = str(Path(entry.path).with_suffix(".snapshot")) if entry.source == "snapshot" else None
+    return LibraryService(entry.catalog, workers=workers, snapshot_path=snapshot)
+
+
+async def _serve_forever(path: str, host: str, port: int, workers: Optional[int]) -> None:
+    service = _service(path, workers)
+    try:
+        server = await serve(service, host, port)
+        print(f"Serving {path} on http://{host}:{server.sockets[0].getsockname()[1]}")
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+async def _load(args: argparse.Namespace) -> Dict[str, Any]:
+    catalog = STORE.get(args.seed)
+    paths = default_paths(catalog, seed=args.rng_seed)
+    if args.port:
+        return await load_test(args.host, args.port, paths, args.concurrency, args.requests)
+    # без --port поднимаем сервер в этом же процессе на свободном порту
+    service = _service(args.seed, args.workers)
+    server = await serve(service, args.host, 0)
+    try:
+        port = server.sockets[0].getsockname()[1]
+        return await load_test(args.host, port, paths, args.concurrency, args.requests)
+    finally:
+        server.close()
+        await server.wait_closed()
+        service.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Local JSON API for the library catalog")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_p = sub.add_parser("serve", help="run the API")
+    load_p = sub.add_parser("load", help="load-test a running API (or an in-process one without --port)")
+    for p in (serve_p, load_p):
+        p.add_argument("--seed", default="data/seed.json", help="catalog JSON")
+        p.add_argument("--host", default="127.0.0.1")
+        p.add_argument("--workers", type=int, default=None, help="scoring processes (default: CPU count)")
+    serve_p.add_argument("--port", type=int, default=8765)
+    load_p.add_argument("--port", type=int, default=0)
+    load_p.add_argument("--concurrency", type=int, default=16)
+    load_p.add_argument("--requests", type=int, default=2000)
+    load_p.add_argument("--rng-seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            asyncio.run(_serve_forever(args.seed, args.host, args.port, args.workers))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    report = asyncio.run(_load(args))
+    print(f"{report['requests']} requests, {report['errors']} errors, concurrency {report['concurrency']}: "
+          f"{report['rps']} req/s, p50 {report['p50_ms']} ms, p99 {report['p99_ms']} ms  {report['statuses']}")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+# core/similar.py
+""""Books similar to this one" via MinHash + LSH.
+
+Each book is the set of its genre / tag / author features (the columns of
+``core.vectorized.FeatureMatrix``). A MinHash signature of ``bands * rows``
+values estimates Jaccard similarity; books whose signatures agree on all
+rows of at least one band become candidates (more bands -> higher recall,
+more rows -> fewer, more similar candidates). Per band the bucket keys are
+kept as one sorted array, so a lookup is a ``searchsorted``; the best
+candidates by signature agreement are re-ranked by exact Jaccard.
+"""
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+from core.domain import BookID
+from core.catalog import Books, per_catalog
+from core.vectorized import FeatureMatrix, expand_features, feature_matrix, top_k
+
+_PRIME = (1 << 31) - 1  # (a * x + b) < 2**62 — без переполнения int64
+_EMPTY = _PRIME  # больше любого хэша; значения помещаются в uint32
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class SimilarBooksIndex:
+    fm: FeatureMatrix
+    bands: int
+    rows: int
+    signatures: np.ndarray           # (n_books, bands * rows) uint32
+    band_keys: Tuple[np.ndarray, ...]  # по полосе: отсортированные ключи корзин
+    band_rows: Tuple[np.ndarray, ...]  # строки книг в том же порядке
+
+    def candidates(self, row: int) -> np.ndarray:
+        """Sorted rows sharing at least one LSH bucket with ``row``"""
+        found = []
+        query = self.signatures[row:row + 1]
+        for band, (keys, rows) in enumerate(zip(self.band_keys, self.band_rows)):
+            key = _band_key(query, band, self.rows)[0]
+            found.append(rows[keys.searchsorted(key, "left"):keys.searchsorted(key, "right")])
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def similar(self, book_id: BookID, k: int = 10, rerank: int = 200) -> Tuple[Tuple[BookID, float], ...]:
+        """Top-k (book id, Jaccard), ties by catalog order.
+
+        Only the ``rerank`` candidates with the highest MinHash estimate are
+        re-ranked exactly (larger -> better recall, slower).
+        """
+        row = self.fm.book_pos.get(book_id)
+        if row is None or self.fm.indptr[row] == self.fm.indptr[row + 1]:
+            return ()
+        cand = self.candidates(row)
+        cand = cand[self.fm.codes[cand] != row]  # сама книга и её дубликаты по id
+        if cand.size > rerank:
+            estimate = (self.signatures[cand] == self.signatures[row]).mean(axis=1)
+            cand = np.sort(cand[top_k(estimate, np.arange(cand.size), rerank)])
+        sims = jaccard(self.fm, row, cand)
+        top = top_k(sims, np.flatnonzero(sims > 0), k)
+        return tuple((self.fm.book_ids[cand[t]], float(sims[t])) for t in top)
+
+
+def jaccard(fm: FeatureMatrix, row: int, others: np.ndarray) -> np.ndarray:
+    """Exact Jaccard between the feature set of ``row`` and each of ``others``"""
+    query = np.zeros(fm.n_features, dtype=bool)
+    query[fm.book_features(row)] = True
+    n_query = int(query.sum())
+    if others.size == 0:
+        return np.zeros(0, dtype=np.float64)
+    cols, entry = expand_features(fm, others)
+    # множества: повторы признака внутри книги считаются один раз
+    pairs = np.unique(entry * fm.n_features + cols)
+    entry, cols = pairs // fm.n_features, pairs % fm.n_features
+    inter = np.bincount(entry, weights=query[cols], minlength=others.size)
+    sizes = np.bincount(entry, minlength=others.size)
+    union = sizes + n_query - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def _band_key(signatures: np.ndarray, band: int, rows: int) -> np.ndarray:
+    part = signatures[:, band * rows:(band + 1) * rows]
+    key = np.zeros(part.shape[0], dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for j in range(rows):
+            # полиномиальный хэш по модулю 2**64 (переполнение uint64 — намеренное)
+            key = key * np.uint64(0x100000001B3) + part[:, j].astype(np.uint64)
+    return key
+
+
+def minhash_signatures(fm: FeatureMatrix, n_hashes: int, seed: int = 0, chunk_size: int = 65536) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, size=n_hashes, dtype=np.int64)
+    b = rng.integers(0, _PRIME, size=n_hashes, dtype=np.int64)
+    sig = np.full((fm.n_books, n_hashes), _EMPTY, dtype=np.uint32)
+    lengths = np.diff(fm.indptr)
+    # кусками по книгам — память O(chunk nnz x n_hashes)
+    for lo in range(0, fm.n_books, chunk_size):
+        hi = min(lo + chunk_size, fm.n_books)
+        nonempty = lo + np.flatnonzero(lengths[lo:hi])
+        if nonempty.size == 0:
+            continue
+        start, end = fm.indptr[lo], fm.indptr[hi]
+        hashed = (fm.indices[start:end, None] * a + b) % _PRIME
+        sig[nonempty] = np.minimum.reduceat(hashed, fm.indptr[nonempty] - start, axis=0)
+    return sig
+
+
+def build_similar_index(books: Books, bands: int = 32, rows: int = 2, seed: int = 0) -> SimilarBooksIndex:
+    fm = feature_matrix(books)
+    signatures = minhash_signatures(fm, bands * rows, seed)
+    nonempty = np.flatnonzero(np.diff(fm.indptr))  # книги без признаков ни с чем не сходны
+    band_keys, band_rows = [], []
+    for band in range(bands):
+        keys = _band_key(signatures[nonempty], band, rows)
+        order = np.argsort(keys, kind="stable")
+        band_keys.append(keys[order])
+        band_rows.append(nonempty[order])
+    return SimilarBooksIndex(fm, bands, rows, signatures, tuple(band_keys), tuple(band_rows))
+
+
+@per_catalog
+def similar_index(books: Books) -> SimilarBooksIndex:
+    """``build_similar_index`` cached per Catalog (tuples are indexed every call)"""
+    return build_similar_index(books)
+
+
+def similar_books(books: Books, book_id: BookID, k: int = 10) -> Tuple[Tuple[BookID, float], ...]:
+    return similar_index(books).similar(book_id, k)
+
+
+def similar_books_exact(books: Books, book_id: BookID, k: int = 10) -> Tuple[Tuple[BookID, float], ...]:
+    """Brute-force reference: Jaccard against every book"""
+    fm = feature_matrix(books)
+    row = fm.book_pos.get(book_id)
+    if row is None:
+        return ()
+    others = np.flatnonzero(fm.codes != row)
+    scores = np.zeros(fm.n_books, dtype=np.float64)
+    scores[others] = jaccard(fm, row, others)
+    top = top_k(scores, others[scores[others] > 0], k)
+    return tuple((fm.book_ids[t], float(scores[t])) for t in top)
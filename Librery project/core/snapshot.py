@@ -0,0 +1,296 @@
+# core/snapshot.py
+"""Compact columnar binary snapshot of a Catalog.
+
+Layout: ``MAGIC``, a little JSON header (column offsets, typecodes, counts),
+then 8-byte aligned blobs. Every string (ids, names, titles, texts, dates) is
+interned once into a NUL-separated UTF-8 table; entities are stored as
+integer-coded columns (``-1`` = None) and book -> author/genre/tag edges as
+CSR pairs (``*_ptr`` + codes). Columns are read as zero-copy ``memoryview``s
+over an ``mmap`` of the file. ``load_snapshot`` only decodes the string table;
+entities, the ``RatingsTable`` of ratings and all catalog indexes are built on
+first access, and the returned Catalog keeps the map alive for as long as it
+(or its ratings table) lives. ``save_snapshot`` replaces the file atomically,
+so mapped catalogs never see it truncated under them.
+"""
+import json
+import mmap
+import os
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.catalog import Catalog
+from core.domain import Author, Book, User, Rating, Review, Loan, Tag, Genre
+from core.ratings_table import RatingsTable
+
+MAGIC = b"LIBSNAP1"
+VERSION = 1
+_SEP = "\x00"
+_LOAN_STATUSES = ("active", "returned", "overdue")
+
+
+class _StringTable:
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+
+    def code(self, s: Optional[str]) -> int:
+        if s is None:
+            return -1
+        c = self.codes.get(s)
+        if c is None:
+            if _SEP in s:
+                raise ValueError(f"NUL character is not allowed in snapshot strings: {s!r}")
+            c = self.codes[s] = len(self.codes)
+        return c
+
+    def codes_of(self, values) -> array:
+        return array("i", (self.code(v) for v in values))
+
+    def edges(self, groups) -> Tuple[array, array]:
+        ptr, codes = array("q", [0]), array("i")
+        for group in groups:
+            codes.extend(self.code(v) for v in group)
+            ptr.append(len(codes))
+        return ptr, codes
+
+    def blob(self) -> bytes:
+        return _SEP.join(self.codes).encode("utf-8")
+
+
+def _columns(catalog: Catalog, st: _StringTable) -> Dict[str, array]:
+    c = catalog
+    cols: Dict[str, array] = {
+        "authors.id": st.codes_of(a.id for a in c.authors),
+        "authors.name": st.codes_of(a.name for a in c.authors),
+        "books.id": st.codes_of(b.id for b in c.books),
+        "books.title": st.codes_of(b.title for b in c.books),
+        "books.year": array("i", (b.year for b in c.books)),
+        "users.id": st.codes_of(u.id for u in c.users),
+        "users.name": st.codes_of(u.name for u in c.users),
+        "ratings.user": st.codes_of(r.user_id for r in c.ratings),
+        "ratings.book": st.codes_of(r.book_id for r in c.ratings),
+        "ratings.value": array("B", (r.value for r in c.ratings)),
+        "reviews.id": st.codes_of(rv.id for rv in c.reviews),
+        "reviews.user": st.codes_of(rv.user_id for rv in c.reviews),
+        "reviews.book": st.codes_of(rv.book_id for rv in c.reviews),
+        "reviews.text": st.codes_of(rv.text for rv in c.reviews),
+        "reviews.ts": st.codes_of(rv.ts for rv in c.reviews),
+        "loans.id": st.codes_of(l.id for l in c.loans),
+        "loans.user": st.codes_of(l.user_id for l in c.loans),
+        "loans.book": st.codes_of(l.book_id for l in c.loans),
+        "loans.start": st.codes_of(l.start for l in c.loans),
+        "loans.end": st.codes_of(l.end for l in c.loans),
+        "loans.status": array("B", (_LOAN_STATUSES.index(l.status) for l in c.loans)),
+        "tags.id": st.codes_of(t.id for t in c.tags),
+        "tags.name": st.codes_of(t.name for t in c.tags),
+        "tags.parent": st.codes_of(t.parent_id for t in c.tags),
+        "genres.id": st.codes_of(g.id for g in c.genres),
+        "genres.name": st.codes_of(g.name for g in c.genres),
+        "genres.parent": st.codes_of(g.parent_id for g in c.genres),
+    }
+    for edge, attr in (("authors", "author_ids"), ("genres", "genres"), ("tags", "tags")):
+        ptr, codes = st.edges(getattr(b, attr) for b in c.books)
+        cols[f"books.{edge}_ptr"] = ptr
+        cols[f"books.{edge}"] = codes
+    return cols
+
+
+def save_snapshot(catalog: Catalog, path: str) -> int:
+    """Write ``catalog`` to ``path``; returns the file size in bytes"""
+    st = _StringTable()
+    cols = _columns(catalog, st)
+    blobs: List[Tuple[str, bytes, str, int]] = [("strings", st.blob(), "B", len(st.codes))]
+    blobs += [(name, col.tobytes(), col.typecode, len(col)) for name, col in cols.items()]
+
+    layout, offset = {}, 0
+    for name, data, typecode, count in blobs:
+        layout[name] = [offset, len(data), typecode, count]
+        offset += len(data) + (-len(data) % 8)
+    header = json.dumps({"version": VERSION, "byteorder": sys.byteorder, "columns": layout}).encode("utf-8")
+    header += b" " * (-(len(MAGIC) + 4 + len(header)) % 8)
+
+    # пишем во временный файл и подменяем: старый файл может быть отображён в память живым каталогом
+    tmp = Path(f"{path}.tmp{os.getpid()}")
+    try:
+        with tmp.open("wb") as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(4, "little"))
+            f.write(header)
+            for _, data, _, _ in blobs:
+                f.write(data)
+                f.write(b"\0" * (-len(data) % 8))
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return len(MAGIC) + 4 + len(header) + offset
+
+
+class Snapshot:
+    """Memory-mapped snapshot: zero-copy columns plus the interned string table"""
+
+    def __init__(self, path: str):
+        self._views: List[memoryview] = []
+        self._strings: Optional[List[str]] = None
+        self._shared = False   # отображение отдано каталогу и переживает close()
+        self._file = Path(path).open("rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a catalog snapshot")
+        size = int.from_bytes(self._mm[len(MAGIC):len(MAGIC) + 4], "little")
+        start = len(MAGIC) + 4
+        header = json.loads(self._mm[start:start + size].decode("utf-8"))
+        if header["version"] != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported snapshot version {header['version']}")
+        self._native = header["byteorder"] == sys.byteorder
+        self._base = start + size
+        self._layout: Dict[str, List[Any]] = header["columns"]
+
+    @property
+    def strings(self) -> List[str]:
+        if self._strings is None:
+            offset, nbytes, _, count = self._layout["strings"]
+            raw = self._mm[self._base + offset:self._base + offset + nbytes]
+            self._strings = raw.decode("utf-8").split(_SEP) if count else []
+        return self._strings
+
+    def column(self, name: str, copy: bool = False):
+        """Zero-copy view of an integer column (a copy on foreign byte order or with ``copy``).
+
+        The view is released by ``close``; use it only while the snapshot is open.
+        """
+        if copy or not self._native:
+            return self._copy(name)
+        view = self._view(name)
+        self._views.append(view)
+        return view
+
+    def _copy(self, name: str) -> array:
+        offset, nbytes, typecode, _ = self._layout[name]
+        start = self._base + offset
+        col = array(typecode)
+        col.frombytes(self._mm[start:start + nbytes])
+        if not self._native:
+            col.byteswap()
+        return col
+
+    def _view(self, name: str):
+        # не регистрируется в _views: держит отображение, пока жив сам view (или каталог с ним)
+        if not self._native:
+            return self._copy(name)
+        offset, nbytes, typecode, _ = self._layout[name]
+        start = self._base + offset
+        return memoryview(self._mm)[start:start + nbytes].cast(typecode)
+
+    def ratings_table(self) -> RatingsTable:
+        """Ratings straight from the columns, without building Rating objects.
+
+        The values column stays a view over the map, which outlives ``close``.
+        """
+        return RatingsTable.from_codes(
+            self.strings, self._view("ratings.user"), self._view("ratings.book"), self._view("ratings.value"),
+        )
+
+    def catalog(self) -> Catalog:
+        """Lazy catalog over zero-copy column views: entities, ``RatingsTable`` and
+        indexes are built on first access. The loaders hold this snapshot, so the
+        map lives as long as the Catalog even after ``close``."""
+        s = self.strings
+        self._shared = True
+
+        def text(name: str) -> List[Optional[str]]:
+            return [s[c] if c >= 0 else None for c in self._view(name)]
+
+        def edges(name: str) -> List[Tuple[str, ...]]:
+            ptr, codes = self._view(f"books.{name}_ptr"), text(f"books.{name}")
+            return [tuple(codes[ptr[i]:ptr[i + 1]]) for i in range(len(ptr) - 1)]
+
+        def entities(cls, *fields: str):
+            return lambda: tuple(map(cls, *(text(f) for f in fields)))
+
+        return Catalog.lazy({
+            "authors": entities(Author, "authors.id", "authors.name"),
+            "books": lambda: tuple(map(
+                Book, text("books.id"), text("books.title"),
+                edges("authors"), edges("genres"), edges("tags"), self._view("books.year").tolist(),
+            )),
+            "users": entities(User, "users.id", "users.name"),
+            "ratings": self.ratings_table,
+            "reviews": entities(Review, "reviews.id", "reviews.user", "reviews.book", "reviews.text", "reviews.ts"),
+            "loans": lambda: tuple(map(
+                Loan, text("loans.id"), text("loans.user"), text("loans.book"),
+                text("loans.start"), text("loans.end"), [_LOAN_STATUSES[x] for x in self._view("loans.status")],
+            )),
+            "tags": entities(Tag, "tags.id", "tags.name", "tags.parent"),
+            "genres": entities(Genre, "genres.id", "genres.name", "genres.parent"),
+        })
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        self._views.clear()
+        if not self._mm.closed and not self._shared:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # на отображение ещё смотрят каталог или таблица — оно закроется вместе с ними
+        self._file.close()
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def load_snapshot(path: str) -> Catalog:
+    return Snapshot(path).catalog()
+
+
+def touch(catalog: Catalog) -> Catalog:
+    """Materialise every section and the indexes a typical request uses"""
+    for name in ("books_by_id", "users_by_id", "ratings_by_user", "ratings_by_book", "rating_stats",
+                 "books_by_genre", "genre_tree", "tag_tree"):
+        getattr(catalog, name)
+    for section in catalog.values():
+        len(section)
+    return catalog
+
+
+def measure_snapshot_performance(seed_path: str = "data/seed.json",
+                                 snapshot_path: str = "data/seed.snapshot",
+                                 repeat: int = 5) -> Dict[str, Any]:
+    """Cold-start comparison: ``load_seed`` (JSON) vs ``load_snapshot`` (mmap).
+
+    ``*_load_ms`` is the load call itself (indexes are lazy for both);
+    ``*_ready_ms`` also builds every section and the common indexes (``touch``).
+    """
+    from core.transforms import load_seed
+
+    size = save_snapshot(load_seed(seed_path), snapshot_path)
+
+    def best_ms(fn) -> float:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return min(times) * 1000
+
+    json_ms = best_ms(lambda: load_seed(seed_path))
+    snapshot_ms = best_ms(lambda: load_snapshot(snapshot_path))
+    json_ready_ms = best_ms(lambda: touch(load_seed(seed_path)))
+    snapshot_ready_ms = best_ms(lambda: touch(load_snapshot(snapshot_path)))
+    return {
+        "json_load_ms": round(json_ms, 2),
+        "snapshot_load_ms": round(snapshot_ms, 2),
+        "speedup": round(json_ms / snapshot_ms, 2) if snapshot_ms > 0 else 0,
+        "json_ready_ms": round(json_ready_ms, 2),
+        "snapshot_ready_ms": round(snapshot_ready_ms, 2),
+        "ready_speedup": round(json_ready_ms / snapshot_ready_ms, 2) if snapshot_ready_ms > 0 else 0,
+        "json_bytes": Path(seed_path).stat().st_size,
+        "snapshot_bytes": size,
+    }
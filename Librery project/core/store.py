@@ -0,0 +1,152 @@
+# core/store.py
+"""Process-wide cache of loaded catalogs.
+
+One ``CatalogEntry`` per seed path, keyed by the file's ``(mtime_ns, size)``
+(and those of its ``.snapshot`` if that is fresher and used). Every caller —
+all Streamlit sessions and pages — gets the same immutable ``Catalog`` until
+the file changes or ``reload`` is called. Derived indexes (search index,
+loan engine, ...) are built once per entry and dropped with it.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from core.catalog import Catalog
+from core.leaderboard import Leaderboard
+from core.loans import LoanEngine
+from core.memo import cache_for
+from core.pager import book_options, user_options
+from core.search import build_search_index
+from core.snapshot import load_snapshot
+from core.transforms import load_seed
+
+Version = Tuple[int, ...]
+
+
+def _similar(c: Catalog) -> Any:
+    from core.similar import similar_index  # numpy — необязательная зависимость
+    return similar_index(c)
+
+
+# Производные индексы по умолчанию: имя -> построитель от каталога
+DERIVED_BUILDERS: Dict[str, Callable[[Catalog], Any]] = {
+    "search": lambda c: build_search_index(c.books, c.reviews),
+    "loans": lambda c: LoanEngine(c.loans),
+    "similar": _similar,
+    "book_options": book_options,
+    "user_options": user_options,
+    "leaderboard": lambda c: Leaderboard(c, c),
+    # байесовское среднее: одна оценка 5 не обгоняет сотню оценок 4.8
+    "leaderboard_bayes": lambda c: Leaderboard(c, c, min_count=1, prior_weight=10),
+    # тот же кэш, что recommend_for_user берёт по умолчанию; уходит вместе с каталогом
+    "recommendation_cache": cache_for,
+}
+
+
+@dataclass(eq=False)
+class CatalogEntry:
+    path: str
+    version: Version
+    catalog: Catalog
+    source: str          # "json" | "snapshot"
+    load_ms: float
+    loaded_at: float = field(default_factory=time.time)
+    _derived: Dict[str, Any] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def derived(self, name: str, build: Optional[Callable[[Catalog], Any]] = None) -> Any:
+        """Derived index ``name``, built at most once for this catalog version"""
+        value = self._derived.get(name)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = self._derived[name] = (build or DERIVED_BUILDERS[name])(self.catalog)
+        return value
+
+    def derived_names(self) -> Tuple[str, ...]:
+        return tuple(self._derived)
+
+
+def _stat(path: Path) -> Version:
+    st = path.stat()
+    return (st.st_mtime_ns, st.st_size)
+
+
+class CatalogStore:
+    """Shared catalogs by path; thread-safe, loads each version once"""
+
+    def __init__(self, use_snapshot: bool = True):
+        self.use_snapshot = use_snapshot
+        self._entries: Dict[str, CatalogEntry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+
+    def _source(self, seed: Path) -> Tuple[Path, str, Version]:
+        version = _stat(seed)
+        snapshot = seed.with_suffix(".snapshot")
+        if self.use_snapshot and snapshot.exists():
+            snap_version = _stat(snapshot)
+            # снимок используется, только если он не старше seed.json
+            if snap_version[0] >= version[0]:
+                return snapshot, "snapshot", version + snap_version
+        return seed, "json", version
+
+    def entry(self, path: str, force: bool = False) -> CatalogEntry:
+        seed = Path(path).resolve()
+        key = str(seed)
+        source, kind, version = self._source(seed)
+        current = self._entries.get(key)
+        if current is not None and current.version == version and not force:
+            self.hits += 1
+            return current
+        with self._lock:
+            # другой поток мог уже загрузить эту версию, пока мы ждали блокировку
+            current = self._entries.get(key)
+            if current is not None and current.version == version and not force:
+                self.hits += 1
+                return current
+            started = time.perf_counter()
+            catalog = load_snapshot(str(source)) if kind == "snapshot" else load_seed(str(source))
+            entry = CatalogEntry(key, version, catalog, kind, (time.perf_counter() - started) * 1000)
+            self._entries[key] = entry
+            self.loads += 1
+            return entry
+
+    def get(self, path: str) -> Catalog:
+        return self.entry(path).catalog
+
+    def reload(self, path: str) -> CatalogEntry:
+        return self.entry(path, force=True)
+
+    def warm(self, path: str, names: Iterable[str] = ("search", "loans", "book_options", "user_options")) -> CatalogEntry:
+        entry = self.entry(path)
+        for name in names:
+            entry.derived(name)
+        return entry
+
+    def evict(self, path: str) -> None:
+        with self._lock:
+            self._entries.pop(str(Path(path).resolve()), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "loads": self.loads,
+            "hits": self.hits,
+            "paths": {
+                e.path: {"source": e.source, "load_ms": round(e.load_ms, 2), "derived": e.derived_names()}
+                for e in self._entries.values()
+            },
+        }
+
+
+# Общий для процесса экземпляр (все сессии Streamlit)
+STORE = CatalogStore()
@@ -0,0 +1,157 @@
+# core/streaming.py
+"""Streaming loaders for catalogs too large for ``json.load``.
+
+``iter_seed`` parses ``seed.json`` section by section with an incremental
+reader over ``json.JSONDecoder.raw_decode``: only the current entity is ever
+decoded, so the raw JSON tree is never held in memory. ``iter_jsonl`` reads
+the JSON Lines layout (one ``<section>.jsonl`` file per entity type).
+"""
+import json
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple, TextIO
+
+from core.catalog import Catalog, SECTIONS
+from core.transforms import ENTITY_BUILDERS
+
+CHUNK_SIZE = 1 << 16
+_WS = " \t\r\n"
+
+
+class _IncrementalReader:
+    """Pulls JSON tokens/values from a text stream, buffering one value at a time"""
+
+    def __init__(self, f: TextIO, chunk_size: int = CHUNK_SIZE):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._f.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of input)"""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WS:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        got = self.peek()
+        if got != ch:
+            raise ValueError(f"Expected {ch!r} at offset {self._pos}, got {got!r}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # число в конце буфера может быть обрезано — дочитываем
+            if end == len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            return obj
+
+
+def iter_seed(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, Any]]:
+    """Yield ``(section, domain object)`` pairs from ``seed.json`` in file order"""
+    with Path(path).open(encoding="utf-8") as f:
+        reader = _IncrementalReader(f, chunk_size)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            section = reader.value()
+            reader.expect(":")
+            build = ENTITY_BUILDERS.get(section)
+            if build is not None and reader.peek() == "[":
+                reader.expect("[")
+                if reader.peek() == "]":
+                    reader.expect("]")
+                else:
+                    while True:
+                        yield section, build(reader.value())
+                        if reader.peek() == ",":
+                            reader.expect(",")
+                        else:
+                            reader.expect("]")
+                            break
+            else:
+                reader.value()  # неизвестный раздел пропускаем
+            if reader.peek() == ",":
+                reader.expect(",")
+            else:
+                reader.expect("}")
+                return
+
+
+def iter_jsonl(directory: str) -> Iterator[Tuple[str, Any]]:
+    """Yield ``(section, domain object)`` from ``<directory>/<section>.jsonl`` files"""
+    root = Path(directory)
+    for section in SECTIONS:
+        p = root / f"{section}.jsonl"
+        if not p.exists():
+            continue
+        build = ENTITY_BUILDERS[section]
+        with p.open(encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield section, build(json.loads(line))
+
+
+def _collect(items: Iterator[Tuple[str, Any]]) -> Catalog:
+    sections: Dict[str, List[Any]] = {name: [] for name in SECTIONS}
+    for section, obj in items:
+        sections[section].append(obj)
+    return Catalog(**sections)
+
+
+def load_seed_streaming(path: str, chunk_size: int = CHUNK_SIZE) -> Catalog:
+    """Same result as ``load_seed`` without materializing the raw JSON tree"""
+    return _collect(iter_seed(path, chunk_size))
+
+
+def load_jsonl(directory: str) -> Catalog:
+    return _collect(iter_jsonl(directory))
+
+
+def save_jsonl(catalog: Catalog, directory: str) -> None:
+    """Write one ``<section>.jsonl`` file per entity type"""
+    root = Path(directory)
+    root.mkdir(parents=True, exist_ok=True)
+    for section in SECTIONS:
+        with (root / f"{section}.jsonl").open("w", encoding="utf-8") as f:
+            for obj in catalog[section]:
+                f.write(json.dumps(asdict(obj), ensure_ascii=False))
+                f.write("\n")
+
+
+def save_seed(catalog: Catalog, path: str) -> None:
+    """Write ``seed.json`` layout section by section (no full dict in memory)"""
+    with Path(path).open("w", encoding="utf-8") as f:
+        f.write("{")
+        for i, section in enumerate(SECTIONS):
+            f.write(f'{"," if i else ""}\n  {json.dumps(section)}: [')
+            for j, obj in enumerate(catalog[section]):
+                f.write(("," if j else "") + "\n    " + json.dumps(asdict(obj), ensure_ascii=False))
+            f.write("\n  ]")
+        f.write("\n}\n")
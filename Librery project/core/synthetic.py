@@ -0,0 +1,118 @@
+# core/synthetic.py
+"""Deterministic synthetic catalogs for benchmarks.
+
+Shapes follow real library data rather than uniform noise: book popularity
+is Zipfian (a few books get most ratings), user activity is power-law
+(Pareto weights), genres and tags form nested trees, and authors write a
+Zipfian number of books. The same ``(n_ratings, seed)`` always produces the
+same catalog.
+"""
+import random
+from bisect import bisect_left
+from datetime import date, timedelta
+from itertools import accumulate
+from typing import List, Optional, Sequence, Tuple
+
+from core.catalog import Catalog
+from core.domain import Author, Book, Genre, Loan, Rating, Review, Tag, User
+
+_WORDS = (
+    "Library Dawn Salt River Night Garden Stone Winter Glass Empire Silent Iron Shadow "
+    "Ocean Letter City Fire Storm North Song Mirror Echo Golden Forest Station"
+).split()
+_REVIEWS = ("Очень понравилось!", "Неплохо", "Скучно", "Great read", "Would not recommend", "Классика")
+
+
+def _zipf_cum(n: int, s: float) -> List[float]:
+    return list(accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def _pick(rnd: random.Random, cum: Sequence[float]) -> int:
+    return bisect_left(cum, rnd.random() * cum[-1])
+
+
+def _tree(prefix: str, cls, n: int, roots: int, rnd: random.Random) -> Tuple:
+    """Random recursive tree: ``roots`` roots, every later node hangs off a random earlier one"""
+    nodes = []
+    for i in range(n):
+        parent = None if i < roots else f"{prefix}{rnd.randrange(i) + 1}"
+        nodes.append(cls(f"{prefix}{i + 1}", f"{cls.__name__.lower()}-{i + 1:03d}", parent))
+    return tuple(nodes)
+
+
+def generate_catalog(
+    n_ratings: int,
+    seed: int = 0,
+    n_books: Optional[int] = None,
+    n_users: Optional[int] = None,
+    book_skew: float = 1.07,
+    activity_alpha: float = 1.5,
+) -> Catalog:
+    """Catalog with about ``n_ratings`` unique (user, book) ratings.
+
+    ``book_skew`` is the Zipf exponent of book popularity, ``activity_alpha``
+    the Pareto shape of user activity (smaller -> heavier tail).
+    """
+    rnd = random.Random(seed)
+    n_books = n_books or max(50, n_ratings // 20)
+    n_users = n_users or max(20, n_ratings // 30)
+    n_authors = max(10, n_books // 4)
+    n_genres = max(10, min(500, n_books // 40))
+    n_tags = max(10, min(2000, n_books // 10))
+
+    genres = _tree("g", Genre, n_genres, 5, rnd)
+    tags = _tree("t", Tag, n_tags, 10, rnd)
+    authors = tuple(Author(f"a{i + 1}", f"{rnd.choice(_WORDS)} {rnd.choice(_WORDS)}") for i in range(n_authors))
+    users = tuple(User(f"u{i + 1}", f"User {i + 1}") for i in range(n_users))
+
+    author_cum = _zipf_cum(n_authors, 1.0)
+    # жанры книг — чаще листья и глубокие узлы, как в реальных каталогах
+    genre_cum = list(accumulate(range(1, n_genres + 1)))
+    books = tuple(
+        Book(
+            id=f"b{i + 1}",
+            title=" ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(1, 3))),
+            author_ids=tuple(dict.fromkeys(f"a{_pick(rnd, author_cum) + 1}" for _ in range(rnd.choice((1, 1, 1, 2))))),
+            genres=tuple(dict.fromkeys(f"g{_pick(rnd, genre_cum) + 1}" for _ in range(rnd.randint(1, 3)))),
+            tags=tuple(dict.fromkeys(f"t{rnd.randrange(n_tags) + 1}" for _ in range(rnd.randint(0, 4)))),
+            year=rnd.randint(1850, 2025),
+        )
+        for i in range(n_books)
+    )
+
+    # популярность книг по Zipf; порядок книг перемешан, чтобы хиты не шли подряд
+    book_cum = _zipf_cum(n_books, book_skew)
+    book_rank = list(range(n_books))
+    rnd.shuffle(book_rank)
+    user_cum = list(accumulate(rnd.paretovariate(activity_alpha) for _ in range(n_users)))
+
+    target = min(n_ratings, n_books * n_users)
+    seen = set()
+    ratings: List[Rating] = []
+    attempts = 0
+    while len(ratings) < target and attempts < target * 20:
+        attempts += 1
+        u, b = _pick(rnd, user_cum), book_rank[_pick(rnd, book_cum)]
+        if (u, b) in seen:
+            continue
+        seen.add((u, b))
+        ratings.append(Rating(users[u].id, books[b].id, rnd.choices((1, 2, 3, 4, 5), (1, 2, 4, 6, 5))[0]))
+
+    day0 = date(2024, 1, 1)
+    review_src = ratings[::10]
+    reviews = tuple(
+        Review(f"rv{i + 1}", r.user_id, r.book_id, rnd.choice(_REVIEWS),
+               f"{day0 + timedelta(days=rnd.randrange(600))}T{rnd.randrange(24):02d}:00:00")
+        for i, r in enumerate(review_src)
+    )
+    loans = []
+    for i, r in enumerate(ratings[::15]):
+        start = day0 + timedelta(days=rnd.randrange(600))
+        status = rnd.choice(("active", "returned", "returned", "overdue"))
+        end = None if status == "active" else (start + timedelta(days=rnd.randint(3, 30))).isoformat()
+        loans.append(Loan(f"l{i + 1}", r.user_id, r.book_id, start.isoformat(), end, status))
+
+    return Catalog(
+        authors=authors, books=books, users=users, ratings=tuple(ratings),
+        reviews=reviews, loans=tuple(loans), tags=tags, genres=genres,
+    )
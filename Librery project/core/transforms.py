@@ -1,73 +1,131 @@
 # core/transforms.py
 import json
+from dataclasses import replace
 from pathlib import Path
 from functools import reduce
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Callable
 from core.domain import Author, Book, User, Rating, Review, Loan, Tag, Genre
+from core.catalog import (
+    Catalog, RatingSource, Ratings, Reviews, attach_aggregates, book_ratings, per_catalog, rating_aggregates,
+)
+from core.ratings_table import RatingsTable
+from core.persistent import PersistentVector, PersistentMap, SideTable
+from core.instrument import instrumented
+from core.snapshot import save_snapshot, load_snapshot  # noqa: F401  (бинарный снимок каталога)
 
 
-def load_seed(path: str) -> Dict[str, Tuple[Any, ...]]:
+def _book(b: Dict[str, Any]) -> Book:
+    # Преобразуем списки в кортежи для Book
+    return Book(
+        id=b["id"],
+        title=b["title"], 
+        author_ids=tuple(b["author_ids"]),  # список -> кортеж
+        genres=tuple(b["genres"]),          # список -> кортеж
+        tags=tuple(b["tags"]),              # список -> кортеж
+        year=b["year"]
+    )
+
+
+# Раздел seed.json -> конструктор доменного объекта из разобранного dict
+ENTITY_BUILDERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "authors": lambda a: Author(**a),
+    "books": _book,
+    "users": lambda u: User(**u),
+    "ratings": lambda r: Rating(**r),
+    "reviews": lambda rv: Review(**rv),
+    "loans": lambda l: Loan(**l),
+    "tags": lambda t: Tag(**t),
+    "genres": lambda g: Genre(**g),
+}
+
+
+@instrumented()
+def load_seed(path: str) -> Catalog:
     p = Path(path)
     with p.open(encoding="utf-8") as f:
         raw = json.load(f)
 
-    authors = tuple(Author(**a) for a in raw.get("authors", []))
-    
-    # Преобразуем списки в кортежи для Book
-    books = tuple(
-        Book(
-            id=b["id"],
-            title=b["title"], 
-            author_ids=tuple(b["author_ids"]),  # список -> кортеж
-            genres=tuple(b["genres"]),          # список -> кортеж
-            tags=tuple(b["tags"]),              # список -> кортеж
-            year=b["year"]
-        )
-        for b in raw.get("books", [])
-    )
-    
-    users = tuple(User(**u) for u in raw.get("users", []))
-    ratings = tuple(Rating(**r) for r in raw.get("ratings", []))
-    reviews = tuple(Review(**rv) for rv in raw.get("reviews", []))
-    loans = tuple(Loan(**l) for l in raw.get("loans", []))
-    tags = tuple(Tag(**t) for t in raw.get("tags", []))
-    genres = tuple(Genre(**g) for g in raw.get("genres", []))
-
-    return {
-        "authors": authors,
-        "books": books,
-        "users": users,
-        "ratings": ratings,
-        "reviews": reviews,
-        "loans": loans,
-        "tags": tags,
-        "genres": genres,
-    }
-
-
-def add_rating(ratings: Tuple[Rating, ...], r: Rating) -> Tuple[Rating, ...]:
+    return Catalog(**{
+        section: tuple(build(x) for x in raw.get(section, []))
+        for section, build in ENTITY_BUILDERS.items()
+    })
+
 
+def add_rating(
+    ratings: Tuple[Rating, ...] | RatingsTable | PersistentVector, r: Rating,
+) -> Tuple[Rating, ...] | RatingsTable | PersistentVector:
+    """New ratings with ``r`` appended; ``ratings`` and its aggregates stay as they are.
+
+    ``RatingsTable`` and ``PersistentVector`` carry maintained aggregates over
+    to the new version (O(log n)), so averages on it are not recomputed.
+    """
+    if isinstance(ratings, PersistentVector):
+        new = ratings.append(r)  # O(log32 n), старая версия разделяет узлы с новой
+        stats = rating_aggregates(ratings)
+        return new if stats is None else attach_aggregates(new, stats.add(r))
     return ratings + (r,)
 
 
+def persistent_ratings(ratings: Ratings) -> RatingsTable | PersistentVector:
+    """Ratings as a collection with cheap appends (``RatingsTable`` stays columnar)"""
+    if isinstance(ratings, (RatingsTable, PersistentVector)):
+        return ratings
+    if isinstance(ratings, Catalog):
+        return ratings.ratings if isinstance(ratings.ratings, RatingsTable) else _catalog_ratings(ratings)
+    return PersistentVector(ratings)
+
+
+def persistent_reviews(reviews: Reviews) -> PersistentVector:
+    if isinstance(reviews, PersistentVector):
+        return reviews
+    return _catalog_reviews(reviews) if isinstance(reviews, Catalog) else PersistentVector(reviews)
+
+
+# Вектор строится один раз на каталог; агрегаты — уже посчитанные каталогом
+_catalog_ratings = per_catalog(lambda c: attach_aggregates(PersistentVector(c.ratings), c.rating_stats))
+_catalog_reviews = per_catalog(lambda c: PersistentVector(c.reviews))
+
+# id выдачи -> позиция в PersistentVector; set позиции не меняет, поэтому карта
+# переходит к новой версии, а строится один раз на вектор
+_LOAN_POSITIONS = SideTable()
+
+
 def update_loan(
-    loans: Tuple[Loan, ...], loan_id: str, status: str, end: str | None
-) -> Tuple[Loan, ...]:
+    loans: Tuple[Loan, ...] | PersistentVector | PersistentMap, loan_id: str, status: str, end: str | None
+) -> Tuple[Loan, ...] | PersistentVector | PersistentMap:
+    """New loans with one loan changed; the other ``Loan`` objects are reused as is.
+
+    ``PersistentMap`` (loan id -> Loan) and ``PersistentVector`` are updated in
+    O(log n): the vector copies only the path to the changed element and finds
+    it through an id -> position map kept with the vector.
+    """
+    if isinstance(loans, PersistentMap):
+        loan = loans.get(loan_id)
+        return loans if loan is None else loans.set(loan_id, replace(loan, status=status, end=end))
+    if isinstance(loans, PersistentVector):
+        positions = _LOAN_POSITIONS.get(loans)
+        if positions is None:
+            positions = {}
+            for i, loan in enumerate(loans):
+                positions.setdefault(loan.id, i)
+            _LOAN_POSITIONS.set(loans, positions)
+        i = positions.get(loan_id)
+        if i is None:
+            return loans
+        updated = loans.set(i, replace(loans[i], status=status, end=end))
+        _LOAN_POSITIONS.set(updated, positions)
+        return updated
     return tuple(
-        Loan(
-            id=l.id,
-            user_id=l.user_id,
-            book_id=l.book_id,
-            start=l.start,
-            end=end if l.id == loan_id else l.end,
-            status=status if l.id == loan_id else l.status,
-        )
+        replace(l, status=status, end=end) if l.id == loan_id else l
         for l in loans
     )
 
 
-def avg_rating_for_book(ratings: Tuple[Rating, ...], book_id: str) -> float:
-    filtered = tuple(filter(lambda r: r.book_id == book_id, ratings))
+def avg_rating_for_book(ratings: RatingSource, book_id: str) -> float:
+    stats = rating_aggregates(ratings)
+    if stats is not None:
+        return stats.mean(book_id)
+    filtered = book_ratings(ratings, book_id)
     if not filtered:
         return 0.0
     total = reduce(lambda acc, r: acc + r.value, filtered, 0)
@@ -0,0 +1,229 @@
+"""NumPy recommendation engine.
+
+Same scoring as ``core.memo.recommend_for_user`` (sum of profile weights over a
+book's genres, authors and tags), but the catalog is encoded once as a sparse
+book x feature matrix and every book is scored with one matrix-vector product.
+Ties are broken by catalog order, exactly like the stable sort in ``memo``.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+import time
+
+import numpy as np
+
+from core.domain import BookID, Rating, UserID
+from core.catalog import Catalog, Books, Ratings, all_books, all_ratings, per_catalog, user_ratings as ratings_of_user
+
+# Бюджет памяти плотных буферов одного куска пользователей в recommend_for_users
+CHUNK_BYTES = 64 * 1024 * 1024
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class FeatureMatrix:
+    """Books encoded as a CSR matrix over (kind, id) features"""
+    book_ids: Tuple[BookID, ...]
+    book_pos: Dict[BookID, int]           # id -> первая строка с этим id
+    features: Dict[Tuple[str, str], int]  # ("genres", "g1") -> столбец
+    indptr: np.ndarray                    # (n_books + 1,)
+    indices: np.ndarray                   # (nnz,) столбцы
+    rows: np.ndarray                      # (nnz,) строка каждого ненулевого элемента
+    codes: np.ndarray                     # (n_books,) book_pos[id] для каждой строки
+
+    @property
+    def n_books(self) -> int:
+        return len(self.book_ids)
+
+    @property
+    def n_features(self) -> int:
+        return len(self.features)
+
+    def book_features(self, row: int) -> np.ndarray:
+        return self.indices[self.indptr[row]:self.indptr[row + 1]]
+
+
+def build_feature_matrix(books: Books) -> FeatureMatrix:
+    books = all_books(books)
+    features: Dict[Tuple[str, str], int] = {}
+    book_pos: Dict[BookID, int] = {}
+    indptr = [0]
+    indices = []
+    codes = []
+
+    for row, book in enumerate(books):
+        book_pos.setdefault(book.id, row)
+        codes.append(book_pos[book.id])
+        # повторы внутри кортежа сохраняются — как и в профиле memo, они суммируются
+        for kind, values in (("genres", book.genres), ("authors", book.author_ids), ("tags", book.tags)):
+            for value in values:
+                indices.append(features.setdefault((kind, value), len(features)))
+        indptr.append(len(indices))
+
+    indptr_arr = np.asarray(indptr, dtype=np.int64)
+    return FeatureMatrix(
+        book_ids=tuple(b.id for b in books),
+        book_pos=book_pos,
+        features=features,
+        indptr=indptr_arr,
+        indices=np.asarray(indices, dtype=np.int64),
+        rows=np.repeat(np.arange(len(books), dtype=np.int64), np.diff(indptr_arr)),
+        codes=np.asarray(codes, dtype=np.int64),
+    )
+
+
+@per_catalog
+def feature_matrix(books: Books) -> FeatureMatrix:
+    """``build_feature_matrix`` cached per Catalog (tuples are encoded every call)"""
+    return build_feature_matrix(books)
+
+
+def profile_vector(fm: FeatureMatrix, user_ratings: Tuple[Rating, ...]) -> np.ndarray:
+    w = np.zeros(fm.n_features, dtype=np.float64)
+    for rating in user_ratings:
+        row = fm.book_pos.get(rating.book_id)
+        if row is not None:
+            np.add.at(w, fm.book_features(row), max(0, rating.value - 3))
+    return w
+
+
+def score_books(fm: FeatureMatrix, w: np.ndarray) -> np.ndarray:
+    """Sparse matrix-vector product: score of every book for profile ``w``"""
+    return np.bincount(fm.rows, weights=w[fm.indices], minlength=fm.n_books)
+
+
+def top_k(scores: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+    """Top-k candidate rows by score desc, ties by row asc (``candidates`` sorted)"""
+    if k <= 0 or candidates.size == 0:
+        return candidates[:0]
+    s = scores[candidates]
+    if k < candidates.size:
+        kth = s[np.argpartition(-s, k - 1)[:k]].min()
+        above = candidates[s > kth]
+        ties = candidates[s == kth][:k - above.size]
+        candidates = np.concatenate((above, ties))
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][:k]
+
+
+def recommend_for_user_np(
+    user_id: str,
+    ratings_index: Ratings,
+    books_index: Books,
+    k: int = 10,
+) -> Tuple[str, ...]:
+    user_ratings = ratings_of_user(ratings_index, user_id)
+    if not user_ratings:
+        return tuple()
+
+    fm = feature_matrix(books_index)
+    scores = score_books(fm, profile_vector(fm, user_ratings))
+
+    rated = [fm.book_pos[r.book_id] for r in user_ratings if r.book_id in fm.book_pos]
+    candidates = np.flatnonzero(~np.isin(fm.codes, rated))
+    return tuple(fm.book_ids[i] for i in top_k(scores, candidates, k))
+
+
+# ---------- Пакетные рекомендации ----------
+
+@dataclass(frozen=True, slots=True)
+class BatchRecommendations:
+    recommendations: Dict[UserID, Tuple[BookID, ...]]
+    elapsed_s: float
+
+    @property
+    def n_users(self) -> int:
+        return len(self.recommendations)
+
+    @property
+    def users_per_sec(self) -> float:
+        return self.n_users / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+
+def expand_features(fm: FeatureMatrix, book_rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Feature columns of the given rows, plus the entry each column came from"""
+    lengths = fm.indptr[book_rows + 1] - fm.indptr[book_rows]
+    total = int(lengths.sum())
+    entry = np.repeat(np.arange(book_rows.size), lengths)
+    offsets = np.repeat(fm.indptr[book_rows] - np.cumsum(lengths) + lengths, lengths)
+    return fm.indices[offsets + np.arange(total)], entry
+
+
+def _score_chunk(fm: FeatureMatrix, profiles: np.ndarray) -> np.ndarray:
+    """(users x features) @ (features x books) over the CSR book matrix"""
+    scores = np.zeros((profiles.shape[0], fm.n_books), dtype=np.float64)
+    nonempty = np.flatnonzero(np.diff(fm.indptr))
+    if nonempty.size:
+        scores[:, nonempty] = np.add.reduceat(profiles[:, fm.indices], fm.indptr[nonempty], axis=1)
+    return scores
+
+
+def chunk_size_for(fm: FeatureMatrix, budget: int = CHUNK_BYTES) -> int:
+    """Users per scoring chunk whose dense buffers fit in ``budget`` bytes"""
+    # на пользователя: профиль, выборка профиля по nnz, оценки (float64) и маска оценённых (2 x bool)
+    per_user = 8 * (fm.n_features + fm.indices.size + fm.n_books) + 2 * fm.n_books
+    return max(1, budget // max(1, per_user))
+
+
+def recommend_for_users(
+    user_ids: Optional[Iterable[UserID]],
+    catalog: Catalog,
+    k: int = 10,
+    chunk_size: Optional[int] = None,
+) -> BatchRecommendations:
+    """Top-k for many users at once (``None`` = every user in the catalog).
+
+    Profiles are built in one pass over the ratings; scoring runs in chunks of
+    ``chunk_size`` users, so memory stays at O(chunk_size x (books + nnz)). By
+    default the chunk is sized by ``chunk_size_for`` to about ``CHUNK_BYTES``.
+    Each user's result equals ``recommend_for_user_np`` for that user.
+    """
+    started = time.perf_counter()
+    ids = tuple(dict.fromkeys(u.id for u in catalog.users) if user_ids is None else dict.fromkeys(user_ids))
+    fm = feature_matrix(catalog)
+    if chunk_size is None:
+        chunk_size = chunk_size_for(fm)
+    slot = {uid: i for i, uid in enumerate(ids)}
+
+    # Один проход по оценкам: (пользователь, строка книги, вес)
+    has_ratings = np.zeros(len(ids), dtype=bool)
+    u_idx, b_row, weight = [], [], []
+    for r in all_ratings(catalog):
+        i = slot.get(r.user_id)
+        if i is None:
+            continue
+        has_ratings[i] = True
+        row = fm.book_pos.get(r.book_id)
+        if row is not None:
+            u_idx.append(i)
+            b_row.append(row)
+            weight.append(max(0, r.value - 3))
+
+    u_idx = np.asarray(u_idx, dtype=np.int64)
+    order = np.argsort(u_idx, kind="stable")
+    u_idx = u_idx[order]
+    b_row = np.asarray(b_row, dtype=np.int64)[order]
+    weight = np.asarray(weight, dtype=np.float64)[order]
+
+    result: Dict[UserID, Tuple[BookID, ...]] = {}
+    for lo in range(0, len(ids), max(1, chunk_size)):
+        hi = min(lo + max(1, chunk_size), len(ids))
+        a, b = np.searchsorted(u_idx, (lo, hi))
+        users, rows = u_idx[a:b] - lo, b_row[a:b]
+
+        profiles = np.zeros((hi - lo, fm.n_features), dtype=np.float64)
+        cols, entry = expand_features(fm, rows)
+        np.add.at(profiles, (users[entry], cols), weight[a:b][entry])
+
+        scores = _score_chunk(fm, profiles)
+        rated = np.zeros((hi - lo, fm.n_books), dtype=bool)
+        rated[users, rows] = True
+        rated = rated[:, fm.codes]  # дубликаты id исключаются вместе с первой строкой
+
+        for j in range(hi - lo):
+            uid = ids[lo + j]
+            if not has_ratings[lo + j]:
+                result[uid] = tuple()
+                continue
+            top = top_k(scores[j], np.flatnonzero(~rated[j]), k)
+            result[uid] = tuple(fm.book_ids[t] for t in top)
+
+    return BatchRecommendations(result, time.perf_counter() - started)
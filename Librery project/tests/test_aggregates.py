@@ -0,0 +1,86 @@
+from core.aggregates import RatingAggregates, RatingStats
+from core.catalog import Catalog
+from core.domain import Book, Rating, User
+from core.ratings_table import RatingsTable
+from core.ftypes import add_rating_pipeline
+from core.transforms import add_rating, avg_rating_for_book
+from core import functional as fn
+
+
+RATINGS = (
+    Rating("u1", "b1", 5),
+    Rating("u2", "b1", 3),
+    Rating("u3", "b2", 4),
+)
+
+
+def test_stats_count_sum_and_squares():
+    stats = RatingAggregates(RATINGS).get("b1")
+    assert stats == RatingStats(count=2, total=8, total_sq=34)
+    assert stats.mean == 4.0
+    assert abs(stats.variance - 1.0) < 1e-9
+    assert RatingAggregates(RATINGS).get("bX") == RatingStats()
+
+
+def test_avg_from_aggregates_matches_scan():
+    agg = RatingAggregates(RATINGS)
+    catalog = Catalog(ratings=RATINGS)
+    for book_id in ("b1", "b2", "bX"):
+        expected = avg_rating_for_book(RATINGS, book_id)
+        assert avg_rating_for_book(agg, book_id) == expected
+        assert avg_rating_for_book(catalog, book_id) == expected
+
+
+def test_add_returns_new_aggregates_and_keeps_the_old_ones():
+    agg = RatingAggregates(RATINGS)
+    newer = agg.add(Rating("u4", "b2", 2)).add(Rating("u4", "b9", 5))
+    assert agg.get("b2") == RatingStats(count=1, total=4, total_sq=16) and "b9" not in agg
+    assert newer.get("b2") == RatingStats(count=2, total=6, total_sq=20)
+    assert dict(newer.items()) == dict(RatingAggregates(RATINGS + (Rating("u4", "b2", 2), Rating("u4", "b9", 5))).items())
+    assert len(newer) == 3
+
+
+def test_delta_is_folded_into_a_new_table():
+    agg = RatingAggregates(RATINGS)
+    ratings = RATINGS
+    for i in range(200):
+        r = Rating(f"x{i}", f"n{i % 90}", 1 + i % 5)
+        agg, ratings = agg.add(r), ratings + (r,)
+    assert dict(agg.items()) == dict(RatingAggregates(ratings).items())
+
+
+def test_add_rating_leaves_cached_aggregates_untouched():
+    catalog = Catalog(ratings=RATINGS)
+    before = catalog.rating_stats.get("b2")
+    new_rs = add_rating(catalog.ratings, Rating("u4", "b2", 2))
+    assert len(new_rs) == 4
+    assert catalog.rating_stats.get("b2") == before
+    assert avg_rating_for_book(catalog, "b2") == 4.0 and avg_rating_for_book(new_rs, "b2") == 3.0
+
+
+def test_table_carries_aggregates_to_appended_tables():
+    table = RatingsTable(RATINGS)
+    stats = table.aggregates()
+    bigger = add_rating(table, Rating("u4", "b2", 2))
+    assert stats.get("b2").count == 1 and table.aggregates() is stats
+    assert bigger._aggregates is not None  # не пересчитываются с нуля
+    assert bigger.aggregates().get("b2") == RatingStats(count=2, total=6, total_sq=20)
+
+
+def test_pipeline_keeps_catalog_aggregates():
+    books = (Book("b1", "B1", (), (), (), 2020), Book("b2", "B2", (), (), (), 2021))
+    users = (User("u1", "Ann"),)
+    catalog = Catalog(books=books, users=users, ratings=RATINGS)
+    stats = catalog.rating_stats
+
+    assert add_rating_pipeline(Rating("u1", "b1", 1), catalog, catalog, catalog).is_left()
+    new_ratings = add_rating_pipeline(Rating("u1", "b2", 1), catalog, catalog, catalog).get_or_else(None)
+    assert catalog.rating_stats is stats and stats.get("b2").count == 1
+    assert avg_rating_for_book(new_ratings, "b2") == 2.5
+
+
+def test_top_books_from_catalog_aggregates():
+    books = (Book("b1", "B1", (), (), (), 2020), Book("b2", "B2", (), (), (), 2021))
+    catalog = Catalog(books=books, ratings=RATINGS)
+    assert fn.top_books_by_avg(catalog, catalog, 2) == (("b1", 4.0), ("b2", 4.0))
+    assert fn.books_with_avg_ge(catalog, catalog, 4.0) == books
@@ -0,0 +1,33 @@
+from core.bench import benchmark_containers, compare_results, load_results, measure, run_benchmarks, save_results
+
+
+def test_measure_reports_percentiles():
+    stats = measure(lambda i: sum(range(100 * (i + 1))), calls=20)
+    assert stats["calls"] == 20
+    assert stats["min_ms"] <= stats["p50_ms"] <= stats["p90_ms"] <= stats["p99_ms"]
+    assert stats["peak_kib"] >= 0
+
+
+def test_run_save_and_compare(tmp_path):
+    results = run_benchmarks(sizes=(1000,), calls=10, only=("validate_rating", "recommend_for_user"))
+    entry = results["sizes"]["1000"]
+    assert set(entry["cases"]) == {"validate_rating", "recommend_for_user"}
+    assert entry["counts"]["ratings"] == 1000
+
+    path = str(tmp_path / "bench.json")
+    save_results(results, path)
+    old = load_results(path)
+    assert compare_results(old, results) == []
+
+    slower = load_results(path)
+    slower["sizes"]["1000"]["cases"]["validate_rating"]["p50_ms"] = old["sizes"]["1000"]["cases"]["validate_rating"]["p50_ms"] * 3 + 1
+    regressions = compare_results(old, slower)
+    assert [r["case"] for r in regressions] == ["validate_rating"]
+
+
+def test_container_microbenchmark_reports_both_sides():
+    rows = benchmark_containers(n=500)
+    timed = {"map+bind+nothing", "collect n values", "validate n ratings"}
+    assert timed | {"instance size"} == set(rows)
+    assert all(rows[name]["baseline_ns"] > 0 and rows[name]["new_ns"] > 0 for name in timed)
+    assert rows["instance size"]["new_bytes"] < rows["instance size"]["baseline_bytes"]
@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from core import functional as fn
+from core.bitmap import ARRAY_MAX, Bitmap, build_facet_index, facet_index
+from core.catalog import Catalog
+from core.domain import Book
+from core.query import Query
+from core.synthetic import generate_catalog
+
+
+def _sets(seed):
+    rnd = random.Random(seed)
+    # разреженные и плотные контейнеры в нескольких чанках
+    sparse = {rnd.randrange(300_000) for _ in range(2_000)}
+    dense = set(range(60_000, 140_000, 2)) | {rnd.randrange(300_000) for _ in range(5_000)}
+    return sparse, dense
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_set_algebra_matches_python_sets(seed):
+    a, b = _sets(seed)
+    ba, bb = Bitmap(a), Bitmap(b)
+    assert list(ba) == sorted(a) and len(bb) == len(b)
+    assert list(ba & bb) == sorted(a & b)
+    assert list(ba | bb) == sorted(a | b)
+    assert list(ba - bb) == sorted(a - b)
+    assert list(bb.andnot(ba)) == sorted(b - a)
+    assert list(Bitmap.union_all([ba, bb, Bitmap([7])])) == sorted(a | b | {7})
+    assert all(x in bb for x in list(b)[:100]) and -1 not in bb and 299_999 + 10**6 not in bb
+
+
+def test_containers_switch_between_array_and_bitset():
+    dense = Bitmap(range(ARRAY_MAX + 10))
+    assert isinstance(dense._chunks[0], int)
+    thin = dense - Bitmap(range(20, ARRAY_MAX + 10))
+    assert isinstance(thin._chunks[0], tuple) and list(thin) == list(range(20))
+    assert Bitmap.range(70_000) == Bitmap(range(70_000))
+    assert not (Bitmap([1, 2]) & Bitmap([3])) and Bitmap().nbytes == 0
+
+
+def test_facet_index_and_books_by_facets():
+    catalog = generate_catalog(5_000, seed=4)
+    index = facet_index(catalog)
+    assert facet_index(catalog) is index
+    genre = max(catalog.books_by_genre, key=lambda g: len(catalog.books_by_genre[g]))
+    author = catalog.books[0].author_ids[0]
+    assert index.select(index.genre(genre)) == catalog.books_by_genre[genre]
+
+    expected = tuple(
+        b for b in catalog.books
+        if genre in b.genres and 1950 <= b.year <= 1990 and author not in b.author_ids
+    )
+    kwargs = dict(genres=[genre], year_from=1950, year_to=1990, exclude_authors=[author])
+    assert fn.books_by_facets(catalog, **kwargs) == expected
+    assert fn.books_by_facets(catalog.books, **kwargs) == expected
+
+    root = next(g.id for g in catalog.genres if g.parent_id is None)
+    deep = fn.books_by_facets(catalog, genres=[root], recursive=True)
+    assert deep == fn.books_in_genre_subtree(catalog, catalog, root)
+    with pytest.raises(ValueError):
+        fn.books_by_facets(catalog.books, genres=[root], recursive=True)
+    with pytest.raises(ValueError):
+        build_facet_index(catalog.books).genre(root, recursive=True)
+
+
+def _year_books(years):
+    return tuple(Book(f"b{i}", f"Book {i}", ("a1",), ("g1",), (), y) for i, y in enumerate(years))
+
+
+def test_year_ranges_with_mid_decade_starts_and_sparse_decades():
+    books = _year_books((1900, 1949, 1951, 1953, 1960, 2000, 1987, 1955))
+    index = build_facet_index(books)
+    bounds = [None, 1899, 1900, 1945, 1949, 1950, 1951, 1959, 1960, 1961, 1990, 2000, 2010]
+    for lo in bounds:
+        for hi in bounds:
+            expected = [i for i, b in enumerate(books)
+                        if (lo is None or b.year >= lo) and (hi is None or b.year <= hi)]
+            assert list(index.years(lo, hi)) == expected, (lo, hi)
+
+
+def test_year_ranges_above_container_threshold_match_tuple_scan():
+    # больше ARRAY_MAX кандидатов — within_years идёт через битмапы лет, а не по книгам
+    years = (1900, 1949, 1953, 1960, 2000) + (1951,) * (ARRAY_MAX + 904) + (1957,) * 300
+    catalog = Catalog(books=_year_books(years))
+    for lo, hi in [(1949, 1960), (1950, 1959), (1951, 1957), (1952, None), (None, 1951)]:
+        expected = fn.books_by_facets(catalog.books, year_from=lo, year_to=hi)
+        assert fn.books_by_facets(catalog, year_from=lo, year_to=hi) == expected, (lo, hi)
+        assert Query(catalog).genre("g1").author("a1").year(lo, hi).books() == expected
+    assert len(fn.books_by_facets(catalog, year_from=1949, year_to=1960)) == ARRAY_MAX + 904 + 300 + 3
+
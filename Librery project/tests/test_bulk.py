@@ -0,0 +1,60 @@
+from core.aggregates import RatingAggregates
+from core.catalog import Catalog
+from core.domain import Book, Rating, Review, User
+from core.ftypes import (
+    validate_rating, validate_ratings_bulk, add_ratings_bulk,
+    validate_reviews_bulk, add_reviews_bulk,
+)
+from core.ratings_table import RatingsTable
+
+
+BOOKS = (Book("b1", "B1", (), (), (), 2020), Book("b2", "B2", (), (), (), 2021))
+USERS = (User("u1", "Ann"), User("u2", "Bob"))
+EXISTING = (Rating("u1", "b1", 4),)
+
+
+def test_bulk_matches_single_validation_per_row():
+    batch = (
+        Rating("u1", "b1", 5),   # уже есть
+        Rating("u2", "b1", 9),   # значение
+        Rating("u9", "b7", 3),   # неизвестные id
+        Rating("u2", "b2", 3),
+    )
+    for source in (EXISTING, Catalog(books=BOOKS, users=USERS, ratings=EXISTING), RatingsTable(EXISTING)):
+        report = validate_ratings_bulk(batch, BOOKS, USERS, source)
+        assert report == tuple(validate_rating(r, BOOKS, USERS, EXISTING) for r in batch)
+
+
+def test_bulk_detects_duplicates_within_batch():
+    batch = (Rating("u2", "b2", 9), Rating("u2", "b2", 3), Rating("u2", "b2", 4))
+    report = validate_ratings_bulk(batch, BOOKS, USERS, EXISTING)
+    assert [e.is_right() for e in report] == [False, True, False]
+    assert report[2]._error == {"duplicate": "Duplicate rating within the batch"}
+
+
+def test_add_ratings_bulk_appends_valid_rows():
+    batch = (Rating("u2", "b1", 2), Rating("u1", "b1", 5), Rating("u1", "b2", 5))
+    report, new_ratings = add_ratings_bulk(batch, EXISTING, BOOKS, USERS)
+    assert [e.is_right() for e in report] == [True, False, True]
+    assert tuple(new_ratings) == EXISTING + (batch[0], batch[2])
+    stats = RatingAggregates(new_ratings)
+    assert stats.get("b1").count == 2 and stats.get("b2").count == 1
+
+    _, table = add_ratings_bulk(batch, RatingsTable(EXISTING), BOOKS, USERS)
+    assert isinstance(table, RatingsTable) and tuple(table) == new_ratings
+
+
+def test_review_bulk_validation_and_append():
+    existing = (Review("r1", "u1", "b1", "Already here and long", "2025-01-01"),)
+    batch = (
+        Review("r1", "u2", "b1", "Repeated identifier text", "2025-01-02"),
+        Review("r2", "u2", "b2", "short", "2025-01-02"),
+        Review("r3", "u2", "b2", "A perfectly fine review", "2025-01-02"),
+        Review("r3", "u1", "b2", "Same id inside the batch", "2025-01-02"),
+    )
+    report = validate_reviews_bulk(batch, BOOKS, USERS, existing)
+    assert [e.is_right() for e in report] == [False, False, True, False]
+    assert "id" in report[0]._error and "text" in report[1]._error
+
+    _, new_reviews = add_reviews_bulk(batch, existing, BOOKS, USERS)
+    assert new_reviews == existing + (batch[2],)
@@ -0,0 +1,68 @@
+from core.domain import Book, Rating, Review, Loan, User
+from core.catalog import Catalog, book_by_id, user_ratings, has_rating, genre_books
+from core import functional as fn
+from core.ftypes import safe_book, validate_rating
+from core.memo import recommend_for_user
+from core.transforms import load_seed
+
+
+BOOKS = (
+    Book("b1", "Book One", ("a1",), ("g1", "g1"), ("t1",), 2020),
+    Book("b2", "Book Two", ("a2",), ("g2",), ("t1",), 2021),
+    Book("b3", "Book Three", ("a1",), ("g1",), ("t2",), 2022),
+)
+USERS = (User("u1", "Ann"), User("u2", "Bob"))
+RATINGS = (
+    Rating("u1", "b1", 5),
+    Rating("u2", "b1", 3),
+    Rating("u1", "b2", 2),
+)
+REVIEWS = (Review("r1", "u1", "b1", "Great book indeed", "2025-01-01T00:00:00"),)
+LOANS = (Loan("l1", "u2", "b3", "2025-01-01", None, "active"),)
+
+CATALOG = Catalog(books=BOOKS, users=USERS, ratings=RATINGS, reviews=REVIEWS, loans=LOANS)
+
+
+def test_catalog_behaves_like_seed_dict():
+    assert CATALOG["books"] == BOOKS
+    assert dict(CATALOG.items())["ratings"] == RATINGS
+    assert len(CATALOG["authors"]) == 0
+
+
+def test_catalog_indexes():
+    assert CATALOG.books_by_id["b2"].title == "Book Two"
+    assert CATALOG.ratings_by_user["u1"] == (RATINGS[0], RATINGS[2])
+    assert CATALOG.ratings_by_book["b1"] == (RATINGS[0], RATINGS[1])
+    assert CATALOG.loans_by_user["u2"] == LOANS
+    assert CATALOG.reviews_by_book["b1"] == REVIEWS
+    # повтор жанра в кортеже не дублирует книгу в индексе
+    assert tuple(b.id for b in CATALOG.books_by_genre["g1"]) == ("b1", "b3")
+    assert tuple(b.id for b in CATALOG.books_by_author["a1"]) == ("b1", "b3")
+    assert tuple(b.id for b in CATALOG.books_by_tag["t1"]) == ("b1", "b2")
+
+
+def test_lookups_match_tuple_scans():
+    for source in (BOOKS, CATALOG):
+        assert book_by_id(source, "b3") == BOOKS[2]
+        assert book_by_id(source, "missing") is None
+        assert genre_books(source, "g1") == (BOOKS[0], BOOKS[2])
+    for source in (RATINGS, CATALOG):
+        assert user_ratings(source, "u2") == (RATINGS[1],)
+        assert has_rating(source, "u1", "b2") is True
+        assert has_rating(source, "u2", "b2") is False
+
+
+def test_core_functions_accept_catalog():
+    assert safe_book(CATALOG, "b1").get_or_else(None).title == "Book One"
+    assert validate_rating(Rating("u1", "b1", 4), CATALOG, CATALOG, CATALOG).is_left()
+    assert validate_rating(Rating("u2", "b3", 4), CATALOG, CATALOG, CATALOG).is_right()
+    assert fn.user_has_active_loan(CATALOG, "u2") is True
+    assert fn.book_has_reviews(CATALOG, "b2") is False
+    assert fn.top_books_by_avg(CATALOG, CATALOG, 3) == fn.top_books_by_avg(RATINGS, BOOKS, 3)
+    assert recommend_for_user("u1", CATALOG, CATALOG) == recommend_for_user("u1", RATINGS, BOOKS)
+
+
+def test_load_seed_returns_catalog():
+    data = load_seed("data/seed.json")
+    assert isinstance(data, Catalog)
+    assert len(data.books_by_id) == len(data["books"])
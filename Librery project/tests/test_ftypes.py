@@ -1,8 +1,8 @@
 import pytest
 from core.ftypes import (
-    Maybe, Just, Nothing, Either, Right, Left,
+    Maybe, Just, Nothing, Either, Right, Left, Validated, Valid, Invalid,
     safe_book, validate_rating, add_rating_pipeline,
-    safe_book_analysis
+    safe_book_analysis, validate_ratings_all, validate_ratings_bulk
 )
 from core.domain import Book, Rating, User
 
@@ -105,4 +105,52 @@ def test_safe_operations_and_pipeline():
     # Пайплайн добавления рейтинга
     new_rating = Rating("1", "2", 5)  # Оценка для другой книги
     pipeline_result = add_rating_pipeline(new_rating, ratings, books, users)
-    assert pipeline_result.is_right() == True
\ No newline at end of file
+    assert pipeline_result.is_right() == True
+
+
+def test_slotted_containers_and_nothing_singleton():
+    """Тест 6: __slots__ и единственный Nothing"""
+    assert Maybe.nothing() is Nothing() is Maybe.from_value(None)
+    for container in (Just(1), Right(1), Left({"e": "x"}), Valid(1), Invalid(("e",))):
+        assert not hasattr(container, "__dict__")
+    assert Left({"value": "bad"})._error == {"value": "bad"}
+
+
+def test_traverse_and_sequence():
+    """Тест 7: traverse / sequence для Maybe и Either"""
+    half = lambda x: Maybe.just(x // 2) if x % 2 == 0 else Maybe.nothing()
+    assert Maybe.traverse([2, 4, 6], half) == Just((1, 2, 3))
+    assert Maybe.traverse([2, 3, 6], half) is Nothing()
+    assert Maybe.sequence([Just(1), Just(2)]) == Just((1, 2))
+
+    calls = []
+    def check(x):
+        calls.append(x)
+        return Either.right(x) if x > 0 else Either.left(f"bad {x}")
+    assert Either.traverse([1, 2], check) == Right((1, 2))
+    assert Either.traverse([1, -1, -2, 3], check) == Left("bad -1")
+    assert calls[-1] == -1  # остановка на первой ошибке
+    assert Either.sequence([Right(1), Left("e"), Left("f")]) == Left("e")
+
+
+def test_validated_accumulates_all_errors():
+    """Тест 8: Validated собирает все ошибки"""
+    check = lambda x: Validated.valid(x) if x > 0 else Validated.invalid(f"bad {x}")
+    assert Validated.traverse([1, 2, 3], check) == Valid((1, 2, 3))
+    assert Validated.traverse([1, -1, 2, -2], check) == Invalid(("bad -1", "bad -2"))
+    assert Valid(1).zip(Valid(2)) == Valid((1, 2))
+    assert Invalid(("a",)).zip(Invalid(("b",))) == Invalid(("a", "b"))
+    assert Valid(1).zip(Invalid(("b",))).to_either() == Left(("b",))
+    assert Left("x").to_validated() == Invalid(("x",)) and Right(1).to_validated() == Valid(1)
+
+    books = (Book("1", "Book 1", (), (), (), 2020),)
+    users = (User("1", "John Doe"),)
+    batch = [Rating("1", "1", 4), Rating("1", "1", 5), Rating("2", "1", 9)]
+    result = validate_ratings_all(batch, books, users, ())
+    assert not result.is_valid()
+    assert [row for row, _ in result.errors] == [1, 2]
+    assert set(result.errors[1][1]) == {"value", "user_id"}
+    bulk = validate_ratings_bulk(batch, books, users, ())
+    assert [e._error for e in bulk if e.is_left()] == [errors for _, errors in result.errors]
+    assert validate_ratings_all(batch[:1], books, users, ()) == Valid((batch[0],))
+
@@ -0,0 +1,58 @@
+from core.catalog import Catalog
+from core.domain import Book, Genre, Tag
+from core.hierarchy import build_hierarchy
+from core import functional as fn
+
+
+GENRES = (
+    Genre("g1", "root", None),
+    Genre("g2", "child", "g1"),
+    Genre("g3", "grandchild", "g2"),
+    Genre("g4", "sibling", "g1"),
+    Genre("g5", "other", None),
+)
+
+BOOKS = (
+    Book("b1", "One", (), ("g3",), ("t2",), 2001),
+    Book("b2", "Two", (), ("g5",), (), 2002),
+    Book("b3", "Three", (), ("g4", "g2"), ("t1",), 2003),
+    Book("b4", "Four", (), ("g1",), (), 2004),
+)
+
+TAGS = (Tag("t1", "parent", None), Tag("t2", "child", "t1"))
+
+
+def test_intervals_and_closures():
+    tree = build_hierarchy(GENRES)
+    assert tree.is_under("g3", "g1") and tree.is_under("g3", "g2") and tree.is_under("g1", "g1")
+    assert not tree.is_under("g1", "g3") and not tree.is_under("g4", "g2")
+    assert set(tree.descendants("g1")) == {"g2", "g3", "g4"}
+    assert tuple(g.id for g in tree.ancestors("g3")) == ("g2", "g1")
+    assert tree.subtree("missing") == ("missing",)
+
+
+def test_cycles_and_orphans_terminate():
+    tree = build_hierarchy((
+        Genre("a", "a", "b"), Genre("b", "b", "a"), Genre("c", "c", "zzz"),
+    ))
+    assert set(tree.order) == {"a", "b", "c"}
+    assert tree.ancestors("c") == ()
+
+
+def test_functional_accepts_tree_and_catalog():
+    tree = build_hierarchy(GENRES)
+    catalog = Catalog(books=BOOKS, genres=GENRES, tags=TAGS)
+    for genres in (GENRES, tree, catalog):
+        assert fn.book_in_genre_recursive(BOOKS[0], genres, "g1") is True
+        assert fn.book_in_genre_recursive(BOOKS[1], genres, "g1") is False
+        assert tuple(g.id for g in fn.genre_ancestors(genres, "g3")) == ("g2", "g1")
+    assert fn.book_has_tag_recursive(BOOKS[0], catalog, "t1") is True
+
+
+def test_books_in_subtree_matches_per_book_filter():
+    catalog = Catalog(books=BOOKS, genres=GENRES, tags=TAGS)
+    for target in ("g1", "g2", "g5", "missing"):
+        expected = tuple(b for b in BOOKS if fn.book_in_genre_recursive(b, GENRES, target))
+        assert fn.books_in_genre_subtree(catalog, catalog, target) == expected
+        assert fn.books_in_genre_subtree(BOOKS, GENRES, target) == expected
+    assert fn.books_in_tag_subtree(catalog, catalog, "t1") == (BOOKS[0], BOOKS[2])
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from core import instrument
+from core.domain import Rating
+from core.ftypes import add_rating_pipeline
+from core.instrument import Registry, instrumented, timed
+from core.transforms import load_seed
+
+
+@pytest.fixture
+def metrics():
+    instrument.REGISTRY.reset()
+    instrument.enable()
+    yield instrument.REGISTRY
+    instrument.disable()
+    instrument.REGISTRY.reset()
+
+
+def test_disabled_records_nothing():
+    registry = Registry()
+    fn = instrumented("f", registry)(lambda x: x + 1)
+    assert not instrument.is_enabled()
+    assert fn(1) == 2
+    with timed("block", registry):
+        pass
+    assert registry.metrics() == []
+
+
+def test_counts_errors_and_histogram(metrics):
+    @instrumented("boom")
+    def boom(fail):
+        if fail:
+            raise ValueError("x")
+        return "ok"
+
+    assert boom(False) == "ok"
+    with pytest.raises(ValueError):
+        boom(True)
+    m = metrics.get("boom")
+    assert m.count == 2 and m.errors == 1 and sum(m.buckets) == 2
+    assert boom.__name__ == "boom"
+
+
+def test_core_hot_paths_are_instrumented(metrics):
+    data = load_seed("data/seed.json")
+    add_rating_pipeline(Rating("u1", data.books[0].id, 5), data, data, data)
+    names = set(instrument.snapshot())
+    assert {"core.transforms.load_seed", "core.ftypes.add_rating_pipeline"} <= names
+
+
+def test_exports(metrics):
+    with timed("block"):
+        sum(range(1000))
+    payload = json.loads(instrument.to_json())
+    assert payload["enabled"] and payload["metrics"]["block"]["count"] == 1
+    text = instrument.to_prometheus()
+    assert '# TYPE library_call_duration_seconds histogram' in text
+    assert 'library_call_duration_seconds_bucket{fn="block",le="+Inf"} 1' in text
+    assert 'library_call_duration_seconds_count{fn="block"} 1' in text
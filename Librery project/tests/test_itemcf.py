@@ -0,0 +1,113 @@
+import math
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from core.domain import Rating
+from core.itemcf import ItemCF, item_cf, recommend_for_user_cf
+from core.transforms import load_seed
+
+
+def _random_ratings(seed=5, users=40, books=30, n=400):
+    rnd = random.Random(seed)
+    pairs = {(f"u{rnd.randrange(users)}", f"b{rnd.randrange(books)}") for _ in range(n)}
+    return tuple(Rating(u, b, rnd.randint(1, 5)) for u, b in sorted(pairs))
+
+
+def _brute_similarity(ratings, a, b, adjusted):
+    by_user = {}
+    for r in ratings:
+        by_user.setdefault(r.user_id, {})[r.book_id] = r.value
+    mean = {u: sum(row.values()) / len(row) for u, row in by_user.items()}
+    val = lambda u, x: by_user[u][x] - (mean[u] if adjusted else 0)
+    dot = sum(val(u, a) * val(u, b) for u, row in by_user.items() if a in row and b in row)
+    na = math.sqrt(sum(val(u, a) ** 2 for u, row in by_user.items() if a in row))
+    nb = math.sqrt(sum(val(u, b) ** 2 for u, row in by_user.items() if b in row))
+    return dot / (na * nb) if na and nb else 0.0
+
+
+@pytest.mark.parametrize("similarity", ["cosine", "adjusted_cosine"])
+def test_neighbours_match_brute_force(similarity):
+    ratings = _random_ratings()
+    model = ItemCF(ratings, k=5, similarity=similarity)
+    books = sorted({r.book_id for r in ratings})
+    for a in books:
+        expected = sorted(
+            ((b, _brute_similarity(ratings, a, b, similarity == "adjusted_cosine")) for b in books if b != a),
+            key=lambda x: -x[1],
+        )
+        expected = [(b, s) for b, s in expected if s > 1e-9][:5]
+        got = model.neighbours_of(a)
+        assert [s for _, s in got] == pytest.approx([s for _, s in expected], abs=1e-5)
+
+
+def test_parallel_build_matches_serial():
+    ratings = _random_ratings(seed=6)
+    serial = ItemCF(ratings, k=8)
+    parallel = ItemCF(ratings, k=8, workers=2)
+    assert (serial.neighbours == parallel.neighbours).all()
+    assert np.allclose(serial.sims, parallel.sims)
+
+
+def test_refresh_recomputes_touched_rows_like_rebuild():
+    ratings = _random_ratings(seed=7)
+    model = ItemCF(ratings, k=6)
+    new = (Rating("u3", "b2", 5), Rating("u99", "b77", 4), Rating("u99", "b2", 5))
+    for r in new:
+        model.add(r)
+    touched = {"b2", "b77"} | {r.book_id for r in ratings if r.user_id in ("u3", "u99")}
+    assert model.refresh() == len(touched)
+    fresh = ItemCF(ratings + new, k=6)
+    for b in touched:
+        got, expected = model.neighbours_of(b), fresh.neighbours_of(b)
+        assert [x for x, _ in got] == [x for x, _ in expected]
+        assert [s for _, s in got] == pytest.approx([s for _, s in expected])
+    assert model.refresh() == 0
+
+
+def test_recommend_excludes_rated_books_and_uses_neighbours():
+    ratings = (
+        Rating("u1", "b1", 5), Rating("u1", "b2", 5),
+        Rating("u2", "b1", 5), Rating("u2", "b2", 5), Rating("u2", "b3", 1),
+        Rating("u3", "b1", 5), Rating("u3", "b3", 4),
+        Rating("u4", "b1", 4),
+    )
+    model = ItemCF(ratings, k=5, similarity="cosine")
+    recs = model.recommend("u4")
+    assert recs[0] == "b2" and "b1" not in recs
+    assert model.recommend("nobody") == ()
+
+
+def test_low_ratings_push_neighbours_down():
+    ratings = (
+        Rating("u1", "b1", 5), Rating("u1", "b2", 5),
+        Rating("u2", "b3", 5), Rating("u2", "b4", 5),
+        Rating("u3", "b1", 5), Rating("u3", "b4", 2),
+        Rating("u4", "b1", 5), Rating("u4", "b3", 1),
+    )
+    model = ItemCF(ratings, k=5, similarity="cosine")
+    # b4 — сосед понравившейся b1, но гораздо ближе к b3 с оценкой 1
+    assert "b1" in dict(model.neighbours_of("b4"))
+    assert model.recommend("u4") == ("b2",)
+
+
+def test_seed_recommendations():
+    data =load_seed("data/seed.json")
+    user_id = next(iter(data.ratings_by_user))
+    recs = recommend_for_user_cf(user_id, data, data)
+    rated = {r.book_id for r in data.ratings_by_user[user_id]}
+    assert len(recs) <= 10 and not rated & set(recs)
+    assert recommend_for_user_cf(user_id, data, data) == recs
+    assert item_cf(data) is item_cf(data)
+    # модель берётся из каталога с оценками, каким бы ни был источник книг
+    assert recommend_for_user_cf(user_id, data) == recs
+
+
+def test_plain_ratings_need_an_explicit_model():
+    ratings = _random_ratings(seed=8)
+    with pytest.raises(TypeError):
+        recommend_for_user_cf("u1", ratings)
+    model = ItemCF(ratings)
+    assert recommend_for_user_cf("u1", ratings, model=model) == model.recommend("u1")
@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from core import functional as fn
+from core.domain import Book, Rating, User
+from core.ftypes import add_rating_pipeline
+from core.leaderboard import Leaderboard, _SkipList
+from core.synthetic import generate_catalog
+
+
+def test_skip_list_rank_and_order_under_churn():
+    rnd = random.Random(1)
+    ref = sorted({(rnd.random(), i) for i in range(500)})
+    sl = _SkipList.from_sorted(list(ref))
+    for step in range(1_000):
+        if ref and rnd.random() < 0.5:
+            key = ref.pop(rnd.randrange(len(ref)))
+            sl.remove(key)
+        else:
+            key = (rnd.random(), 1_000 + step)
+            ref.append(key)
+            ref.sort()
+            sl.insert(key)
+    assert len(sl) == len(ref) and list(sl.iter_from(0)) == ref
+    assert [sl.rank(k) for k in ref] == list(range(len(ref)))
+    assert list(sl.iter_from(100)) == ref[100:] and list(sl.iter_from(len(ref))) == []
+    with pytest.raises(KeyError):
+        sl.remove((2.0, -1))
+
+
+def test_matches_top_books_by_avg_after_updates():
+    catalog = generate_catalog(5_000, seed=2)
+    board = Leaderboard(catalog, catalog)
+    assert board.top(25) == fn.top_books_by_avg(catalog, catalog, 25)
+
+    rnd = random.Random(0)
+    users, books = [u.id for u in catalog.users], [b.id for b in catalog.books]
+    stats = catalog.rating_stats
+    for _ in range(300):
+        rating = Rating(rnd.choice(users), rnd.choice(books), rnd.randint(1, 5))
+        board.add(rating)
+        stats = stats.add(rating)
+    expected = fn.top_books_by_avg(stats, catalog, 40)
+    assert board.top(40) == expected
+    assert board.top(10, offset=30) == expected[30:40]
+    assert [board.rank(book_id) for book_id, _ in expected] == list(range(1, 41))
+
+
+def test_bayesian_score_and_min_count():
+    books = tuple(Book(f"b{i}", f"B{i}", (), (), (), 2000) for i in range(3))
+    ratings = (Rating("u1", "b0", 5),) + tuple(Rating(f"u{i}", "b1", 5 if i % 5 else 4) for i in range(50))
+    plain = Leaderboard(books, ratings)
+    assert plain.rank("b0") == 1 and plain.rank("b2") == 3
+
+    board = Leaderboard(books, ratings, min_count=1, prior_weight=10, prior_mean=3.0)
+    assert board.rank("b1") == 1 and board.rank("b0") == 2
+    assert board.score("b0") == pytest.approx((10 * 3 + 5) / 11)
+    assert "b2" not in board and board.rank("b2") is None and len(board) == 2
+    assert board.add(Rating("u9", "b2", 1)) == 3 and len(board) == 3
+
+
+def test_pipeline_updates_leaderboard_only_on_success():
+    books = (Book("b1", "One", (), (), (), 2000), Book("b2", "Two", (), (), (), 2001))
+    users = (User("u1", "Ann"), User("u2", "Bob"))
+    ratings = (Rating("u1", "b1", 3),)
+    board = Leaderboard(books, ratings)
+    assert board.top(1) == (("b1", 3.0),)
+
+    result = add_rating_pipeline(Rating("u2", "b2", 5), ratings, books, users, leaderboard=board)
+    assert result.is_right() and board.top(2) == (("b2", 5.0), ("b1", 3.0))
+    failed = add_rating_pipeline(Rating("u1", "b1", 5), ratings, books, users, leaderboard=board)
+    assert failed.is_left() and board.stats("b1").count == 1
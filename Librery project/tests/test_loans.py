@@ -0,0 +1,82 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from core import functional as fn
+from core.domain import Loan
+from core.loans import LoanEngine
+from core.transforms import load_seed
+
+
+LOANS = (
+    Loan("l1", "u1", "b1", "2025-01-01", None, "active"),
+    Loan("l2", "u1", "b2", "2025-01-02", "2025-01-10", "returned"),
+    Loan("l3", "u2", "b3", "2025-01-10", None, "active"),
+    Loan("l4", "u3", "b4", "2024-12-01", "2024-12-15", "overdue"),
+)
+
+
+def test_indexes_and_availability():
+    engine = LoanEngine(LOANS)
+    assert engine.is_lent_out("b1") and engine.is_lent_out("b4")
+    assert not engine.is_lent_out("b2") and not engine.is_lent_out("b9")
+    assert engine.user_loans("u1") == LOANS[:2]
+    assert engine.book_loans("b3") == (LOANS[2],)
+    assert engine.to_tuple() == LOANS
+    with pytest.raises(ValueError):
+        engine.add(LOANS[0])
+
+
+def test_sweep_returns_only_newly_overdue_loans():
+    engine = LoanEngine(LOANS, loan_days=14)
+    assert engine.sweep("2025-01-15") == ()          # срок l1 — 2025-01-15
+    swept = engine.sweep("2025-01-16")
+    assert [l.id for l in swept] == ["l1"]
+    assert swept[0].status == "overdue" and swept[0].end == "2025-01-15"
+    assert engine.sweep("2025-01-16") == ()          # повторный проход ничего не находит
+    engine.return_loan("l3", "2025-01-20")
+    assert engine.sweep("2025-03-01") == ()          # возвращённая выдача не просрочена
+    assert not engine.is_lent_out("b3") and engine.is_lent_out("b1")
+
+
+def test_update_keeps_old_snapshots():
+    engine = LoanEngine(LOANS)
+    before = engine.loans
+    engine.return_loan("l1", date(2025, 1, 5))
+    assert before["l1"].status == "active"
+    assert engine.get("l1") == Loan("l1", "u1", "b1", "2025-01-01", "2025-01-05", "returned")
+    assert not engine.is_lent_out("b1")
+
+
+def test_sweep_matches_full_scan():
+    rnd = random.Random(3)
+    day0 = date(2025, 1, 1)
+    engine = LoanEngine(loan_days=10)
+    for i in range(500):
+        engine.lend(f"l{i}", f"u{i % 40}", f"b{i}", day0 + timedelta(days=rnd.randrange(60)))
+        if rnd.random() < 0.3:
+            engine.return_loan(f"l{i}", day0 + timedelta(days=70))
+    now = day0 + timedelta(days=35)
+    expected = {
+        l.id for l in engine.to_tuple()
+        if l.status == "active" and engine.due_date(l) < now
+    }
+    assert {l.id for l in engine.sweep(now)} == expected
+
+
+def test_functional_predicates_use_engine():
+    engine = LoanEngine(LOANS)
+    for loans in (LOANS, engine):
+        assert fn.user_has_active_loan(loans, "u1")
+        assert not fn.user_has_active_loan(loans, "u3")
+        assert fn.book_is_lent_out(loans, "b4")
+        assert not fn.book_is_lent_out(loans, "b2")
+
+
+def test_seed_loans_are_indexed():
+    data = load_seed("data/seed.json")
+    engine = LoanEngine(data["loans"])
+    assert len(engine) == len(data["loans"])
+    for loan in data["loans"]:
+        assert fn.book_is_lent_out(engine, loan.book_id) == fn.book_is_lent_out(data, loan.book_id)
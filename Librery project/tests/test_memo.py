@@ -1,6 +1,6 @@
 import pytest
 import time
-from core.memo import recommend_for_user, measure_recommendation_performance
+from core.memo import RecommendationCache, recommend_for_user, measure_recommendation_performance
 from core.domain import Book, Rating, User
 from core.transforms import load_seed
 
@@ -206,4 +206,134 @@ def test_recommend_for_user_parametrized(user_id, expected_length):
         )
     
     result = recommend_for_user(user_id, ratings, books)
-    assert len(result) <= expected_length
\ No newline at end of file
+    assert len(result) <= expected_length
+
+def test_recommendation_cache_hit_miss_stats():
+    """Кэш считает попадания и промахи"""
+    from core.memo import RecommendationCache
+
+    books = (
+        Book("1", "Book 1", ("author1",), ("fiction",), ("adventure",), 2020),
+        Book("2", "Book 2", ("author1",), ("fiction",), ("science",), 2021),
+    )
+    ratings = (Rating("user1", "1", 5),)
+    cache = RecommendationCache()
+
+    first = recommend_for_user("user1", ratings, books, cache)
+    second = recommend_for_user("user1", ratings, books, cache)
+    assert first == second == ("2",)
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["size"] == 1
+
+
+def test_recommendation_cache_invalidates_only_rating_author():
+    """Новая оценка сбрасывает только запись её автора"""
+    from core.memo import RecommendationCache
+    from core.ftypes import add_rating_pipeline
+    from core.domain import User
+
+    books = (
+        Book("1", "Book 1", ("author1",), ("fiction",), ("adventure",), 2020),
+        Book("2", "Book 2", ("author2",), ("science",), ("science",), 2021),
+        Book("3", "Book 3", ("author2",), ("science",), ("magic",), 2022),
+    )
+    users = (User("user1", "A"), User("user2", "B"))
+    ratings = (Rating("user1", "1", 5), Rating("user2", "1", 5), Rating("user2", "2", 4))
+    cache = RecommendationCache()
+
+    recommend_for_user("user1", ratings, books, cache)
+    recommend_for_user("user2", ratings, books, cache)
+
+    # книга 2 не входит в рекомендации user2 — его запись остаётся
+    result = add_rating_pipeline(Rating("user1", "2", 5), ratings, books, users, cache=cache)
+    new_ratings = result.get_or_else(ratings)
+    assert cache.version == 1
+
+    assert recommend_for_user("user2", new_ratings, books, cache) == ("3",)
+    assert recommend_for_user("user1", new_ratings, books, cache) == ("3",)
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["invalidations"] == 1
+
+
+def test_recommendation_cache_evicts_least_recently_used():
+    from core.memo import RecommendationCache
+
+    cache = RecommendationCache(maxsize=2)
+    cache.put("u1", ("a",))
+    cache.put("u2", ("b",))
+    cache.get("u1")
+    cache.put("u3", ("c",))
+    assert cache.get("u2") is None
+    assert cache.get("u1") == ("a",)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_recommendation_cache_dependent_entries():
+    from core.memo import RecommendationCache
+
+    cache = RecommendationCache()
+    cache.put("u1", ("a",), depends_on=("b1",))
+    cache.put("u2", ("b",))
+    cache.record_rating(Rating("u9", "b1", 3))
+    assert cache.get("u1") is None
+    assert cache.get("u2") == ("b",)
+
+
+def test_recommended_book_rating_invalidates_entry():
+    """Оценка книги из чужих рекомендаций сбрасывает эту запись (depends_on)"""
+    from core.ftypes import add_rating_pipeline
+
+    books = (
+        Book("1", "Book 1", ("author1",), ("fiction",), ("adventure",), 2020),
+        Book("2", "Book 2", ("author2",), ("science",), ("science",), 2021),
+    )
+    users = (User("user1", "A"), User("user2", "B"))
+    ratings = (Rating("user1", "1", 5), Rating("user2", "1", 5))
+    cache = RecommendationCache()
+
+    assert recommend_for_user("user2", ratings, books, cache) == ("2",)
+    add_rating_pipeline(Rating("user1", "2", 1), ratings, books, users, cache=cache)
+    assert cache.get("user2") is None
+
+
+def test_default_cache_is_per_books_source_and_checks_user_ratings():
+    """Кэш по умолчанию общий для источника книг, но запись сверяется с оценками пользователя"""
+    from core.catalog import Catalog
+    from core.ftypes import add_rating_pipeline
+    from core.memo import cache_for
+
+    books = (
+        Book("1", "Book 1", ("author1",), ("fiction",), ("adventure",), 2020),
+        Book("2", "Book 2", ("author2",), ("science",), ("science",), 2021),
+        Book("3", "Book 3", ("author2",), ("science",), ("magic",), 2022),
+    )
+    users = (User("u", "A"),)
+    catalog = Catalog(books=books, users=users, ratings=(Rating("u", "1", 5),))
+    cache = cache_for(catalog)
+    assert cache_for(catalog) is cache and cache_for(books) is cache_for(books)
+
+    assert recommend_for_user("u", catalog, catalog) == ("2", "3")
+    assert recommend_for_user("u", catalog, catalog) == ("2", "3")
+    # другой источник оценок с теми же книгами не получает чужой результат
+    assert recommend_for_user("u", (Rating("u", "2", 5),), catalog) == ("3", "1")
+    # конвейер по умолчанию общий кэш не трогает: новые оценки ещё никуда не сохранены
+    new_ratings = add_rating_pipeline(Rating("u", "3", 5), catalog, catalog, catalog).get_or_else(None)
+    assert cache.version == 0
+    assert recommend_for_user("u", new_ratings, catalog) == ("2",)
+    assert cache.stats()["hits"] == 1
+
+
+def test_default_caches_do_not_keep_catalogs_alive():
+    """Реестр кэшей держит каталоги по слабым ссылкам"""
+    import gc
+    import weakref
+    from core.catalog import Catalog
+    from core.memo import cache_for
+
+    catalog = Catalog(books=(Book("1", "Book 1", ("a",), ("g",), ("t",), 2020),),
+                      ratings=(Rating("user1", "1", 5),))
+    recommend_for_user("user1", catalog, catalog)
+    ref = weakref.ref(catalog)
+    del catalog
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,42 @@
+import pytest
+
+from core.pager import OptionIndex, book_options, paginate
+from core.synthetic import generate_catalog
+
+
+def test_paginate_clamps_and_slices():
+    page = paginate(range(45), page=3, size=20)
+    assert page.items == tuple(range(40, 45))
+    assert (page.page, page.pages, page.total, page.start) == (3, 3, 45, 41)
+    assert not page.has_next and page.has_prev
+    assert paginate(range(45), page=99, size=20).page == 3
+    assert paginate([], page=0).items == () and paginate([]).pages == 1
+    with pytest.raises(ValueError):
+        paginate([1], size=0)
+
+
+def test_option_search_by_id_and_title_prefixes():
+    index = OptionIndex([
+        ("b1", "b1 - Silent River"), ("b10", "b10 - River Song"),
+        ("b2", "b2 - Iron Garden"), ("u1", "u1 - Ёжик в тумане"),
+    ])
+    assert index.search("b1") == ["b1", "b10"]
+    assert set(index.search("riv")) == {"b1", "b10"}
+    assert index.search("river so") == ["b10"]
+    assert index.search("ежик") == ["u1"]
+    assert index.search("") == ["b1", "b10", "b2", "u1"]
+    assert index.search("zzz") == []
+    assert index.search("riv", limit=1) and len(index.search("riv", limit=1)) == 1
+    assert index.label("b2") == "b2 - Iron Garden" and index.label("nope") == "nope"
+
+
+def test_option_index_limits_payload_on_large_catalog():
+    catalog = generate_catalog(20_000, seed=1)
+    index = book_options(catalog)
+    assert len(index) == len(catalog.books)
+    assert len(index.search("", limit=50)) == 50
+    hits = index.search("river", limit=50)
+    assert 0 < len(hits) <= 50
+    assert all("river" in catalog.books_by_id[h].title.casefold() for h in hits)
+    assert index.search(catalog.books[7].id)[0] == catalog.books[7].id
+    assert index.page(2, 25).items == tuple(b.id for b in catalog.books[25:50])
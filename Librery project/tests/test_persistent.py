@@ -0,0 +1,149 @@
+import random
+
+import pytest
+
+from core.domain import Book, Loan, Rating, User
+from core.ftypes import add_rating_pipeline, add_ratings_bulk
+from core.catalog import Catalog, rating_aggregates
+from core.persistent import PersistentMap, PersistentVector, SideTable
+from core.transforms import add_rating, update_loan
+
+
+def test_vector_matches_list_model():
+    rnd = random.Random(1)
+    vec, model = PersistentVector(), []
+    versions = []
+    for i in range(3000):
+        vec = vec.append(i)
+        model.append(i)
+        if rnd.random() < 0.3:
+            j = rnd.randrange(len(model))
+            vec = vec.set(j, -i)
+            model[j] = -i
+        if i % 500 == 0:
+            versions.append((vec, list(model)))
+    assert list(vec) == model
+    assert [vec[i] for i in range(len(model))] == model
+    assert vec[-1] == model[-1] and vec[10:40:3] == tuple(model[10:40:3])
+    # старые версии не меняются
+    for old, snapshot in versions:
+        assert list(old) == snapshot
+
+
+def test_bulk_constructor_builds_the_same_trie_as_appends():
+    for n in (0, 31, 32, 33, 1056, 1057, 32 * 32 * 32 + 40):
+        built, appended = PersistentVector(range(n)), PersistentVector()
+        for i in range(n):
+            appended = appended.append(i)
+        assert (built._shift, built._root, built._tail) == (appended._shift, appended._root, appended._tail)
+
+
+def test_side_table_is_keyed_by_identity_and_drops_entries():
+    import gc
+
+    table = SideTable()
+    a, b = PersistentVector((1, 2)), PersistentVector((1, 2))
+    table.set(a, "a")
+    assert table.get(a) == "a" and table.get(b) is None
+    del a
+    gc.collect()
+    assert len(table) == 0
+
+
+def test_vector_behaves_like_tuple():
+    vec = PersistentVector("abc")
+    assert vec == ("a", "b", "c") and ("a", "b", "c") == vec
+    assert vec + ("d",) == tuple("abcd") and len(vec) == 3
+    assert "b" in vec and vec.index("c") == 2
+    with pytest.raises(IndexError):
+        vec[3]
+
+
+class _Clash:
+    """Key with a fixed hash to force HAMT collisions"""
+    def __init__(self, name):
+        self.name = name
+
+    def __hash__(self):
+        return 42
+
+    def __eq__(self, other):
+        return isinstance(other, _Clash) and other.name == self.name
+
+
+def test_map_matches_dict_model():
+    rnd = random.Random(2)
+    m, model = PersistentMap(), {}
+    keys = [f"k{i}" for i in range(400)] + [_Clash(i) for i in range(5)] + list(range(100))
+    for _ in range(5000):
+        k = rnd.choice(keys)
+        if rnd.random() < 0.3:
+            m, _ = m.delete(k), model.pop(k, None)
+        else:
+            v = rnd.random()
+            m, model[k] = m.set(k, v), v
+    assert len(m) == len(model)
+    assert dict(m.items()) == model
+    assert all(m[k] == v for k, v in model.items())
+    assert all((k in m) == (k in model) for k in keys)
+
+
+def test_map_set_keeps_old_version():
+    m1 = PersistentMap({"a": 1, "b": 2})
+    m2 = m1.set("a", 10).delete("b")
+    assert dict(m1.items()) == {"a": 1, "b": 2}
+    assert dict(m2.items()) == {"a": 10}
+    assert m1.delete("zzz") is m1
+
+
+def test_add_rating_appends_to_persistent_vector():
+    rs = PersistentVector(Rating("u1", f"b{i}", 3) for i in range(100))
+    new_rs = add_rating(rs, Rating("u2", "b1", 4))
+    assert isinstance(new_rs, PersistentVector)
+    assert len(rs) == 100 and len(new_rs) == 101 and new_rs[-1] == Rating("u2", "b1", 4)
+
+
+def test_update_loan_persistent_variants_reuse_loans():
+    loans = tuple(Loan(f"l{i}", "u1", f"b{i}", "2025-01-01", None, "active") for i in range(50))
+    for source in (PersistentVector(loans), PersistentMap({l.id: l for l in loans})):
+        updated = update_loan(source, "l7", "returned", "2025-01-05")
+        assert updated["l7" if isinstance(source, PersistentMap) else 7].status == "returned"
+        assert source["l7" if isinstance(source, PersistentMap) else 7].status == "active"
+    new_loans = update_loan(loans, "l7", "returned", "2025-01-05")
+    assert all(a is b for a, b in zip(new_loans, loans) if a.id != "l7")
+
+
+def test_update_loan_on_vector_reuses_the_position_map():
+    from core import transforms
+
+    loans = PersistentVector(Loan(f"l{i}", "u1", f"b{i}", "2025-01-01", None, "active") for i in range(100))
+    first = update_loan(loans, "l3", "returned", "2025-01-05")
+    positions = transforms._LOAN_POSITIONS.get(first)
+    second = update_loan(first, "l90", "returned", "2025-01-06")
+    assert transforms._LOAN_POSITIONS.get(second) is positions  # без повторного прохода по выдачам
+    assert [l.id for l in second if l.status == "returned"] == ["l3", "l90"]
+    assert update_loan(second, "missing", "returned", None) is second
+
+
+def test_pipelines_accept_persistent_ratings():
+    books = (Book("b1", "B1", (), (), (), 2020), Book("b2", "B2", (), (), (), 2021))
+    users = (User("u1", "Ann"),)
+    rs = PersistentVector((Rating("u1", "b1", 4),))
+    assert add_rating_pipeline(Rating("u1", "b1", 5), rs, books, users).is_left()
+    result = add_rating_pipeline(Rating("u1", "b2", 5), rs, books, users)
+    assert isinstance(result.get_or_else(None), PersistentVector)
+    _, bulk = add_ratings_bulk((Rating("u1", "b2", 2),), rs, books, users)
+    assert bulk == (Rating("u1", "b1", 4), Rating("u1", "b2", 2))
+
+
+def test_pipelines_on_catalog_return_vectors_with_maintained_aggregates():
+    books = (Book("b1", "B1", (), (), (), 2020), Book("b2", "B2", (), (), (), 2021))
+    users = (User("u1", "Ann"), User("u2", "Bob"))
+    catalog = Catalog(books=books, users=users, ratings=(Rating("u1", "b1", 4),))
+    first = add_rating_pipeline(Rating("u2", "b1", 2), catalog, catalog, catalog).get_or_else(None)
+    second = add_rating_pipeline(Rating("u2", "b2", 5), first, catalog, catalog).get_or_else(None)
+    assert isinstance(second, PersistentVector) and len(second) == 3
+    assert rating_aggregates(first).mean("b1") == 3.0 and rating_aggregates(second).get("b2").count == 1
+    assert catalog.rating_stats.get("b1").count == 1 and len(catalog.ratings) == 1
+    _, bulk = add_ratings_bulk((Rating("u1", "b2", 1),), second, catalog, catalog)
+    assert rating_aggregates(bulk).mean("b2") == 3.0
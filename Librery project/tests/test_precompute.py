@@ -0,0 +1,40 @@
+from core.memo import recommend_uncached
+from core.precompute import (
+    RecommendationTable, benchmark_precompute, precompute_recommendations, save_recommendation_table,
+)
+from core.transforms import load_seed, save_snapshot
+
+
+def _snapshot(tmp_path):
+    data = load_seed("data/seed.json")
+    path = str(tmp_path / "seed.snapshot")
+    save_snapshot(data, path)
+    return data, path
+
+
+def test_pool_matches_serial_recommendations(tmp_path):
+    data, path = _snapshot(tmp_path)
+    serial = precompute_recommendations(path, workers=1)
+    pooled = precompute_recommendations(path, workers=2, shard_size=3)
+    assert serial.recommendations == pooled.recommendations
+    assert serial.n_users == len({u.id for u in data.users})
+    for uid, recs in serial.recommendations.items():
+        assert recs == recommend_uncached(uid, data, data)
+
+
+def test_table_roundtrip(tmp_path):
+    _, path = _snapshot(tmp_path)
+    result = precompute_recommendations(path, ["u1", "u2", "nobody"], workers=1)
+    table_path = str(tmp_path / "recs.json")
+    assert save_recommendation_table(result, table_path, path) > 0
+    table = RecommendationTable(table_path)
+    assert len(table) == 3 and table.meta["snapshot"] == path
+    assert table.get("u1") == result.recommendations["u1"]
+    assert table.get("nobody") == () and table.get("missing") is None
+
+
+def test_benchmark_reports_each_worker_count(tmp_path):
+    _, path = _snapshot(tmp_path)
+    rows = benchmark_precompute(path, workers=(1, 2), user_ids=["u1", "u2", "u3", "u4"])
+    assert [r["workers"] for r in rows] == [1, 2]
+    assert rows[0]["speedup"] == 1.0 and all(r["users"] == 4 for r in rows)
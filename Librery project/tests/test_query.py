@@ -0,0 +1,70 @@
+import pytest
+
+from core import functional as fn
+from core.domain import Book, Rating
+from core.query import Query
+from core.synthetic import generate_catalog
+
+CATALOG = generate_catalog(5_000, seed=3)
+ROOT = next(g.id for g in CATALOG.genres if g.parent_id is None)
+
+
+def test_matches_eager_helpers():
+    stats = CATALOG.rating_stats
+    eager = [b for b in fn.books_in_genre_subtree(CATALOG, CATALOG, ROOT) if stats.mean(b.id) >= 4]
+    top = sorted(((b.id, stats.mean(b.id)) for b in eager), key=lambda x: x[1], reverse=True)[:20]
+
+    q = Query(CATALOG).genre(ROOT, recursive=True).avg_ge(4)
+    assert q.books() == tuple(eager)
+    assert q.order_by("avg").limit(20).scored() == tuple(top)
+    assert Query(CATALOG).order_by("avg").limit(10).scored() == fn.top_books_by_avg(CATALOG, CATALOG, 10)
+
+
+def test_plan_uses_index_bitmaps_and_heap():
+    tag = max(CATALOG.books_by_tag, key=lambda t: len(CATALOG.books_by_tag[t]))
+    plan = Query(CATALOG).tag(tag).avg_ge(3).order_by("avg").limit(5).explain()
+    assert plan[0] == f"scan index tag={tag} (~{len(CATALOG.books_by_tag[tag])} books)"
+    assert plan[1:] == ("fused filter: avg_ge=3", "top-k heap: avg desc, k=5")
+
+    # несколько фасетов — пересечение битовых индексов вместо проверок по книгам
+    q = Query(CATALOG).genre(ROOT, recursive=True).tag(tag).year(1950, 1990).avg_ge(3)
+    assert q.explain()[0] == f"bitmap AND genre={ROOT}/** & tag={tag} & year=(1950, 1990)"
+    tree = CATALOG.genre_tree
+    assert q.books() == tuple(
+        b for b in CATALOG.books
+        if any(tree.is_under(g, ROOT) for g in b.genres) and tag in b.tags
+        and 1950 <= b.year <= 1990 and CATALOG.rating_stats.mean(b.id) >= 3
+    )
+    assert Query(CATALOG.books).genre(ROOT).explain()[0].startswith("scan all books")
+
+
+def test_each_book_touched_once_and_limit_exits_early():
+    seen = []
+    q = Query(CATALOG).where(lambda b: seen.append(b.id) or True).avg_ge(0).order_by("year").limit(7)
+    assert len(q.books()) == 7
+    assert len(seen) == len(set(seen)) == len(CATALOG.books)
+
+    seen.clear()
+    assert len(Query(CATALOG).where(lambda b: seen.append(b.id) or True).limit(3).books()) == 3
+    assert len(seen) == 3
+
+
+def test_tuple_sources_and_validation():
+    books = (
+        Book("b1", "A", ("a1",), ("g1",), (), 2001),
+        Book("b2", "B", ("a2",), ("g1",), (), 1999),
+        Book("b3", "C", ("a1",), ("g2",), (), 2010),
+    )
+    ratings = (Rating("u1", "b1", 5), Rating("u1", "b2", 2), Rating("u2", "b3", 4))
+    q = Query(books, ratings)
+    assert q.genre("g1").ids() == ("b1", "b2")
+    assert q.author("a1").year(lo=2005).ids() == ("b3",)
+    assert q.order_by("avg").scored() == (("b1", 5.0), ("b3", 4.0), ("b2", 2.0))
+    assert q.order_by("title", desc=False).limit(2).ids() == ("b1", "b2")
+    assert q.min_ratings(1).avg_ge(4.5).count() == 1
+    with pytest.raises(ValueError):
+        q.order_by("pages")
+    with pytest.raises(ValueError):
+        q.genre("g1", recursive=True).books()
+    with pytest.raises(ValueError):
+        q.scored()
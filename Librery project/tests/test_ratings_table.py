@@ -0,0 +1,112 @@
+from pathlib import Path
+
+from core.domain import Book, Rating, User
+from core.ratings_table import RatingsTable
+from core.ftypes import validate_rating, add_rating_pipeline
+from core.memo import recommend_for_user
+from core.snapshot import Snapshot
+from core.transforms import avg_rating_for_book, add_rating, load_seed, save_snapshot
+
+
+RATINGS = (
+    Rating("u1", "b1", 5),
+    Rating("u2", "b1", 3),
+    Rating("u1", "b2", 2),
+)
+
+
+def test_table_is_a_sequence_of_rating_views():
+    table = RatingsTable(RATINGS)
+    assert len(table) == 3
+    assert tuple(table) == RATINGS
+    assert table[1] == RATINGS[1] and table[-1] == RATINGS[2]
+    assert table[0:2] == RATINGS[0:2]
+    assert Rating("u2", "b1", 3) in table
+    assert table.nbytes() == 3 * 9
+
+
+def test_table_lookups():
+    table = RatingsTable(RATINGS)
+    assert table.for_user("u1") == (RATINGS[0], RATINGS[2])
+    assert table.for_book("b1") == (RATINGS[0], RATINGS[1])
+    assert table.for_user("nobody") == ()
+    assert table.has("u2", "b1") is True
+    assert table.has("u2", "b2") is False
+
+
+def test_append_keeps_original_unchanged():
+    table = RatingsTable(RATINGS)
+    bigger = add_rating(table, Rating("u3", "b3", 4))
+    assert isinstance(bigger, RatingsTable)
+    assert len(table) == 3 and len(bigger) == 4
+    assert table.for_user("u3") == () and not table.has("u3", "b3")
+    assert bigger.for_user("u3") == (Rating("u3", "b3", 4),)
+
+
+def test_add_does_not_grow_original_id_tables():
+    table = RatingsTable(RATINGS)
+    bigger = table + (Rating("u3", "b3", 4), Rating("u1", "b1", 1))
+    assert (len(table.user_ids), len(table.book_ids)) == (2, 2)
+    assert "u3" not in table.grouped("user") and table.for_book("b3") == ()
+    assert table.aggregates().get("b3").count == 0 and tuple(table) == RATINGS
+    assert (len(bigger.user_ids), len(bigger.book_ids)) == (3, 3)
+    assert bigger.has("u3", "b3") and bigger[-1] == Rating("u1", "b1", 1)
+
+
+def test_append_to_newest_table_shares_columns():
+    table = RatingsTable(RATINGS)
+    bigger = table + (Rating("u3", "b3", 4),)
+    assert bigger.values is table.values  # дописано на месте, без копии колонок
+    # ветка от старой таблицы копирует свой префикс и не видит чужих строк и id
+    branch = table + (Rating("u3", "b1", 2),)
+    assert branch.values is not table.values
+    assert tuple(branch) == RATINGS + (Rating("u3", "b1", 2),)
+    assert branch.for_book("b3") == () and tuple(bigger) == RATINGS + (Rating("u3", "b3", 4),)
+    assert len(table) == 3 and table.nbytes() == 3 * 9
+
+
+def test_groups_are_row_views():
+    import pickle
+
+    table = RatingsTable(RATINGS) + (Rating("u3", "b2", 1),)
+    by_user = table.grouped("user")
+    assert dict(by_user) == {"u1": (RATINGS[0], RATINGS[2]), "u2": (RATINGS[1],), "u3": (Rating("u3", "b2", 1),)}
+    assert by_user["u1"] is not by_user["u1"]  # Rating создаются при каждом обращении
+    assert list(table.grouped("book")) == ["b1", "b2"] and "nobody" not in by_user
+    copy = pickle.loads(pickle.dumps(table))
+    assert tuple(copy) == tuple(table) and copy.has("u3", "b2")
+
+
+def test_out_of_range_value_keeps_columns_aligned():
+    table = RatingsTable(RATINGS)
+    try:
+        table._extend((Rating("u9", "b9", 300),))
+    except OverflowError:
+        pass
+    assert len(table.users) == len(table.books) == len(table.values) == 3
+    assert "u9" not in table._user_index and tuple(table) == RATINGS
+
+
+def test_core_functions_accept_table():
+    table = RatingsTable(RATINGS)
+    books = (Book("b1", "B1", ("a",), ("g",), (), 2020), Book("b2", "B2", ("a",), ("g",), (), 2021),
+             Book("b3", "B3", ("a",), ("h",), (), 2022))
+    users = (User("u1", "Ann"), User("u2", "Bob"))
+    for book_id in ("b1", "b2", "b9"):
+        assert avg_rating_for_book(table, book_id) == avg_rating_for_book(RATINGS, book_id)
+    assert validate_rating(Rating("u1", "b1", 4), books, users, table).is_left()
+    assert validate_rating(Rating("u2", "b2", 4), books, users, table).is_right()
+    assert recommend_for_user("u1", table, books) == recommend_for_user("u1", RATINGS, books)
+    result = add_rating_pipeline(Rating("u2", "b3", 5), table, books, users)
+    assert len(result.get_or_else(())) == 4
+
+
+def test_table_from_snapshot_columns(tmp_path: Path):
+    catalog = load_seed("data/seed.json")
+    path = tmp_path / "seed.snapshot"
+    save_snapshot(catalog, str(path))
+    with Snapshot(str(path)) as snap:
+        table = snap.ratings_table()
+    assert tuple(table) == catalog.ratings
+    b = catalog.books[0].id
+    assert table.aggregates().get(b) == catalog.rating_stats.get(b)
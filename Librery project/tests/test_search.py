@@ -0,0 +1,61 @@
+from core.domain import Book, Review, User
+from core.ftypes import add_review_pipeline
+from core.search import SearchIndex, build_search_index, normalize, stem, tokenize
+from core.transforms import load_seed
+
+
+BOOKS = (
+    Book("b1", "Мастер и Маргарита", ("a1",), (), (), 1967),
+    Book("b2", "The Master of Stories", ("a2",), (), (), 2001),
+    Book("b3", "Ёлки и палки", ("a3",), (), (), 1990),
+)
+REVIEWS = (
+    Review("r1", "u1", "b1", "Очень понравилась книга, Маргарита прекрасна", "2025-01-01"),
+    Review("r2", "u1", "b2", "Great stories, reading it again", "2025-01-02"),
+)
+
+
+def test_tokenize_russian_and_english():
+    assert normalize("Ёжик, ЁЛКА!") == ["ежик", "елка"]
+    assert stem("книги") == stem("книга") == "книг"
+    assert stem("stories") == "story" and stem("class") == "class"
+    assert tokenize("The master and the stories") == ["master", "story"]
+
+
+def test_bm25_ranks_and_filters_by_kind():
+    index = build_search_index(BOOKS, REVIEWS)
+    hits = index.search("Маргарита")
+    assert {h.id for h in hits} == {"b1", "r1"}
+    assert hits[0].score >= hits[1].score
+    assert [h.id for h in index.search("маргариту", kind="book")] == ["b1"]
+    assert {h.id for h in index.search("story")} == {"b2", "r2"}
+    assert index.search("елки")[0].id == "b3"
+    assert index.search("несуществующее") == []
+
+
+def test_prefix_search_and_autocomplete():
+    index = build_search_index(BOOKS, REVIEWS)
+    assert index.complete("мар") == ["маргарита"]
+    assert index.complete("ma") == ["master"]
+    assert [h.id for h in index.search("мастер марг", prefix=True)][0] == "b1"
+
+
+def test_review_pipeline_updates_index():
+    index = build_search_index(BOOKS)
+    users = (User("u1", "Ann"),)
+    review = Review("r9", "u1", "b1", "Удивительный роман про Воланда", "2025-02-01")
+    result = add_review_pipeline(review, (), BOOKS, users, (), search_index=index)
+    assert result.is_right()
+    assert [h.id for h in index.search("воланд")] == ["r9"]
+
+    bad = Review("r10", "u1", "b1", "short", "2025-02-01")
+    add_review_pipeline(bad, (), BOOKS, users, (), search_index=index)
+    assert len(index) == 4
+
+
+def test_seed_index_builds():
+    data = load_seed("data/seed.json")
+    index = build_search_index(data.books, data.reviews)
+    assert len(index) == len(data.books) + len(data.reviews)
+    title = data.books[0].title
+    assert data.books[0].id in {h.id for h in index.search(title, k=20)}
@@ -0,0 +1,137 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from core import functional as fn
+from core.memo import recommend_for_user
+from core.server import LibraryService, default_paths, load_test, serve
+from core.transforms import load_seed, save_snapshot
+
+
+def _service():
+    return LibraryService(load_seed("data/seed.json"), workers=2)
+
+
+def _rated_user(catalog):
+    return next(u.id for u in catalog.users if catalog.ratings_by_user.get(u.id))
+
+
+def test_lookups_top_and_errors():
+    service = _service()
+    c = service.catalog
+    book, user = c.books[0], c.users[0]
+
+    async def scenario():
+        status, payload = await service.dispatch("GET", f"/books/{book.id}")
+        assert status == 200 and payload["title"] == book.title
+        assert payload["ratings"] == c.rating_stats.get(book.id).count
+        status, payload = await service.dispatch("GET", f"/users/{user.id}")
+        assert status == 200 and len(payload["ratings"]) == len(c.ratings_by_user.get(user.id, ()))
+        status, payload = await service.dispatch("GET", "/top?n=5&offset=0")
+        expected = fn.top_books_by_avg(c, c, 5)
+        assert status == 200 and [row["id"] for row in payload["books"]] == [b for b, _ in expected]
+
+        assert (await service.dispatch("GET", "/books/nope"))[0] == 404
+        assert (await service.dispatch("GET", "/nowhere"))[0] == 404
+        assert (await service.dispatch("POST", "/top"))[0] == 405
+        assert (await service.dispatch("GET", "/top?n=0"))[0] == 400
+        assert (await service.dispatch("GET", "/top?kind=median"))[0] == 400
+        assert (await service.dispatch("GET", "/health?x=1"))[0] == 400
+
+    asyncio.run(scenario())
+
+
+def test_identical_concurrent_recommendations_are_coalesced():
+    service = _service()
+    user_id = _rated_user(service.catalog)
+
+    async def scenario():
+        path = f"/users/{user_id}/recommendations"
+        results = await asyncio.gather(*(service.dispatch("GET", path) for _ in range(5)))
+        assert {r[1]["source"] for r in results} == {"computed", "coalesced"}
+        again = await service.dispatch("GET", path)
+        return results, again
+
+    results, again = asyncio.run(scenario())
+    expected = list(recommend_for_user(user_id, service.catalog, service.catalog))
+    assert all([b["id"] for b in payload["books"]] == expected for _, payload in results)
+    assert service.coalescer.stats() == {"started": 1, "joined": 4, "inflight": 0}
+    assert again[1]["source"] == "cache"
+
+
+def test_submitted_rating_updates_board_and_recommendations():
+    service = _service()
+    c = service.catalog
+    user_id = _rated_user(c)
+    rated = {r.book_id for r in c.ratings_by_user[user_id]}
+    book_id = next(b.id for b in c.books if b.id not in rated)
+
+    async def scenario():
+        path = f"/users/{user_id}/recommendations"
+        await service.dispatch("GET", path)
+        body = json.dumps({"user_id": user_id, "book_id": book_id, "value": 5}).encode()
+        status, payload = await service.dispatch("POST", "/ratings", body)
+        assert status == 201 and payload["rank"] == service.boards["mean"].rank(book_id)
+        assert (await service.dispatch("POST", "/ratings", body))[1]["errors"].keys() == {"duplicate"}
+        bad = json.dumps({"user_id": "ghost", "book_id": book_id, "value": 9}).encode()
+        assert (await service.dispatch("POST", "/ratings", bad))[1]["errors"].keys() == {"user_id", "value"}
+        assert (await service.dispatch("POST", "/ratings", b'{"value": "5"}'))[0] == 400
+        assert (await service.dispatch("POST", "/ratings", b"{oops"))[0] == 400
+        return await service.dispatch("GET", path)
+
+    status, payload = asyncio.run(scenario())
+    assert status == 200 and payload["source"] == "computed"
+    assert book_id not in [b["id"] for b in payload["books"]]
+    assert service.boards["bayes"].stats(book_id).count == c.rating_stats.get(book_id).count + 1
+    assert len(c.ratings_by_user[user_id]) == len(rated)  # общий каталог не меняется
+
+
+def test_http_round_trip_and_load_generator():
+    service = _service()
+
+    async def scenario():
+        server = await serve(service, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /health HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+            raw = await reader.read()
+            writer.close()
+            report = await load_test("127.0.0.1", port, default_paths(service.catalog, 50), 4, 120)
+        finally:
+            server.close()
+            await server.wait_closed()
+        return raw, report
+
+    raw, report = asyncio.run(scenario())
+    head, _, body = raw.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200 OK") and b"Connection: close" in head
+    assert json.loads(body)["books"] == len(service.catalog.books)
+    assert report["requests"] == 120 and report["errors"] == 0 and report["statuses"] == {"200": 120}
+    assert 0 < report["p50_ms"] <= report["p99_ms"] and report["rps"] > 0
+
+
+def test_scoring_runs_in_worker_processes_or_a_given_executor(tmp_path):
+    catalog = load_seed("data/seed.json")
+    path = tmp_path / "seed.snapshot"
+    save_snapshot(catalog, str(path))
+    user_ids = [u.id for u in catalog.users[:4]]
+    threads = ThreadPoolExecutor(2)
+    services = (LibraryService(catalog, workers=2), LibraryService(catalog, workers=2, snapshot_path=str(path)),
+                LibraryService(catalog, executor=threads), LibraryService(catalog, workers=1))
+
+    async def scenario(service):
+        return [(await service.dispatch("GET", f"/users/{u}/recommendations"))[1]["books"] for u in user_ids]
+
+    try:
+        results = [asyncio.run(scenario(service)) for service in services]
+        assert results[0] == results[1] == results[2] == results[3]
+        assert [[b["id"] for b in books] for books in results[0]] == [
+            list(recommend_for_user(u, catalog, catalog)) for u in user_ids]
+        assert services[0].executor is not None and services[2].executor is threads
+        assert services[3].executor is None  # один процесс — пул потоков цикла
+    finally:
+        for service in services:
+            service.close()
+        threads.shutdown()
+    assert services[0].executor is None and services[2].executor is threads
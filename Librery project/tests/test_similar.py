@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from core.domain import Book
+from core.similar import build_similar_index, jaccard, similar_books, similar_books_exact, similar_index
+from core.transforms import load_seed
+from core.vectorized import build_feature_matrix
+
+
+def _books(n=300, seed=4):
+    rnd = random.Random(seed)
+    base = [
+        Book(f"b{i}", "T", (f"a{rnd.randrange(30)}",),
+             tuple(f"g{rnd.randrange(8)}" for _ in range(2)),
+             tuple(f"t{rnd.randrange(40)}" for _ in range(3)), 2000)
+        for i in range(n)
+    ]
+    # почти копии первых книг — их LSH обязан находить
+    near = [Book(f"c{i}", "T", b.author_ids, b.genres, b.tags[:2] + ("t99",), 2001) for i, b in enumerate(base[:20])]
+    return tuple(base + near)
+
+
+def test_jaccard_is_exact_over_feature_sets():
+    books = (
+        Book("x", "X", ("a1",), ("g1", "g1"), ("t1",), 2000),
+        Book("y", "Y", ("a1",), ("g1",), ("t2",), 2000),
+        Book("z", "Z", (), (), (), 2000),
+    )
+    fm = build_feature_matrix(books)
+    assert jaccard(fm, 0, np.array([1, 2])) == pytest.approx([2 / 4, 0.0])
+
+
+def test_near_duplicates_are_found():
+    books = _books()
+    index = build_similar_index(books)
+    for i in range(20):
+        found = dict(index.similar(f"c{i}", k=5))
+        assert f"b{i}" in found
+        assert found[f"b{i}"] == dict(similar_books_exact(books, f"c{i}", k=300))[f"b{i}"]
+
+
+def test_more_bands_means_higher_recall():
+    books = _books()
+    def recall(bands, rows):
+        index = build_similar_index(books, bands=bands, rows=rows)
+        hit = total = 0
+        for b in books[:60]:
+            exact = {x for x, _ in similar_books_exact(books, b.id)}
+            hit += len(exact & {x for x, _ in index.similar(b.id)})
+            total += len(exact)
+        return hit / total
+    assert recall(64, 1) >= recall(32, 2) >= recall(8, 4)
+    assert recall(64, 1) > 0.9
+
+
+def test_results_are_exact_scores_in_order():
+    books = _books()
+    result = build_similar_index(books).similar("b5", k=10)
+    scores = [s for _, s in result]
+    assert scores == sorted(scores, reverse=True)
+    exact = dict(similar_books_exact(books, "b5", k=len(books)))
+    assert all(exact[b] == pytest.approx(s) for b, s in result)
+    assert "b5" not in dict(result)
+
+
+def test_seed_similar_books():
+    data = load_seed("data/seed.json")
+    book = data.books[0]
+    result = similar_books(data, book.id)
+    assert len(result) <= 10 and all(0 < s <= 1 for _, s in result)
+    assert similar_books(data, "missing") == ()
+    assert similar_index(data) is similar_index(data)
+    assert similar_index(data.books) is not similar_index(data.books)  # кортежи не кэшируются
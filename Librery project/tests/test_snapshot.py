@@ -0,0 +1,96 @@
+from pathlib import Path
+
+import pytest
+
+from core.catalog import Catalog
+from core.domain import Book, Loan, Rating, Tag
+from core.ratings_table import RatingsTable
+from core.snapshot import Snapshot, measure_snapshot_performance
+from core.transforms import load_seed, save_snapshot, load_snapshot
+
+
+SECTIONS = ("authors", "books", "users", "ratings", "reviews", "loans", "tags", "genres")
+
+
+def test_snapshot_round_trip_seed(tmp_path: Path):
+    catalog = load_seed("data/seed.json")
+    path = tmp_path / "seed.snapshot"
+    size = save_snapshot(catalog, str(path))
+    assert size == path.stat().st_size
+    loaded = load_snapshot(str(path))
+    for section in SECTIONS:
+        assert tuple(loaded[section]) == catalog[section]
+    assert loaded.rating_stats.get("b1") == catalog.rating_stats.get("b1")
+    assert loaded.ratings_by_user == catalog.ratings_by_user
+
+
+def test_snapshot_handles_none_and_empty(tmp_path: Path):
+    catalog = Catalog(
+        books=(Book("b1", "", (), ("g1", "g1"), (), 1999),),
+        loans=(Loan("l1", "u1", "b1", "2025-01-01", None, "overdue"),),
+        tags=(Tag("t1", "тег", None), Tag("t2", "child", "t1")),
+    )
+    path = tmp_path / "small.snapshot"
+    save_snapshot(catalog, str(path))
+    loaded = load_snapshot(str(path))
+    for section in SECTIONS:
+        assert tuple(loaded[section]) == catalog[section]
+
+    save_snapshot(Catalog(), str(path))
+    assert all(len(v) == 0 for v in load_snapshot(str(path)).values())
+
+
+def test_snapshot_columns_are_integer_coded(tmp_path: Path):
+    catalog = Catalog(ratings=(Rating("u1", "b1", 5), Rating("u1", "b2", 3)))
+    path = tmp_path / "r.snapshot"
+    save_snapshot(catalog, str(path))
+    with Snapshot(str(path)) as snap:
+        users = snap.column("ratings.user")
+        assert users[0] == users[1]  # строки интернированы
+        assert list(snap.column("ratings.value")) == [5, 3]
+
+
+def test_snapshot_load_is_lazy(tmp_path: Path):
+    catalog = load_seed("data/seed.json")
+    path = tmp_path / "seed.snapshot"
+    save_snapshot(catalog, str(path))
+    loaded = load_snapshot(str(path))
+    # ничего, кроме загрузчиков, ещё не построено
+    with pytest.raises(AttributeError):
+        object.__getattribute__(loaded, "books")
+    with pytest.raises(AttributeError):
+        object.__getattribute__(loaded, "ratings_by_user")
+    assert isinstance(loaded.ratings, RatingsTable)
+    book = catalog.books[0]
+    assert loaded.books_by_id[book.id] == book
+    assert loaded.book_ordinals == catalog.book_ordinals
+    path.unlink()  # отображение держит каталог, удалённый файл ему не мешает
+    assert tuple(loaded.reviews) == catalog.reviews
+
+
+def test_snapshot_catalog_serves_views_that_outlive_close(tmp_path: Path):
+    catalog = load_seed("data/seed.json")
+    path = tmp_path / "seed.snapshot"
+    save_snapshot(catalog, str(path))
+    with Snapshot(str(path)) as snap:
+        loaded = snap.catalog()
+    assert isinstance(loaded.ratings.values, memoryview)  # без копии столбца
+    assert tuple(loaded.ratings) == catalog.ratings and loaded.books == catalog.books
+    # перезапись файла не трогает уже отображённый каталог
+    save_snapshot(Catalog(), str(path))
+    assert tuple(loaded.ratings) == catalog.ratings
+    assert len(load_snapshot(str(path)).ratings) == 0
+
+
+def test_snapshot_rejects_foreign_files(tmp_path: Path):
+    path = tmp_path / "bad.snapshot"
+    path.write_bytes(b"not a snapshot at all")
+    with pytest.raises(ValueError):
+        load_snapshot(str(path))
+
+
+def test_measure_snapshot_performance(tmp_path: Path):
+    result = measure_snapshot_performance("data/seed.json", str(tmp_path / "s.snapshot"), repeat=1)
+    assert result["snapshot_load_ms"] >= 0 and result["json_load_ms"] >= 0
+    assert result["snapshot_ready_ms"] > 0 and result["json_ready_ms"] > 0
+    assert result["snapshot_bytes"] < result["json_bytes"]
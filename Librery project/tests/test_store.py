@@ -0,0 +1,59 @@
+import os
+import shutil
+import threading
+
+from core.search import SearchIndex
+from core.store import CatalogStore
+from core.transforms import load_seed, save_snapshot
+
+
+def _seed(tmp_path):
+    path = tmp_path / "seed.json"
+    shutil.copy("data/seed.json", path)
+    return path
+
+
+def test_same_catalog_until_file_changes(tmp_path):
+    path = _seed(tmp_path)
+    store = CatalogStore()
+    first = store.get(str(path))
+    assert store.get(str(path)) is first
+    assert store.loads == 1 and store.hits == 1
+
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    second = store.get(str(path))
+    assert second is not first and store.loads == 2
+    assert store.reload(str(path)).catalog is not second
+
+
+def test_fresh_snapshot_is_preferred(tmp_path):
+    path = _seed(tmp_path)
+    save_snapshot(load_seed(str(path)), str(path.with_suffix(".snapshot")))
+    entry = CatalogStore().entry(str(path))
+    assert entry.source == "snapshot"
+    assert CatalogStore(use_snapshot=False).entry(str(path)).source == "json"
+
+
+def test_derived_indexes_built_once_per_version(tmp_path):
+    path = _seed(tmp_path)
+    store = CatalogStore()
+    calls = []
+    entry = store.entry(str(path))
+    build = lambda c: calls.append(c) or len(c.books)
+    assert entry.derived("n_books", build) == entry.derived("n_books", build) == len(entry.catalog.books)
+    assert len(calls) == 1
+    assert isinstance(store.warm(str(path)).derived("search"), SearchIndex)
+    assert set(store.stats()["paths"][entry.path]["derived"]) >= {"n_books", "search", "loans"}
+
+
+def test_concurrent_sessions_share_one_load(tmp_path):
+    path = _seed(tmp_path)
+    store = CatalogStore()
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(store.get(str(path)))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert store.loads == 1 and all(c is seen[0] for c in seen)
@@ -0,0 +1,47 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from core.streaming import iter_seed, load_seed_streaming, load_jsonl, save_jsonl
+from core.transforms import load_seed
+
+
+SECTIONS = ("authors", "books", "users", "ratings", "reviews", "loans", "tags", "genres")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+def test_streaming_matches_load_seed(chunk_size):
+    expected = load_seed("data/seed.json")
+    got = load_seed_streaming("data/seed.json", chunk_size=chunk_size)
+    for section in SECTIONS:
+        assert got[section] == expected[section]
+
+
+def test_iter_seed_skips_unknown_sections_and_keeps_order(tmp_path: Path):
+    p = tmp_path / "seed.json"
+    p.write_text(json.dumps({
+        "meta": {"version": 3, "nested": [1, 2, 3]},
+        "users": [{"id": "u1", "name": "Аня"}, {"id": "u2", "name": "Bob"}],
+        "ratings": [],
+        "years": 12345,
+    }, ensure_ascii=False), encoding="utf-8")
+    items = list(iter_seed(str(p), chunk_size=3))
+    assert [(s, o.id) for s, o in items] == [("users", "u1"), ("users", "u2")]
+    assert items[0][1].name == "Аня"
+
+
+def test_iter_seed_rejects_malformed_input(tmp_path: Path):
+    p = tmp_path / "seed.json"
+    p.write_text('{"users": [{"id": "u1", "name": "x"} {"id": "u2"}]}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_seed(str(p)))
+
+
+def test_jsonl_round_trip(tmp_path: Path):
+    catalog = load_seed("data/seed.json")
+    save_jsonl(catalog, str(tmp_path))
+    assert (tmp_path / "books.jsonl").exists()
+    loaded = load_jsonl(str(tmp_path))
+    for section in SECTIONS:
+        assert loaded[section] == catalog[section]
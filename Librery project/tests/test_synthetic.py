@@ -0,0 +1,43 @@
+from collections import Counter
+
+from core.catalog import genre_tree
+from core.streaming import save_seed
+from core.synthetic import generate_catalog
+from core.transforms import load_seed
+
+
+def test_generator_is_deterministic():
+    a, b = generate_catalog(2000, seed=7), generate_catalog(2000, seed=7)
+    assert a.ratings == b.ratings and a.books == b.books
+    assert generate_catalog(2000, seed=8).ratings != a.ratings
+
+
+def test_ratings_are_unique_and_reference_catalog():
+    data = generate_catalog(5000, seed=1)
+    pairs = [(r.user_id, r.book_id) for r in data.ratings]
+    assert len(pairs) == len(set(pairs)) == 5000
+    assert all(r.book_id in data.books_by_id and r.user_id in data.users_by_id for r in data.ratings)
+    assert all(1 <= r.value <= 5 for r in data.ratings)
+
+
+def test_popularity_and_activity_are_skewed():
+    data = generate_catalog(20000, seed=2)
+    per_book = sorted(Counter(r.book_id for r in data.ratings).values(), reverse=True)
+    per_user = sorted(Counter(r.user_id for r in data.ratings).values(), reverse=True)
+    top_books = sum(per_book[:len(data.books) // 100])
+    assert top_books > 0.1 * len(data.ratings)      # 1% книг собирают >10% оценок
+    assert per_user[0] > 10 * per_user[len(per_user) // 2]
+
+
+def test_genres_are_nested():
+    data = generate_catalog(20000, seed=3)
+    tree = genre_tree(data)
+    assert max(len(a) for a in tree.ancestors_of.values()) >= 2
+
+
+def test_seed_roundtrip(tmp_path):
+    data = generate_catalog(1000, seed=4)
+    path = str(tmp_path / "seed.json")
+    save_seed(data, path)
+    loaded = load_seed(path)
+    assert all(loaded[s] == data[s] for s in data)
@@ -0,0 +1,107 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from core.domain import Book, Rating
+from core.memo import recommend_for_user
+from core.transforms import load_seed
+from core.vectorized import build_feature_matrix, feature_matrix, recommend_for_user_np, top_k
+
+
+def test_feature_matrix_encodes_kinds_separately():
+    books = (Book("1", "B", ("x",), ("x",), ("x", "x"), 2020),)
+    fm = build_feature_matrix(books)
+    assert fm.n_features == 3
+    assert fm.book_features(0).size == 4
+
+
+def test_feature_matrix_is_cached_per_catalog_without_keeping_it_alive():
+    import gc
+    import weakref
+    from core.catalog import Catalog
+
+    books = (Book("1", "B", ("a",), ("g",), ("t",), 2020),)
+    catalog = Catalog(books=books)
+    fm = feature_matrix(catalog)
+    assert feature_matrix(catalog) is fm
+    assert feature_matrix(Catalog(books=books)) is not fm
+    assert feature_matrix(books) is not feature_matrix(books)  # кортежи не хэшируются и не кэшируются
+    ref = weakref.ref(catalog)
+    del catalog
+    gc.collect()
+    assert ref() is None
+
+
+def test_top_k_breaks_ties_by_position():
+    scores = np.array([1.0, 3.0, 3.0, 2.0, 3.0])
+    candidates = np.arange(5)
+    assert list(top_k(scores, candidates, 2)) == [1, 2]
+    assert list(top_k(scores, candidates, 4)) == [1, 2, 4, 3]
+    assert list(top_k(scores, candidates, 10)) == [1, 2, 4, 3, 0]
+
+
+def test_same_ranking_as_python_engine_on_seed():
+    data = load_seed("data/seed.json")
+    for user in data.users:
+        assert recommend_for_user_np(user.id, data, data) == recommend_for_user(user.id, data, data)
+
+
+def test_same_ranking_with_many_ties():
+    rnd = random.Random(7)
+    books = tuple(
+        Book(f"b{i}", f"Book {i}", (f"a{rnd.randint(1, 5)}",),
+             tuple(f"g{rnd.randint(1, 3)}" for _ in range(rnd.randint(0, 2))),
+             (f"t{rnd.randint(1, 4)}",), 2000)
+        for i in range(60)
+    )
+    ratings = tuple(
+        Rating(f"u{u}", f"b{rnd.randrange(60)}", rnd.randint(1, 5))
+        for u in range(8) for _ in range(5)
+    )
+    for u in range(9):
+        assert recommend_for_user_np(f"u{u}", ratings, books) == recommend_for_user(f"u{u}", ratings, books)
+
+
+def test_edge_cases():
+    books = (Book("1", "B", ("a",), ("g",), ("t",), 2020),)
+    assert recommend_for_user_np("u1", (), books) == ()
+    assert recommend_for_user_np("u1", (Rating("u1", "1", 5),), ()) == ()
+    assert recommend_for_user_np("u1", (Rating("u1", "1", 5),), books) == ()
+
+
+def test_batch_matches_single_user_engine():
+    from core.vectorized import recommend_for_users
+
+    data = load_seed("data/seed.json")
+    ids = [u.id for u in data.users] + ["nobody"]
+    batch = recommend_for_users(ids, data, k=10, chunk_size=7)
+    assert batch.n_users == len(ids)
+    assert batch.recommendations["nobody"] == ()
+    for uid in ids:
+        assert batch.recommendations[uid] == recommend_for_user_np(uid, data, data)
+    assert batch.users_per_sec > 0
+
+
+def test_default_chunk_is_bounded_by_the_memory_budget():
+    from core.synthetic import generate_catalog
+    from core.vectorized import chunk_size_for, feature_matrix, recommend_for_users
+
+    data = generate_catalog(5_000, seed=3)
+    fm = feature_matrix(data)
+    per_user = 8 * (fm.n_features + fm.indices.size + fm.n_books)
+    size = chunk_size_for(fm, budget=64 * per_user)
+    assert 32 <= size <= 64
+    assert chunk_size_for(fm, budget=1) == 1
+    ids = [u.id for u in data.users[:50]]
+    assert recommend_for_users(ids, data).recommendations == recommend_for_users(ids, data, chunk_size=3).recommendations
+
+
+def test_batch_defaults_to_all_users_and_respects_k():
+    from core.vectorized import recommend_for_users
+
+    data = load_seed("data/seed.json")
+    batch = recommend_for_users(None, data, k=3)
+    assert set(batch.recommendations) == {u.id for u in data.users}
+    assert all(len(v) <= 3 for v in batch.recommendations.values())